@@ -0,0 +1,59 @@
+// Reads the per-site article index (src/data/articles.json) written by
+// content-api / content-scheduler on every ingest. Pages use this instead of
+// Astro.glob('./articles/*.astro'), so listings never scan the pages directory.
+import fs from 'node:fs';
+import path from 'node:path';
+
+const EMPTY = { count: 0, updated_at: null, articles: [] };
+let cache = { mtime: 0, index: EMPTY };
+
+export function loadArticleIndex(root = process.cwd()) {
+  const file = path.join(root, 'src', 'data', 'articles.json');
+  let mtime;
+  try {
+    mtime = fs.statSync(file).mtimeMs;
+  } catch {
+    return EMPTY;
+  }
+  // Re-read only when the index was replaced (dev server keeps running)
+  if (mtime !== cache.mtime) {
+    cache = { mtime, index: JSON.parse(fs.readFileSync(file, 'utf-8')) };
+  }
+  return cache.index;
+}
+
+export function getArticles({ limit, category, filter } = {}) {
+  let articles = loadArticleIndex().articles;
+  if (category) articles = articles.filter((a) => a.category === category);
+  if (filter) articles = articles.filter(filter);
+  return limit ? articles.slice(0, limit) : articles;
+}
+
+export function getArticle(slug) {
+  return loadArticleIndex().articles.find((a) => a.slug === slug);
+}
+
+export function getArticleCount() {
+  return loadArticleIndex().count;
+}
+
+// Related = shared keywords (+ same category), newest first on ties
+export function getRelatedArticles(slug, limit = 3) {
+  const articles = loadArticleIndex().articles;
+  const current = articles.find((a) => a.slug === slug);
+  if (!current) return articles.filter((a) => a.slug !== slug).slice(0, limit);
+
+  const keywords = new Set((current.keywords || []).map((k) => k.toLowerCase()));
+  return articles
+    .filter((a) => a.slug !== slug)
+    .map((a, order) => ({
+      article: a,
+      order,
+      score:
+        (a.keywords || []).filter((k) => keywords.has(k.toLowerCase())).length +
+        (current.category && a.category === current.category ? 1 : 0)
+    }))
+    .sort((x, y) => y.score - x.score || x.order - y.order)
+    .slice(0, limit)
+    .map((x) => x.article);
+}
@@ -3,13 +3,29 @@
 # Build all sites in the multidomain_site_kit
 echo "Building all sites..."
 
+DOMAINS=()
 for d in sites/*; do
   if [ -d "$d" ]; then
-    DOMAIN=$(basename "$d")
-    echo "Building $DOMAIN..."
-    (cd "$d" && pnpm install && pnpm build)
-    echo "✅ $DOMAIN built successfully"
+    DOMAINS+=("$(basename "$d")")
   fi
 done
 
+# Shared content-addressable store (same one site-builder uses)
+PNPM_STORE_DIR="${PNPM_STORE_DIR:-$PWD/.pnpm-store}"
+
+# Prefer the central site-builder: per-domain lock + parallel builds
+COMPOSE_FILE="$(dirname "$0")/../../docker-compose.yml"
+if docker compose -f "$COMPOSE_FILE" ps --services --status running 2>/dev/null | grep -qx site-builder; then
+  docker compose -f "$COMPOSE_FILE" exec -T site-builder \
+    python /app/site_builder.py enqueue --stages install,build --wait "${DOMAINS[@]}"
+  exit $?
+fi
+
+for DOMAIN in "${DOMAINS[@]}"; do
+  echo "Building $DOMAIN..."
+  # site-builder holds the same flock while it builds this site
+  (cd "sites/$DOMAIN" && flock .build.lock sh -c "pnpm install --store-dir \"$PNPM_STORE_DIR\" --frozen-lockfile --prefer-offline && pnpm build")
+  echo "✅ $DOMAIN built successfully"
+done
+
 echo "All sites built successfully!"
@@ -3,22 +3,38 @@
 # Deploy all sites to Cloudflare Pages
 echo "Deploying all sites to Cloudflare Pages..."
 
+DOMAINS=()
 for d in sites/*; do
   if [ -d "$d" ]; then
-    DOMAIN=$(basename "$d")
-    PROJECT=${DOMAIN//./-}
-    echo "Deploying $DOMAIN to project $PROJECT..."
-    
-    # Check if dist directory exists
-    if [ ! -d "$d/dist" ]; then
-      echo "❌ $DOMAIN not built. Building first..."
-      (cd "$d" && pnpm install && pnpm build)
-    fi
-    
-    # Deploy to Cloudflare Pages
-    npx wrangler pages deploy "$d/dist" --project-name "$PROJECT"
-    echo "✅ $DOMAIN deployed successfully"
+    DOMAINS+=("$(basename "$d")")
   fi
 done
 
+# Shared content-addressable store (same one site-builder uses)
+PNPM_STORE_DIR="${PNPM_STORE_DIR:-$PWD/.pnpm-store}"
+
+# Prefer the central site-builder: per-domain lock + parallel builds
+COMPOSE_FILE="$(dirname "$0")/../../docker-compose.yml"
+if docker compose -f "$COMPOSE_FILE" ps --services --status running 2>/dev/null | grep -qx site-builder; then
+  docker compose -f "$COMPOSE_FILE" exec -T site-builder \
+    python /app/site_builder.py enqueue --stages install,build,deploy --wait "${DOMAINS[@]}"
+  exit $?
+fi
+
+for DOMAIN in "${DOMAINS[@]}"; do
+  d="sites/$DOMAIN"
+  PROJECT=${DOMAIN//./-}
+  echo "Deploying $DOMAIN to project $PROJECT..."
+  
+  # Check if dist directory exists
+  if [ ! -d "$d/dist" ]; then
+    echo "❌ $DOMAIN not built. Building first..."
+    (cd "$d" && flock .build.lock sh -c "pnpm install --store-dir \"$PNPM_STORE_DIR\" --frozen-lockfile --prefer-offline && pnpm build")
+  fi
+  
+  # Deploy to Cloudflare Pages
+  npx wrangler pages deploy "$d/dist" --project-name "$PROJECT"
+  echo "✅ $DOMAIN deployed successfully"
+done
+
 echo "All sites deployed successfully!"
@@ -0,0 +1,91 @@
+# /srv/auto-adsense/services/auto-deployment/build_queue.py
+import json
+import time
+import uuid
+import redis
+from typing import Dict, Any, List, Optional
+
+QUEUE_NAME = "site_build_queue"
+DEFAULT_STAGES = ["build", "deploy"]
+STAGE_ORDER = ["install", "build", "deploy"]
+
+# Domain için bekleyen iş varsa istenen aşamaları/manifest'i ona ekle ve onun
+# id'sini döndür; yoksa yeni işi kuyruğa koy. ARGV: id, payload, digest, aşamalar...
+ENQUEUE_SCRIPT = """
+local existing = redis.call('GET', KEYS[1])
+if existing then
+    local extra = 'site_build:extra:' .. existing
+    for i = 4, #ARGV do
+        redis.call('HSET', extra, 'stage:' .. ARGV[i], 1)
+    end
+    if ARGV[3] ~= '' then
+        redis.call('HSET', extra, 'manifest_digest', ARGV[3])
+    end
+    redis.call('EXPIRE', extra, 86400)
+    return existing
+end
+redis.call('SET', KEYS[1], ARGV[1], 'EX', 3600)
+redis.call('LPUSH', KEYS[2], ARGV[2])
+return ARGV[1]
+"""
+
+# Worker işi başlatırken: kuyruk işaretini kaldır (sonraki istekler yeni iş
+# açsın) ve bu işe sonradan eklenenleri oku. Tek script olduğu için arada
+# eklenen bir aşama kaybolmaz. Ek bilgi TTL'e kadar durur; retry'da da okunur.
+CLAIM_SCRIPT = """
+if redis.call('GET', KEYS[1]) == ARGV[1] then
+    redis.call('DEL', KEYS[1])
+end
+return redis.call('HGETALL', KEYS[2])
+"""
+
+
+def enqueue_build(redis_client: redis.Redis, domain: str, stages: Optional[List[str]] = None,
+                  source: str = "", manifest_digest: Optional[str] = None) -> str:
+    """site-builder servisine build/deploy işi gönder, job id döndür
+
+    Aynı domain için henüz başlamamış bir iş varsa yenisi eklenmez; build
+    dosya sistemini çalıştığı anda okuduğu için bekleyen iş yeni içeriği de
+    kapsar. İstenen aşamalar ve manifest_digest bekleyen işe eklenir ve o
+    işin id'si döner, yani çağıran kendi aşamalarını içeren işi bekler.
+    """
+    job_id = uuid.uuid4().hex
+    stages = stages or DEFAULT_STAGES
+    payload = json.dumps({
+        "id": job_id,
+        "domain": domain,
+        "stages": stages,
+        "source": source,
+        "manifest_digest": manifest_digest,
+        "queued_at": time.time()
+    })
+
+    enqueue = redis_client.register_script(ENQUEUE_SCRIPT)
+    return enqueue(keys=[f"site_build:queued:{domain}", QUEUE_NAME],
+                   args=[job_id, payload, manifest_digest or "", *stages])
+
+
+def claim_build(redis_client: redis.Redis, request: Dict[str, Any]) -> Dict[str, Any]:
+    """Başlayan işi kuyruk işaretinden düşür; sonradan eklenen aşamalarla birleşik isteği döndür"""
+    claim = redis_client.register_script(CLAIM_SCRIPT)
+    raw = claim(keys=[f"site_build:queued:{request['domain']}", f"site_build:extra:{request['id']}"],
+                args=[request["id"]])
+    extra = dict(zip(raw[::2], raw[1::2]))
+
+    stages = set(request["stages"]) | {k[len("stage:"):] for k in extra if k.startswith("stage:")}
+    merged = dict(request, stages=[s for s in STAGE_ORDER if s in stages])
+    if extra.get("manifest_digest"):
+        merged["manifest_digest"] = extra["manifest_digest"]
+    return merged
+
+def wait_for_build(redis_client: redis.Redis, job_id: str, timeout: int = 1800, poll_interval: float = 2.0) -> Optional[Dict[str, Any]]:
+    """İş bitene kadar bekle; sonuç dict'i ya da timeout'ta None"""
+    deadline = time.time() + timeout
+
+    while time.time() < deadline:
+        raw = redis_client.get(f"site_build_result:{job_id}")
+        if raw:
+            return json.loads(raw)
+        time.sleep(poll_interval)
+
+    return None
@@ -4,7 +4,6 @@ import json
 import time
 import redis
 import asyncio
-import subprocess
 import requests
 from datetime import datetime
 from pathlib import Path
@@ -12,6 +11,9 @@ from typing import Dict, Any, List
 import threading
 import shutil
 from jinja2 import Template
+from job_queue import JobQueue
+from build_queue import enqueue_build, wait_for_build
+from site_files import write_site_file
 
 class AutoDomainDeployer:
     """Otomatik Domain Deployment ve Website Kurulum Sistemi"""
@@ -221,7 +223,6 @@ class AutoDomainDeployer:
             "dependencies": {
                 "astro": "^4.15.0",
                 "@astrojs/tailwind": "^5.1.0",
-                "@astrojs/sitemap": "^3.1.0",
                 "tailwindcss": "^3.4.0",
                 "@mdkit/shared": "file:../../packages/shared"
             },
@@ -230,20 +231,18 @@ class AutoDomainDeployer:
             }
         }
         
-        with open(site_path / "package.json", "w") as f:
-            json.dump(package_json, f, indent=2)
+        write_site_file(str(site_path), "package.json", json.dumps(package_json, indent=2))
         
         # Create astro.config.mjs
         astro_config = f"""
 import {{ defineConfig }} from 'astro/config';
 import tailwind from '@astrojs/tailwind';
-import sitemap from '@astrojs/sitemap';
 
+// sitemap.xml / rss.xml are written to public/ by content-api on ingest
 export default defineConfig({{
   site: 'https://{domain_name}',
   integrations: [
-    tailwind(),
-    sitemap()
+    tailwind()
   ],
   output: 'static',
   build: {{
@@ -253,8 +252,7 @@ export default defineConfig({{
 }});
 """
         
-        with open(site_path / "astro.config.mjs", "w") as f:
-            f.write(astro_config.strip())
+        write_site_file(str(site_path), "astro.config.mjs", astro_config.strip())
         
         # Create directory structure
         (site_path / "src" / "pages").mkdir(parents=True, exist_ok=True)
@@ -329,8 +327,7 @@ export default defineConfig({{
             }
         }
         
-        with open(site_path / "src" / "config.json", "w") as f:
-            json.dump(config, f, indent=2)
+        write_site_file(str(site_path), "src/config.json", json.dumps(config, indent=2))
     
     async def create_layouts(self, domain_data: Dict[str, Any], site_path: Path):
         """Optimize edilmiş layout'lar oluştur"""
@@ -505,8 +502,7 @@ import config from '../config.json';
 </body>
 </html>"""
         
-        with open(site_path / "src" / "layouts" / "Base.astro", "w") as f:
-            f.write(base_layout)
+        write_site_file(str(site_path), "src/layouts/Base.astro", base_layout)
         
         # Article Layout
         article_layout = """---
@@ -611,8 +607,7 @@ const readingTime = Math.ceil((Astro.slots.default().length || 1000) / 200) + '
     document.head.appendChild(script);
 </script>"""
         
-        with open(site_path / "src" / "layouts" / "Article.astro", "w") as f:
-            f.write(article_layout)
+        write_site_file(str(site_path), "src/layouts/Article.astro", article_layout)
         
         self.log_info(f"Layouts created for {domain_data['name']}")
     
@@ -624,43 +619,43 @@ const readingTime = Math.ceil((Astro.slots.default().length || 1000) / 200) + '
         
         # Generate 8-12 initial articles
         keywords = niche_config["keywords"][:12]
+        articles = []
         
         for i, keyword in enumerate(keywords):
-            try:
-                # Create article via Content API
-                article_data = {
-                    "domain": domain_name,
-                    "title": self.generate_article_title(keyword, niche_config),
-                    "body": await self.generate_article_content(keyword, niche_config, domain_data),
-                    "keywords": [keyword] + niche_config["keywords"][i:i+3],
-                    "author": f"{niche.title()} Expert",
-                    "publish_date": datetime.now().isoformat(),
-                    "category": keyword.split()[0] if " " in keyword else keyword
-                }
-                
-                # Call Content API
-                response = requests.post(
-                    "http://content-api:5055/ingest",
-                    json=article_data,
-                    timeout=30
-                )
-                
-                if response.status_code == 200:
-                    self.log_info(f"Created initial article: {keyword}")
-                    
-                    # Generate and queue Pinterest pin
-                    await self.queue_pinterest_pin(domain_name, keyword, article_data["title"])
-                    
-                else:
-                    self.log_error(f"Failed to create article for: {keyword}")
-                
-                # Rate limiting
-                await asyncio.sleep(3)
+            articles.append({
+                "domain": domain_name,
+                "title": self.generate_article_title(keyword, niche_config),
+                "body": await self.generate_article_content(keyword, niche_config, domain_data),
+                "keywords": [keyword] + niche_config["keywords"][i:i+3],
+                "author": f"{niche.title()} Expert",
+                "publish_date": datetime.now().isoformat(),
+                "category": keyword.split()[0] if " " in keyword else keyword
+            })
+        
+        # Tek istekte toplu yazım (makale başına round trip + bekleme yok)
+        try:
+            response = await asyncio.to_thread(
+                requests.post,
+                "http://content-api:5055/ingest/bulk",
+                json=articles,
+                timeout=120
+            )
+            results = response.json().get("results", [])
+        except Exception as e:
+            self.log_error(f"Bulk ingest failed for {domain_name}: {e}")
+            results = []
+        
+        for keyword, article_data, result in zip(keywords, articles, results):
+            if result.get("ok"):
+                self.log_info(f"Created initial article: {keyword}")
                 
-            except Exception as e:
-                self.log_error(f"Error creating article for {keyword}: {e}")
+                # Generate and queue Pinterest pin
+                await self.queue_pinterest_pin(domain_name, keyword, article_data["title"])
+            else:
+                self.log_error(f"Failed to create article for {keyword}: {result.get('error')}")
         
-        self.log_info(f"Generated {len(keywords)} initial articles for {domain_name}")
+        created = sum(1 for result in results if result.get("ok"))
+        self.log_info(f"Generated {created}/{len(keywords)} initial articles for {domain_name}")
     
     async def start_content_pipeline(self, domain_data: Dict[str, Any]):
         """İçerik pipeline'ını başlat - sürekli çalışan sistem"""
@@ -711,57 +706,20 @@ const readingTime = Math.ceil((Astro.slots.default().length || 1000) / 200) + '
         self.log_info(f"Pinterest automation started for {domain_name}")
     
     async def deploy_to_cloudflare(self, domain_data: Dict[str, Any]):
-        """Cloudflare Pages'e deploy et"""
+        """Cloudflare Pages'e deploy et (site-builder servisi üzerinden)"""
         domain_name = domain_data["name"]
-        site_path = Path(self.base_path) / "sites" / domain_name
         
-        try:
-            # Install dependencies
-            subprocess.run(
-                ["pnpm", "install"], 
-                cwd=site_path, 
-                check=True,
-                capture_output=True
-            )
-            
-            # Build site
-            subprocess.run(
-                ["pnpm", "build"], 
-                cwd=site_path, 
-                check=True,
-                capture_output=True
-            )
-            
-            # Deploy to Cloudflare Pages
-            project_name = domain_name.replace(".", "-")
-            
-            deploy_cmd = [
-                "npx", "wrangler", "pages", "deploy", 
-                str(site_path / "dist"),
-                "--project-name", project_name,
-                "--compatibility-date", "2025-01-15"
-            ]
-            
-            result = subprocess.run(
-                deploy_cmd, 
-                check=True,
-                capture_output=True,
-                text=True
-            )
-            
-            self.log_info(f"Successfully deployed {domain_name} to Cloudflare Pages")
-            
-            # Store deployment info
-            self.redis_client.hset(f"deployment:{domain_name}", mapping={
-                "status": "deployed",
-                "project_name": project_name,
-                "deploy_time": datetime.now().isoformat(),
-                "cloudflare_url": f"https://{project_name}.pages.dev"
-            })
-            
-        except subprocess.CalledProcessError as e:
-            self.log_error(f"Deployment failed for {domain_name}: {e}")
-            raise
+        # Build/deploy tek merkezden: domain lock + paralellik limiti site-builder'da
+        job_id = enqueue_build(self.redis_client, domain_name, ["install", "build", "deploy"], source="auto-deployment")
+        result = await asyncio.to_thread(wait_for_build, self.redis_client, job_id)
+        
+        if not result:
+            raise RuntimeError(f"Deployment timed out for {domain_name}")
+        if not result["success"]:
+            self.log_error(f"Deployment failed for {domain_name}: {result.get('error')}")
+            raise RuntimeError(f"Deployment failed for {domain_name}: {result.get('error')}")
+        
+        self.log_info(f"Successfully deployed {domain_name} to Cloudflare Pages ({result['stages']})")
     
     def generate_article_title(self, keyword: str, niche_config: Dict[str, Any]) -> str:
         """Article title oluştur"""
@@ -951,8 +909,11 @@ Remember that success with {keyword} is a journey, not a destination. Continue t
     
     async def create_seo_files(self, domain_data: Dict[str, Any], site_path: Path):
         """SEO dosyaları oluştur (robots.txt, sitemap, etc.)"""
-        # SEO files implementation would go here
-        pass
+        # sitemap.xml ve rss.xml content-api tarafından her ingest'te artımlı güncellenir
+        domain_name = domain_data["name"]
+        robots = f"User-agent: *\nAllow: /\n\nSitemap: https://{domain_name}/sitemap.xml\n"
+        
+        write_site_file(str(site_path), "public/robots.txt", robots)
     
     async def setup_analytics(self, domain_data: Dict[str, Any]):
         """Analytics kurulumu yap"""
@@ -974,25 +935,33 @@ async def main():
     print("🚀 Auto Domain Deployer started")
     print("🔄 Monitoring for new domain deployments...")
     
+    # Deployment (pnpm install + build + wrangler) uzun sürebilir
+    queue = JobQueue(deployer.redis_client, "domain_deployment_queue", visibility_timeout=1800)
+    
     while True:
+        job = None
         try:
-            # Check for new domains to deploy
-            deployment_request = deployer.redis_client.rpop("domain_deployment_queue")
+            # Wait for new domains to deploy
+            job = await asyncio.to_thread(queue.reserve, 10)
             
-            if deployment_request:
-                domain_data = json.loads(deployment_request)
+            if job:
+                domain_data = json.loads(job.raw)
                 print(f"📦 Starting deployment for {domain_data['name']}")
                 
-                result = await deployer.deploy_domain(domain_data)
+                # Build beklemesi dahil deploy visibility timeout'u aşabilir
+                with job.keepalive():
+                    result = await deployer.deploy_domain(domain_data)
                 
                 if result["success"]:
                     print(f"✅ Successfully deployed {domain_data['name']}")
                 else:
                     print(f"❌ Failed to deploy {domain_data['name']}: {result.get('error')}")
-            
-            await asyncio.sleep(10)  # Check every 10 seconds
+                
+                job.ack()
             
         except Exception as e:
+            if job:
+                job.nack(str(e))
             print(f"❌ Auto Deployer error: {e}")
             await asyncio.sleep(30)
 
@@ -0,0 +1,125 @@
+# /srv/auto-adsense/services/auto-deployment/pages_mock.py
+import json
+import uuid
+import argparse
+import threading
+from email.parser import BytesParser
+from email.policy import HTTP
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+from typing import Dict, Any, List, Optional
+
+
+class MockPagesState:
+    """Mock'un bellekteki durumu: yüklenen asset'ler, deploy'lar, istek sayaçları"""
+
+    def __init__(self):
+        self.lock = threading.Lock()
+        self.assets: Dict[str, int] = {}
+        self.deployments: List[Dict[str, Any]] = []
+        self.uploaded_files = 0
+        self.uploaded_bytes = 0
+
+    def snapshot(self) -> Dict[str, Any]:
+        with self.lock:
+            return {
+                "assets": len(self.assets),
+                "deployments": len(self.deployments),
+                "uploaded_files": self.uploaded_files,
+                "uploaded_bytes": self.uploaded_bytes
+            }
+
+
+class MockPagesHandler(BaseHTTPRequestHandler):
+    """Cloudflare Pages Direct Upload API'nin PagesUploader'ın kullandığı kısmı
+
+    CLOUDFLARE_API_BASE=http://localhost:8788/client/v4 ile kullanılır.
+    `GET /stats` yüklenen dosya/bayt sayılarını verir.
+    """
+
+    state: MockPagesState = MockPagesState()
+
+    def do_GET(self):
+        if self.path == "/stats":
+            return self.send_json(self.state.snapshot(), wrap=False)
+        if self.path.endswith("/upload-token"):
+            return self.send_json({"jwt": "mock-jwt"})
+        self.send_json(None, status=404)
+
+    def do_POST(self):
+        body = self.rfile.read(int(self.headers.get("Content-Length", 0)))
+
+        if self.path.endswith("/pages/assets/check-missing"):
+            hashes = json.loads(body)["hashes"]
+            with self.state.lock:
+                return self.send_json([h for h in hashes if h not in self.state.assets])
+
+        if self.path.endswith("/pages/assets/upload"):
+            with self.state.lock:
+                for item in json.loads(body):
+                    # base64 uzunluğundan ham boyut
+                    size = len(item["value"]) * 3 // 4 - item["value"][-2:].count("=")
+                    self.state.assets[item["key"]] = size
+                    self.state.uploaded_files += 1
+                    self.state.uploaded_bytes += size
+            return self.send_json(None)
+
+        if self.path.endswith("/pages/assets/upsert-hashes"):
+            return self.send_json(True)
+
+        if self.path.endswith("/deployments"):
+            form = self.parse_form(body)
+            manifest = json.loads(form.get("manifest") or "{}")
+            with self.state.lock:
+                unknown = [path for path, digest in manifest.items() if digest not in self.state.assets]
+                if unknown:
+                    return self.send_json(None, status=400, errors=[f"missing assets: {unknown[:5]}"])
+
+                project = self.path.split("/projects/")[1].split("/")[0]
+                deployment = {"id": uuid.uuid4().hex, "url": f"https://{uuid.uuid4().hex[:8]}.{project}.pages.dev",
+                              "files": len(manifest)}
+                self.state.deployments.append(deployment)
+            return self.send_json(deployment)
+
+        self.send_json(None, status=404)
+
+    def parse_form(self, body: bytes) -> Dict[str, str]:
+        content_type = self.headers.get("Content-Type", "")
+        if content_type.split(";")[0].strip() != "multipart/form-data":
+            return {}
+
+        message = BytesParser(policy=HTTP).parsebytes(
+            f"Content-Type: {content_type}\r\n\r\n".encode() + body
+        )
+        return {part.get_param("name", header="content-disposition"): part.get_content()
+                for part in message.iter_parts()}
+
+    def send_json(self, result: Any, status: int = 200, errors: Optional[List[str]] = None, wrap: bool = True):
+        payload = {"success": status < 400, "errors": errors or [], "result": result} if wrap else result
+        data = json.dumps(payload).encode()
+        self.send_response(status)
+        self.send_header("Content-Type", "application/json")
+        self.send_header("Content-Length", str(len(data)))
+        self.end_headers()
+        self.wfile.write(data)
+
+    def log_message(self, format, *args):
+        pass
+
+
+def serve(port: int = 8788) -> ThreadingHTTPServer:
+    """Mock'u arka planda başlat
+
+    Elle/script ile deneme için: PagesUploader'ı CLOUDFLARE_API_BASE=
+    http://127.0.0.1:{port}/client/v4 ile buraya yönlendir, sayaçları /stats'tan oku.
+    """
+    server = ThreadingHTTPServer(("127.0.0.1", port), MockPagesHandler)
+    threading.Thread(target=server.serve_forever, daemon=True).start()
+    return server
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Local mock of the Cloudflare Pages upload API")
+    parser.add_argument("--port", type=int, default=8788)
+    args = parser.parse_args()
+
+    print(f"🧪 Pages mock on http://127.0.0.1:{args.port}/client/v4")
+    ThreadingHTTPServer(("0.0.0.0", args.port), MockPagesHandler).serve_forever()
@@ -0,0 +1,155 @@
+# /srv/auto-adsense/services/auto-deployment/pages_upload.py
+import os
+import json
+import base64
+import hashlib
+import mimetypes
+import redis
+import requests
+from pathlib import Path
+from typing import Dict, Any, List, Optional
+
+try:
+    # wrangler ile aynı asset hash'i (yoksa sha256; anahtar yine içerik adresli)
+    from blake3 import blake3
+except ImportError:
+    blake3 = None
+
+# Pages bunları manifest'e değil form alanı olarak bekler
+SPECIAL_FILES = ["_headers", "_redirects", "_routes.json"]
+IGNORED_NAMES = {"_worker.js", "functions", "node_modules", ".git", ".DS_Store"}
+
+UPLOAD_BATCH_FILES = 1000
+UPLOAD_BATCH_BYTES = 40 * 1024 * 1024
+
+
+class PagesUploader:
+    """Cloudflare Pages Direct Upload, yalnızca eksik dosyalarla
+
+    Manifest'in (`/yol` -> içerik hash'i) tüm hash'leri check-missing'e
+    sorulur (wrangler gibi; ucuz, hiçbir şey yüklemez) ve yalnızca
+    Cloudflare'ın eksik dediği dosyalar yüklenir: pratikte yeni makale
+    sayfası, index, liste, sitemap ve değişen asset'ler. Pages deploy'ları
+    tam snapshot olduğu için deployment isteği tüm manifest'i içerir.
+    Redis'teki son manifest (`pages_manifest:{domain}`) yalnızca
+    değişen/silinen istatistikleri için; bayat kalsa da deploy bozulmaz.
+
+    `CLOUDFLARE_API_BASE` ile yerel mock'a (pages_mock.py) yönlendirilebilir.
+    """
+
+    def __init__(self, redis_client: redis.Redis, api_base: Optional[str] = None,
+                 account_id: Optional[str] = None, api_token: Optional[str] = None):
+        self.redis_client = redis_client
+        self.api_base = (api_base or os.getenv("CLOUDFLARE_API_BASE", "https://api.cloudflare.com/client/v4")).rstrip("/")
+        self.account_id = account_id or os.getenv("CLOUDFLARE_ACCOUNT_ID", "")
+        self.api_token = api_token or os.getenv("CLOUDFLARE_API_TOKEN", "")
+        self.session = requests.Session()
+
+    @property
+    def enabled(self) -> bool:
+        return bool(self.account_id and self.api_token)
+
+    def file_hash(self, path: Path) -> str:
+        content = base64.b64encode(path.read_bytes())
+        extension = path.suffix.lstrip(".").encode()
+        if blake3:
+            return blake3(content + extension).hexdigest()[:32]
+        return hashlib.sha256(content + extension).hexdigest()[:32]
+
+    def build_manifest(self, dist: Path) -> Dict[str, str]:
+        manifest = {}
+        for path in sorted(dist.rglob("*")):
+            relative = path.relative_to(dist)
+            if not path.is_file() or IGNORED_NAMES.intersection(relative.parts) or str(relative) in SPECIAL_FILES:
+                continue
+            manifest["/" + relative.as_posix()] = self.file_hash(path)
+        return manifest
+
+    def previous_manifest(self, domain: str) -> Dict[str, str]:
+        raw = self.redis_client.get(f"pages_manifest:{domain}")
+        return json.loads(raw) if raw else {}
+
+    def deploy(self, domain: str, dist: Path) -> Dict[str, Any]:
+        """dist'i deploy et; yükleme istatistiklerini ve deploy URL'ini döndür"""
+        project_name = domain.replace(".", "-")
+        manifest = self.build_manifest(dist)
+        previous = self.previous_manifest(domain)
+
+        changed = [path for path, digest in manifest.items() if previous.get(path) != digest]
+        removed = [path for path in previous if path not in manifest]
+
+        jwt = self.upload_token(project_name)
+
+        # Redis'teki manifest bayat olabilir (proje yeniden kuruldu, asset süresi doldu,
+        # başka yoldan deploy); Cloudflare'da ne olduğunu her seferinde Cloudflare'a sor
+        missing = set(self.check_missing(jwt, sorted(set(manifest.values())))) if manifest else set()
+
+        files_by_hash = {digest: dist / path.lstrip("/") for path, digest in manifest.items()}
+        uploaded_bytes = self.upload(jwt, [(digest, files_by_hash[digest]) for digest in sorted(missing)])
+
+        # Değişmeyen asset'lerin de ömrünü uzat
+        self.request("POST", "/pages/assets/upsert-hashes", jwt=jwt, json={"hashes": sorted(set(manifest.values()))})
+
+        deployment = self.create_deployment(project_name, manifest, dist)
+        self.redis_client.set(f"pages_manifest:{domain}", json.dumps(manifest))
+
+        return {
+            "url": deployment.get("url") or f"https://{project_name}.pages.dev",
+            "deployment_id": deployment.get("id"),
+            "files_total": len(manifest),
+            "files_changed": len(changed),
+            "files_removed": len(removed),
+            "files_uploaded": len(missing),
+            "bytes_uploaded": uploaded_bytes,
+            "changed": changed[:50]
+        }
+
+    def upload_token(self, project_name: str) -> str:
+        result = self.request("GET", f"/accounts/{self.account_id}/pages/projects/{project_name}/upload-token")
+        return result["jwt"]
+
+    def check_missing(self, jwt: str, hashes: List[str]) -> List[str]:
+        return self.request("POST", "/pages/assets/check-missing", jwt=jwt, json={"hashes": hashes})
+
+    def upload(self, jwt: str, files: List[tuple]) -> int:
+        """Eksik dosyaları adet/boyut sınırlı batch'ler halinde yükle"""
+        total = 0
+        batch, batch_bytes = [], 0
+
+        for digest, path in files:
+            content = path.read_bytes()
+            if batch and (len(batch) >= UPLOAD_BATCH_FILES or batch_bytes + len(content) > UPLOAD_BATCH_BYTES):
+                self.request("POST", "/pages/assets/upload", jwt=jwt, json=batch)
+                batch, batch_bytes = [], 0
+
+            batch.append({
+                "key": digest,
+                "value": base64.b64encode(content).decode(),
+                "metadata": {"contentType": mimetypes.guess_type(path.name)[0] or "application/octet-stream"},
+                "base64": True
+            })
+            batch_bytes += len(content)
+            total += len(content)
+
+        if batch:
+            self.request("POST", "/pages/assets/upload", jwt=jwt, json=batch)
+
+        return total
+
+    def create_deployment(self, project_name: str, manifest: Dict[str, str], dist: Path) -> Dict[str, Any]:
+        files = {"manifest": (None, json.dumps(manifest))}
+        for name in SPECIAL_FILES:
+            if (dist / name).is_file():
+                files[name] = (name, (dist / name).read_bytes())
+
+        return self.request("POST", f"/accounts/{self.account_id}/pages/projects/{project_name}/deployments", files=files)
+
+    def request(self, method: str, path: str, jwt: Optional[str] = None, **kwargs) -> Any:
+        headers = {"Authorization": f"Bearer {jwt or self.api_token}"}
+        response = self.session.request(method, self.api_base + path, headers=headers, timeout=120, **kwargs)
+        response.raise_for_status()
+
+        body = response.json()
+        if not body.get("success", False):
+            raise RuntimeError(f"Pages API {path} failed: {body.get('errors')}")
+        return body.get("result")
@@ -0,0 +1,109 @@
+# /srv/auto-adsense/services/auto-deployment/pnpm_store.py
+import os
+import json
+import shutil
+import hashlib
+import redis
+from pathlib import Path
+from typing import Dict, List, Optional, Tuple
+
+# Kurulumu etkileyen dosyalar; değişmedikçe node_modules olduğu gibi kullanılır
+INSTALL_INPUTS = ["package.json", "pnpm-lock.yaml"]
+INSTALL_MARKER = ".mdkit-install"
+
+
+class PnpmStore:
+    """Tüm siteler için ortak, içerik adresli pnpm store'u
+
+    Store site kit volume'unda durur; pnpm paketleri oradan node_modules'a
+    hardlink'ler, böylece aynı astro sürümü diskte ve ağda bir kez bulunur.
+    Kurulum sırası: girdiler değişmediyse atla (skip) -> lockfile ile
+    `--offline` kurulum (hit) -> eksik paketleri indirerek kurulum (miss).
+    """
+
+    def __init__(self, redis_client: redis.Redis, kit_root: Path, store_dir: Optional[str] = None):
+        self.redis_client = redis_client
+        self.kit_root = Path(kit_root)
+        self.shared_root = self.kit_root / "packages" / "shared"
+        self.store_dir = Path(store_dir or os.getenv("PNPM_STORE_DIR", str(self.kit_root / ".pnpm-store")))
+        self.store_dir.mkdir(parents=True, exist_ok=True)
+
+    def install_digest(self, site_path: Path) -> str:
+        """package.json + lockfile + @mdkit/shared içeriği (file: bağımlılığı kopyalanır)"""
+        digest = hashlib.sha256()
+
+        for name in INSTALL_INPUTS:
+            path = site_path / name
+            if path.is_file():
+                digest.update(name.encode())
+                digest.update(path.read_bytes())
+
+        for path in sorted(p for p in self.shared_root.rglob("*") if p.is_file() and "node_modules" not in p.parts):
+            digest.update(str(path.relative_to(self.shared_root)).encode())
+            digest.update(path.read_bytes())
+
+        return digest.hexdigest()
+
+    def is_current(self, site_path: Path, digest: str) -> bool:
+        marker = site_path / "node_modules" / INSTALL_MARKER
+        return marker.is_file() and marker.read_text().strip() == digest
+
+    def mark_installed(self, site_path: Path, digest: str):
+        (site_path / "node_modules" / INSTALL_MARKER).write_text(digest)
+
+    def seed_lockfile(self, site_path: Path) -> Optional[Path]:
+        """Lockfile'ı olmayan yeni site için aynı bağımlılıklara sahip bir siteden kopyala
+
+        Importer `.` ve `file:../../packages/shared` tüm sitelerde aynı olduğundan
+        lockfile siteler arası taşınabilir; böylece ilk kurulum da offline olabilir.
+        """
+        lockfile = site_path / "pnpm-lock.yaml"
+        if lockfile.exists():
+            return None
+
+        wanted = self.dependency_spec(site_path)
+        for candidate in sorted((self.kit_root / "sites").iterdir()):
+            if candidate == site_path or not (candidate / "pnpm-lock.yaml").is_file():
+                continue
+            if self.dependency_spec(candidate) == wanted:
+                shutil.copy2(candidate / "pnpm-lock.yaml", lockfile)
+                return candidate
+
+        return None
+
+    def dependency_spec(self, site_path: Path) -> Dict[str, Dict[str, str]]:
+        try:
+            package = json.loads((site_path / "package.json").read_text())
+        except (OSError, ValueError):
+            return {}
+        return {key: package.get(key, {}) for key in ("dependencies", "devDependencies", "optionalDependencies")}
+
+    def install_commands(self, site_path: Path) -> List[Tuple[str, List[str]]]:
+        """Sırayla denenecek (sonuç, komut) çiftleri"""
+        base = ["pnpm", "install", "--store-dir", str(self.store_dir)]
+        commands = []
+
+        if (site_path / "pnpm-lock.yaml").exists():
+            commands.append(("hit", base + ["--frozen-lockfile", "--offline"]))
+            commands.append(("miss", base + ["--frozen-lockfile", "--prefer-offline"]))
+
+        # Lockfile yoksa ya da package.json ile uyuşmuyorsa lockfile'ı güncelle
+        commands.append(("miss", base + ["--no-frozen-lockfile", "--prefer-offline"]))
+        return commands
+
+    def record(self, domain: str, outcome: str, seconds: float):
+        pipe = self.redis_client.pipeline()
+        pipe.hincrby("pnpm_store:stats", outcome, 1)
+        pipe.hincrbyfloat("pnpm_store:stats", f"{outcome}_seconds", seconds)
+        pipe.lpush("pnpm_store:history", json.dumps({"domain": domain, "outcome": outcome, "seconds": round(seconds, 2)}))
+        pipe.ltrim("pnpm_store:history", 0, 199)
+        pipe.execute()
+
+    def stats(self) -> Dict[str, float]:
+        raw = self.redis_client.hgetall("pnpm_store:stats")
+        stats = {key: float(value) for key, value in raw.items()}
+
+        hits = stats.get("hit", 0) + stats.get("skip", 0)
+        total = hits + stats.get("miss", 0)
+        stats["hit_rate"] = round(hits / total, 3) if total else 0.0
+        return stats
@@ -0,0 +1,362 @@
+# /srv/auto-adsense/services/auto-deployment/site_builder.py
+import os
+import sys
+import json
+import time
+import fcntl
+import hashlib
+import redis
+import asyncio
+import argparse
+from datetime import datetime
+from pathlib import Path
+from typing import Dict, Any, List, Optional
+from job_queue import JobQueue
+from build_queue import QUEUE_NAME, enqueue_build, claim_build, wait_for_build
+from pnpm_store import PnpmStore
+from pages_upload import PagesUploader
+from site_files import read_generation
+
+# Lock sahibi değilse sil (başka bir build'in lock'una dokunma)
+RELEASE_LOCK_SCRIPT = """
+if redis.call('GET', KEYS[1]) == ARGV[1] then
+    return redis.call('DEL', KEYS[1])
+end
+return 0
+"""
+
+STAGE_TIMEOUTS = {"install": 600, "build": 300, "deploy": 300}
+
+
+class SiteBuilder:
+    """Tüm site build/deploy işlerinin tek sahibi
+
+    Diğer servisler `site_build_queue`'ya iş bırakır (bkz. build_queue.py).
+    Her domain için Redis lock tutulur; aynı site iki yerde aynı anda build
+    edilip `dist` bozulamaz. Farklı domainler CPU'ya göre sınırlı sayıda
+    paralel build edilir ve her aşamanın süresi kaydedilir.
+    """
+
+    def __init__(self, base_path: str = "/srv/auto-adsense/multidomain_site_kit", workers: Optional[int] = None):
+        self.redis_client = redis.Redis(
+            host=os.getenv("REDIS_HOST", "redis"),
+            port=int(os.getenv("REDIS_PORT", "6379")),
+            decode_responses=True
+        )
+
+        self.base_path = Path(base_path)
+        self.workers = workers or int(os.getenv("SITE_BUILD_CONCURRENCY", "0")) or max(1, (os.cpu_count() or 2) // 2)
+        self.lock_ttl = int(os.getenv("SITE_BUILD_LOCK_TTL", "1800"))
+
+        self.queue = JobQueue(self.redis_client, QUEUE_NAME, visibility_timeout=self.lock_ttl)
+        self.release_lock = self.redis_client.register_script(RELEASE_LOCK_SCRIPT)
+        self.pnpm_store = PnpmStore(self.redis_client, self.base_path)
+        self.pages = PagesUploader(self.redis_client)
+
+        self.log_info(f"Site Builder initialized ({self.workers} parallel builds)")
+
+    async def run(self):
+        await self.warm_store()
+        await asyncio.gather(*[self.worker(i) for i in range(self.workers)])
+
+    async def worker(self, index: int):
+        while True:
+            job = None
+            try:
+                job = await asyncio.to_thread(self.queue.reserve, 5)
+                if not job:
+                    continue
+
+                request = json.loads(job.raw)
+                domain = request["domain"]
+                token = f"{self.queue.consumer}:{index}:{request['id']}"
+
+                lock_file = self.acquire_locks(domain, token)
+                if lock_file is None:
+                    # Aynı domain başka yerde build ediliyor; deneme saymadan biraz sonra tekrar
+                    pipe = self.redis_client.pipeline()
+                    pipe.zadd(self.queue.delayed_key, {job.raw: time.time() + 15})
+                    pipe.lrem(self.queue.processing_key, 1, job.raw)
+                    pipe.execute()
+                    continue
+
+                try:
+                    # Bundan sonra gelen istekler yeni bir iş açsın; bu işe eklenen aşamaları al
+                    request = claim_build(self.redis_client, request)
+                    result = await self.process(request)
+                finally:
+                    self.release_locks(domain, token, lock_file)
+
+                self.redis_client.set(f"site_build_result:{request['id']}", json.dumps(result), ex=86400)
+
+                if result["success"]:
+                    job.ack()
+                else:
+                    job.nack(result.get("error", "build failed"))
+
+            except Exception as e:
+                if job:
+                    job.nack(str(e))
+                self.log_error(f"Builder worker {index} error: {e}")
+                await asyncio.sleep(5)
+
+    def acquire_locks(self, domain: str, token: str):
+        """Redis lock (servis replikaları arası) + site dizininde flock (build-all.sh ile)"""
+        if not self.redis_client.set(f"site_build_lock:{domain}", token, nx=True, ex=self.lock_ttl):
+            return None
+
+        lock_file = open(self.base_path / "sites" / domain / ".build.lock", "w")
+        try:
+            fcntl.flock(lock_file, fcntl.LOCK_EX | fcntl.LOCK_NB)
+        except OSError:
+            lock_file.close()
+            self.release_lock(keys=[f"site_build_lock:{domain}"], args=[token])
+            return None
+
+        return lock_file
+
+    def release_locks(self, domain: str, token: str, lock_file):
+        fcntl.flock(lock_file, fcntl.LOCK_UN)
+        lock_file.close()
+        self.release_lock(keys=[f"site_build_lock:{domain}"], args=[token])
+
+    async def process(self, request: Dict[str, Any]) -> Dict[str, Any]:
+        """İstenen aşamaları sırayla çalıştır, aşama sürelerini döndür"""
+        domain = request["domain"]
+        site_path = self.base_path / "sites" / domain
+        timings: Dict[str, float] = {}
+        started = time.monotonic()
+        # Yazımlar atomik; build sırasında gelen yazımları generation farkından anlarız
+        generation = read_generation(str(site_path))
+        result: Dict[str, Any] = {"id": request["id"], "domain": domain, "stages": timings, "generation": generation}
+
+        self.log_info(f"Building {domain} ({', '.join(request['stages'])}) for {request.get('source') or 'unknown'}")
+
+        for stage in request["stages"]:
+            stage_started = time.monotonic()
+            if stage == "install":
+                ok, output, result["install_cache"] = await self.install(domain, site_path)
+            elif stage == "deploy" and self.pages.enabled:
+                ok, output, result["upload"] = await self.upload(domain, site_path)
+            else:
+                ok, output = await self.run_stage(stage, domain, site_path)
+            timings[stage] = round(time.monotonic() - stage_started, 2)
+
+            # Uzun build'lerde visibility timeout'u tazele
+            self.queue.extend()
+
+            if not ok:
+                self.log_error(f"{domain}: {stage} failed after {timings[stage]}s: {output[-2000:]}")
+                result.update(success=False, error=f"{stage} failed", total=round(time.monotonic() - started, 2))
+                self.record(domain, result)
+                return result
+
+            self.log_info(f"{domain}: {stage} done in {timings[stage]}s")
+
+        result.update(success=True, total=round(time.monotonic() - started, 2))
+        self.redis_client.set(f"site_build:generation:{domain}", generation)
+
+        if "build" in request["stages"] and read_generation(str(site_path)) != generation:
+            # Build yazımların bir kısmını görmemiş olabilir; bir tur daha
+            follow_up = enqueue_build(self.redis_client, domain, [s for s in request["stages"] if s != "install"],
+                                      source="generation-changed")
+            self.log_info(f"{domain}: content changed during build (gen {generation}), queued {follow_up}")
+
+        if "deploy" in request["stages"]:
+            self.record_deployment(domain, result.get("upload"))
+        if request.get("manifest_digest"):
+            self.redis_client.set(f"build_manifest:{domain}", request["manifest_digest"])
+
+        self.record(domain, result)
+        return result
+
+    async def warm_store(self):
+        """Her farklı lockfile'ın paketlerini store'a indir (node_modules'a dokunmaz)"""
+        seen = set()
+        for site_path in sorted((self.base_path / "sites").iterdir()):
+            lockfile = site_path / "pnpm-lock.yaml"
+            if not lockfile.is_file():
+                continue
+
+            lock_digest = hashlib.sha256(lockfile.read_bytes()).hexdigest()
+            if lock_digest in seen:
+                continue
+            seen.add(lock_digest)
+
+            command = ["pnpm", "fetch", "--store-dir", str(self.pnpm_store.store_dir)]
+            ok, output = await self.run_command(command, site_path, STAGE_TIMEOUTS["install"])
+            if not ok:
+                self.log_error(f"Store warm-up failed for {site_path.name}: {output[-500:]}")
+
+        self.log_info(f"pnpm store warmed ({len(seen)} lockfiles)")
+
+    async def install(self, domain: str, site_path: Path) -> tuple:
+        """Ortak store'dan kurulum; (ok, output, skip/hit/miss) döndür"""
+        started = time.monotonic()
+        digest = self.pnpm_store.install_digest(site_path)
+
+        if self.pnpm_store.is_current(site_path, digest):
+            self.pnpm_store.record(domain, "skip", time.monotonic() - started)
+            return True, "node_modules up to date", "skip"
+
+        seeded_from = self.pnpm_store.seed_lockfile(site_path)
+        if seeded_from:
+            self.log_info(f"{domain}: lockfile seeded from {seeded_from.name}")
+
+        output = ""
+        for outcome, command in self.pnpm_store.install_commands(site_path):
+            ok, output = await self.run_command(command, site_path, STAGE_TIMEOUTS["install"])
+            if ok:
+                # Lockfile kurulum sırasında güncellenmiş olabilir
+                self.pnpm_store.mark_installed(site_path, self.pnpm_store.install_digest(site_path))
+                self.pnpm_store.record(domain, outcome, time.monotonic() - started)
+                return True, output, outcome
+
+        return False, output, "miss"
+
+    async def upload(self, domain: str, site_path: Path) -> tuple:
+        """Yalnızca önceki deploy'dan bu yana değişen dosyaları yükle"""
+        try:
+            upload = await asyncio.to_thread(self.pages.deploy, domain, site_path / "dist")
+        except Exception as e:
+            return False, str(e), None
+
+        self.log_info(
+            f"{domain}: uploaded {upload['files_uploaded']}/{upload['files_total']} files "
+            f"({upload['bytes_uploaded'] / 1024:.1f} KB, {upload['files_changed']} changed)"
+        )
+        return True, upload["url"], upload
+
+    def stage_command(self, stage: str, domain: str, site_path: Path) -> List[str]:
+        if stage == "build":
+            return ["pnpm", "build"]
+        if stage == "deploy":
+            return [
+                "npx", "wrangler", "pages", "deploy",
+                str(site_path / "dist"),
+                "--project-name", domain.replace(".", "-"),
+                "--compatibility-date", "2025-01-15"
+            ]
+        raise ValueError(f"Unknown build stage: {stage}")
+
+    async def run_stage(self, stage: str, domain: str, site_path: Path) -> tuple:
+        return await self.run_command(self.stage_command(stage, domain, site_path), site_path, STAGE_TIMEOUTS[stage])
+
+    async def run_command(self, command: List[str], cwd: Path, timeout: int) -> tuple:
+        """Komutu async subprocess olarak çalıştır (worker'lar birbirini bloklamaz)"""
+        process = await asyncio.create_subprocess_exec(
+            *command,
+            cwd=cwd,
+            stdout=asyncio.subprocess.PIPE,
+            stderr=asyncio.subprocess.STDOUT
+        )
+
+        try:
+            output, _ = await asyncio.wait_for(process.communicate(), timeout=timeout)
+        except asyncio.TimeoutError:
+            process.kill()
+            await process.wait()
+            return False, f"{command[0]} {command[1]} timed out after {timeout}s"
+
+        return process.returncode == 0, output.decode(errors="replace")
+
+    def record(self, domain: str, result: Dict[str, Any]):
+        """Aşama sürelerini domain bazında ve genel geçmişte sakla"""
+        stats = {f"last_{stage}_seconds": seconds for stage, seconds in result["stages"].items()}
+        stats.update({
+            "last_total_seconds": result["total"],
+            "last_status": "success" if result["success"] else "failed",
+            "last_build_at": datetime.now().isoformat()
+        })
+        if "install_cache" in result:
+            stats["last_install_cache"] = result["install_cache"]
+
+        pipe = self.redis_client.pipeline()
+        pipe.hset(f"site_build_stats:{domain}", mapping=stats)
+        pipe.lpush("site_build_history", json.dumps({**result, "finished_at": stats["last_build_at"]}))
+        pipe.ltrim("site_build_history", 0, 499)
+        pipe.execute()
+
+    def record_deployment(self, domain: str, upload: Optional[Dict[str, Any]] = None):
+        project_name = domain.replace(".", "-")
+        deploy_url = f"https://{project_name}.pages.dev"
+
+        deployment = {
+            "status": "deployed",
+            "project_name": project_name,
+            "deploy_time": datetime.now().isoformat(),
+            "cloudflare_url": deploy_url
+        }
+        if upload:
+            deployment.update({
+                "deployment_url": upload["url"],
+                "files_total": upload["files_total"],
+                "files_uploaded": upload["files_uploaded"],
+                "bytes_uploaded": upload["bytes_uploaded"]
+            })
+
+        self.redis_client.set(f"last_deploy:{domain}", deploy_url)
+        self.redis_client.hset(f"deployment:{domain}", mapping=deployment)
+
+    def log_info(self, message: str):
+        timestamp = datetime.now().strftime("%Y-%m-%d %H:%M:%S")
+        print(f"[{timestamp}] SITE-BUILDER: {message}")
+
+    def log_error(self, message: str):
+        timestamp = datetime.now().strftime("%Y-%m-%d %H:%M:%S")
+        print(f"[{timestamp}] SITE-BUILDER ERROR: {message}")
+
+def enqueue_main(args) -> int:
+    """CLI: build-all.sh / deploy-all.sh işleri kuyruğa buradan bırakır"""
+    redis_client = redis.Redis(
+        host=os.getenv("REDIS_HOST", "redis"),
+        port=int(os.getenv("REDIS_PORT", "6379")),
+        decode_responses=True
+    )
+
+    stages = args.stages.split(",")
+    job_ids = {domain: enqueue_build(redis_client, domain, stages, source="cli") for domain in args.domains}
+
+    if not args.wait:
+        print(json.dumps(job_ids))
+        return 0
+
+    failed = 0
+    for domain, job_id in job_ids.items():
+        result = wait_for_build(redis_client, job_id, timeout=args.timeout)
+        if result and result.get("success"):
+            print(f"✅ {domain}: {result['stages']} ({result['total']}s)")
+        else:
+            failed += 1
+            print(f"❌ {domain}: {result.get('error') if result else 'timed out'}")
+
+    return 1 if failed else 0
+
+async def main():
+    """Site Builder servisi"""
+    builder = SiteBuilder()
+
+    print("🏗️ Site Builder started")
+    await builder.run()
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Central site build/deploy service")
+    subparsers = parser.add_subparsers(dest="command")
+
+    enqueue_parser = subparsers.add_parser("enqueue", help="queue builds for one or more domains")
+    enqueue_parser.add_argument("domains", nargs="+")
+    enqueue_parser.add_argument("--stages", default="install,build")
+    enqueue_parser.add_argument("--wait", action="store_true")
+    enqueue_parser.add_argument("--timeout", type=int, default=1800)
+
+    subparsers.add_parser("cache-stats", help="shared pnpm store hit/miss counters")
+
+    args = parser.parse_args()
+
+    if args.command == "enqueue":
+        sys.exit(enqueue_main(args))
+    if args.command == "cache-stats":
+        print(json.dumps(SiteBuilder().pnpm_store.stats(), indent=2))
+        sys.exit(0)
+
+    asyncio.run(main())
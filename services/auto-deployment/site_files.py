@@ -0,0 +1,66 @@
+# /srv/auto-adsense/services/auto-deployment/site_files.py
+import os, fcntl, tempfile
+
+GENERATION_FILE = ".generation"
+
+def atomic_write(path, content, mode=0o644):
+    """Write via temp file in the same directory + fsync + rename.
+
+    A concurrent `pnpm build` sees either the old or the new file, never a
+    partially written one; after a crash the file is one or the other too.
+    """
+    data = content.encode("utf-8") if isinstance(content, str) else content
+    directory = os.path.dirname(path) or "."
+    os.makedirs(directory, exist_ok=True)
+    fd, tmp = tempfile.mkstemp(dir=directory, prefix=".tmp.")
+    try:
+        with os.fdopen(fd, "wb") as f:
+            f.write(data)
+            f.flush()
+            os.fsync(f.fileno())
+        os.chmod(tmp, mode)
+        os.replace(tmp, path)
+    except BaseException:
+        if os.path.exists(tmp):
+            os.unlink(tmp)
+        raise
+    # Persist the rename itself
+    dir_fd = os.open(directory, os.O_RDONLY)
+    try:
+        os.fsync(dir_fd)
+    finally:
+        os.close(dir_fd)
+
+def read_generation(site_dir):
+    """Per-site content generation; builds snapshot it to detect writes made while building"""
+    try:
+        with open(os.path.join(site_dir, GENERATION_FILE)) as f:
+            return int(f.read().strip() or 0)
+    except (OSError, ValueError):
+        return 0
+
+def bump_generation(site_dir):
+    os.makedirs(site_dir, exist_ok=True)
+    with open(os.path.join(site_dir, GENERATION_FILE + ".lock"), "w") as lock:
+        fcntl.flock(lock, fcntl.LOCK_EX)
+        generation = read_generation(site_dir) + 1
+        atomic_write(os.path.join(site_dir, GENERATION_FILE), str(generation))
+    return generation
+
+def write_site_file(site_dir, relative_path, content, skip_unchanged=False):
+    """Atomically write a file under a site and bump its generation
+
+    With skip_unchanged, identical content is not rewritten and None is
+    returned (nothing for the builder to pick up).
+    """
+    path = os.path.join(site_dir, relative_path)
+    if skip_unchanged:
+        data = content.encode("utf-8") if isinstance(content, str) else content
+        try:
+            with open(path, "rb") as f:
+                if f.read() == data:
+                    return None
+        except OSError:
+            pass
+    atomic_write(path, content)
+    return bump_generation(site_dir)
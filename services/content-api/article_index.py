@@ -0,0 +1,108 @@
+import os, re, json, fcntl
+from site_files import atomic_write
+from datetime import datetime, timezone
+
+TITLE_PATTERNS = [r'const title\s*=\s*("(?:[^"\\]|\\.)*")', r'<h1[^>]*>\s*([^<{]+?)\s*</h1>']
+DESCRIPTION_PATTERNS = [r'const desc(?:ription)?\s*=\s*("(?:[^"\\]|\\.)*")', r'\sdescription="([^"]*)"']
+INDEX_FIELDS = ("slug", "title", "description", "date", "updated", "keywords", "category", "image", "image_variants")
+
+class ArticleIndex:
+    """Per-domain article index at <site>/src/data/articles.json.
+
+    Listings, related links and sitemaps read this file instead of globbing
+    src/pages/articles. Updates take an flock on a sidecar lock file (shared
+    with the orchestrator's copy of this module) and replace the index via a
+    temp file + rename, so readers never see a half-written index.
+    """
+
+    def __init__(self, sites_root):
+        self.sites_root = sites_root
+
+    def path(self, domain):
+        return os.path.join(self.sites_root, domain, "src", "data", "articles.json")
+
+    def load(self, domain):
+        try:
+            with open(self.path(domain), encoding="utf-8") as f:
+                return json.load(f)
+        except (OSError, ValueError):
+            return {"domain": domain, "count": 0, "updated_at": None, "articles": []}
+
+    def upsert(self, domain, entries):
+        """Add or replace entries by slug; one read/write per call, however many entries"""
+        if not entries:
+            return self.load(domain)
+        path = self.path(domain)
+        os.makedirs(os.path.dirname(path), exist_ok=True)
+
+        with open(os.path.join(os.path.dirname(path), ".articles.lock"), "w") as lock:
+            fcntl.flock(lock, fcntl.LOCK_EX)
+            index = self.load(domain)
+            articles = {a["slug"]: a for a in index["articles"]}
+            for entry in entries:
+                previous = articles.get(entry["slug"])
+                if previous:
+                    # Keep the original publish date; record the update instead
+                    entry = {**entry, "date": previous["date"], "updated": entry["date"]}
+                articles[entry["slug"]] = entry
+
+            index["articles"] = sorted(articles.values(), key=lambda a: a["date"], reverse=True)
+            index["count"] = len(index["articles"])
+            index["updated_at"] = now_iso()
+            atomic_write(path, json.dumps(index, ensure_ascii=False, indent=1))
+        return index
+
+    def ensure(self, domain):
+        """Backfill the index from existing pages the first time a domain is seen"""
+        if not os.path.exists(self.path(domain)):
+            self.rebuild(domain)
+
+    def rebuild(self, domain):
+        """Scan src/pages/articles once; afterwards ingest keeps the index current"""
+        pages_dir = os.path.join(self.sites_root, domain, "src", "pages", "articles")
+        if not os.path.isdir(pages_dir):
+            return self.load(domain)
+        entries = []
+        for name in sorted(os.listdir(pages_dir)):
+            if not name.endswith(".astro"):
+                continue
+            page_path = os.path.join(pages_dir, name)
+            with open(page_path, encoding="utf-8") as f:
+                source = f.read()
+            slug = name[:-len(".astro")]
+            date = datetime.fromtimestamp(os.path.getmtime(page_path), timezone.utc).replace(microsecond=0).isoformat()
+            entries.append(index_entry(slug, {
+                "title": extract(source, TITLE_PATTERNS) or slug.replace("-", " ").title(),
+                "description": " ".join(re.sub(r"<[^>]+>", " ", extract(source, DESCRIPTION_PATTERNS) or "").split())[:160],
+                "publish_date": date,
+            }))
+        return self.upsert(domain, entries)
+
+def extract(source, patterns):
+    for pattern in patterns:
+        match = re.search(pattern, source)
+        if match:
+            value = match.group(1)
+            try:
+                return json.loads(value) if value.startswith('"') else value
+            except ValueError:
+                return value.strip('"')
+    return None
+
+def now_iso():
+    return datetime.now(timezone.utc).replace(microsecond=0).isoformat()
+
+def index_entry(slug, data):
+    """Index record for an ingested article (unknown fields are dropped)"""
+    keywords = data.get("keywords") or []
+    entry = {
+        "slug": slug,
+        "title": data.get("title", ""),
+        "description": data.get("description") or (data.get("body") or "")[:160],
+        "date": data.get("publish_date") or now_iso(),
+        "keywords": keywords if isinstance(keywords, list) else [keywords],
+        "category": data.get("category"),
+        "image": data.get("featured_image") or data.get("image"),
+        "image_variants": data.get("featured_image_variants") or [],
+    }
+    return {k: v for k, v in entry.items() if k in INDEX_FIELDS and v not in (None, "")}
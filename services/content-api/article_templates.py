@@ -0,0 +1,97 @@
+import os, json, hashlib, threading
+from collections import OrderedDict
+from jinja2 import Environment, FileSystemLoader
+
+DEFAULT_DOMAIN_CONFIG = {
+    "article_template": "article.astro.j2",
+    "layout": "ModernBase",
+    "niche": "tech",
+    "branding": {},
+}
+
+class ArticleTemplates:
+    """Per-domain article templates driven by config/domains.json.
+
+    Templates are compiled once at startup; Jinja's auto_reload recompiles a
+    template when its file changes, and domains.json is re-read when its mtime
+    moves. Rendered pages are cached by a hash of template + inputs.
+    """
+
+    def __init__(self, config_path, templates_dir=None, cache_size=256):
+        self.config_path = config_path
+        self.templates_dir = templates_dir or os.path.join(os.path.dirname(config_path), "templates")
+        self.env = Environment(loader=FileSystemLoader(self.templates_dir), auto_reload=True)
+        self.env.filters["json"] = json.dumps
+        self.lock = threading.Lock()
+        self.domains = {}
+        self.config_mtime = None
+        self.cache = OrderedDict()
+        self.cache_size = cache_size
+        self.hits = self.misses = 0
+
+        self.reload_config()
+        for name in self.env.list_templates():
+            self.env.get_template(name)
+
+    def reload_config(self):
+        try:
+            mtime = os.stat(self.config_path).st_mtime_ns
+        except OSError:
+            return
+        if mtime == self.config_mtime:
+            return
+        with self.lock:
+            if mtime == self.config_mtime:
+                return
+            try:
+                with open(self.config_path, encoding="utf-8") as f:
+                    self.domains = json.load(f)
+            except ValueError as e:
+                # Half-written edit; keep serving the previous config
+                print(f"domains.json reload failed: {e}")
+                return
+            self.config_mtime = mtime
+
+    def domain_config(self, domain):
+        self.reload_config()
+        return {**DEFAULT_DOMAIN_CONFIG, **self.domains.get(domain, {})}
+
+    def render(self, domain, slug, title, body, image=None, image_variants=()):
+        cfg = self.domain_config(domain)
+        template = self.env.get_template(cfg["article_template"])
+        context = {
+            "domain": domain,
+            "slug": slug,
+            "title": title,
+            "body": body,
+            "description": body[:160],
+            "layout": cfg["layout"],
+            "niche": cfg["niche"],
+            "branding": cfg.get("branding", {}),
+            "image": image,
+            "image_variants": list(image_variants),
+        }
+
+        key = hashlib.sha256(json.dumps(
+            [template.filename, os.path.getmtime(template.filename), context], sort_keys=True
+        ).encode()).hexdigest()
+
+        with self.lock:
+            if key in self.cache:
+                self.cache.move_to_end(key)
+                self.hits += 1
+                return self.cache[key]
+            self.misses += 1
+
+        page = template.render(**context)
+
+        with self.lock:
+            self.cache[key] = page
+            while len(self.cache) > self.cache_size:
+                self.cache.popitem(last=False)
+        return page
+
+    def stats(self):
+        with self.lock:
+            return {"templates": self.env.list_templates(), "domains": len(self.domains),
+                    "cache_entries": len(self.cache), "hits": self.hits, "misses": self.misses}
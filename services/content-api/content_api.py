@@ -1,132 +1,264 @@
-import os, json, re
-from flask import Flask, request, jsonify
+import os, json, time, tempfile, redis
+from threading import Semaphore
+from concurrent.futures import ThreadPoolExecutor, Future
+from flask import Flask, request, g
+from article_templates import ArticleTemplates
+from article_index import ArticleIndex, index_entry
+from site_feeds import SiteFeeds
+from site_files import write_site_file, bump_generation
+from slugs import SlugRegistry, IdempotencyStore, article_owner
 
 CONTENT_ROOT = os.environ.get("CONTENT_ROOT", "/workspace/multidomain_site_kit/sites")
+DOMAINS_CONFIG = os.environ.get("DOMAINS_CONFIG", "/workspace/multidomain_site_kit/config/domains.json")
+INGEST_WORKERS = int(os.environ.get("INGEST_WORKERS", "8"))
+BULK_MAX_ITEMS = int(os.environ.get("BULK_MAX_ITEMS", "500"))
+SLOW_REQUEST_MS = int(os.environ.get("CONTENT_API_SLOW_MS", "2000"))
 app = Flask(__name__)
+templates = ArticleTemplates(DOMAINS_CONFIG, cache_size=int(os.environ.get("RENDER_CACHE_ENTRIES", "256")))
+pool = ThreadPoolExecutor(max_workers=INGEST_WORKERS)
+redis_client = redis.Redis(host=os.environ.get("REDIS_HOST", "redis"), port=int(os.environ.get("REDIS_PORT", "6379")), decode_responses=True)
+slug_registry = SlugRegistry(redis_client)
+idempotency = IdempotencyStore(redis_client, ttl=int(os.environ.get("INGEST_IDEMPOTENCY_TTL", "86400")))
+article_index = ArticleIndex(CONTENT_ROOT)
+site_feeds = SiteFeeds(CONTENT_ROOT)
 
-def slugify(s):
-    import re
-    s = re.sub(r'[^a-zA-Z0-9\- ]', '', (s or '')).strip().lower()
-    s = re.sub(r'\s+', '-', s)
-    return s[:80] or 'post'
+def prepare_sites():
+    # Once per server start (gunicorn runs this in the master, before the workers fork)
+    if os.path.isdir(CONTENT_ROOT):
+        for domain in os.listdir(CONTENT_ROOT):
+            if os.path.isdir(os.path.join(CONTENT_ROOT, domain, "src")):
+                article_index.ensure(domain)
+                site_feeds.update(domain)
 
-@app.post("/ingest")
-def ingest():
-    data = request.get_json(force=True)
+@app.before_request
+def start_timer():
+    g.started = time.perf_counter()
+
+@app.after_request
+def record_timing(response):
+    elapsed = (time.perf_counter() - g.get("started", time.perf_counter())) * 1000
+    endpoint = request.endpoint or "unknown"
+    response.headers["Server-Timing"] = f"app;dur={elapsed:.1f}"
+    if elapsed >= SLOW_REQUEST_MS:
+        app.logger.warning("slow request %s %s -> %s in %.0f ms", request.method, request.path, response.status_code, elapsed)
+    try:
+        # Shared across gunicorn workers, so /health shows totals for the whole server
+        pipe = redis_client.pipeline()
+        pipe.hincrby("content_api:timing", f"{endpoint}:count", 1)
+        pipe.hincrbyfloat("content_api:timing", f"{endpoint}:ms", round(elapsed, 1))
+        pipe.execute()
+    except redis.RedisError:
+        pass
+    return response
+
+def request_timing():
+    try:
+        raw = redis_client.hgetall("content_api:timing")
+    except redis.RedisError:
+        return {}
+    timing = {}
+    for field, value in raw.items():
+        endpoint, metric = field.rsplit(":", 1)
+        timing.setdefault(endpoint, {})[metric] = float(value)
+    return {endpoint: {"count": int(t.get("count", 0)), "avg_ms": round(t.get("ms", 0) / t["count"], 1) if t.get("count") else 0}
+            for endpoint, t in timing.items()}
+
+def publish(domain, entries):
+    # Index first: the sitemap/RSS are rendered from it
+    article_index.upsert(domain, entries)
+    site_feeds.update(domain, [e["slug"] for e in entries])
+    bump_generation(os.path.join(CONTENT_ROOT, domain))
+
+def image_variants(url):
+    # image-generation's ImageStore: public filename -> digest -> metadata (WebP/AVIF + widths)
+    if not url:
+        return []
+    digest = redis_client.hget("image_store:files", url.rsplit("/", 1)[-1])
+    raw = redis_client.hget("image_store:index", digest) if digest else None
+    return json.loads(raw).get("variants", []) if raw else []
+
+def invalid_article(data):
+    if not isinstance(data, dict):
+        return "article must be an object"
+    if not data.get("domain") or not data.get("title"):
+        return "domain and title required"
+    return None
+
+def write_article(data):
+    error = invalid_article(data)
+    if error:
+        return {"ok":False,"error":error},400
     domain = data.get("domain"); title  = data.get("title")
-    body   = data.get("body",""); slug   = data.get("slug") or slugify(title)
+    body   = data.get("body","")
     
-    if not domain or not title: 
-        return {"ok":False,"error":"domain and title required"},400
+    # Same article -> same slug; a different article with a clashing slug gets -2, -3, ...
+    slug = slug_registry.allocate(domain, data, article_index.load)
+    image = data.get("featured_image") or data.get("image")
+    astro = templates.render(domain, slug, title, body, image, data.get("featured_image_variants") or image_variants(image))
     
-    site_dir = os.path.join(CONTENT_ROOT, domain, "src", "pages", "articles")
-    os.makedirs(site_dir, exist_ok=True)
-    page_path = os.path.join(site_dir, f"{slug}.astro")
-    
-    # Choose layout and niche based on domain
-    if domain == "hing.me":
-        layout = "ModernBase"
-        niche = "finance"
-        logo_emoji = "💰"
-        site_name = "Hing.me"
-        tagline = "Your Smart Finance Guide"
-    else:
-        layout = "ModernBase"
-        niche = "tech"
-        logo_emoji = "🎮"
-        site_name = "PlayU.co"
-        tagline = "Your Ultimate Gaming & Entertainment Hub"
-    
-    astro = f"""---
-import {layout} from '@mdkit/shared/src/layouts/{layout}.astro'
-import ModernAdSlot from '@mdkit/shared/src/components/ModernAdSlot.astro'
-import domains from '../../config.json'
-const cfg = domains['{domain}']
-const title = {json.dumps(title)}
-const desc = {json.dumps(body[:160])}
----
-<{layout} title={{title}} description={{desc}} locale={{cfg.locale}} adsenseClient={{cfg.adsense_client}} niche="{niche}">
-  <!-- Hero Section -->
-  <section style="background: linear-gradient(135deg, #f8fafc 0%, #f1f5f9 100%); padding: 60px 0;">
-    <div class="container">
-      <h1 style="font-size: clamp(28px, 4vw, 48px); font-weight: 800; color: #0f172a; margin-bottom: 20px; line-height: 1.2;">
-        {{title}}
-      </h1>
-      <p style="font-size: 18px; color: #64748b; max-width: 700px; line-height: 1.6; margin-bottom: 24px;">
-        Latest insights and expert analysis
-      </p>
-      <div style="display: inline-flex; align-items: center; gap: 8px; background: rgba(34, 197, 94, 0.1); padding: 8px 16px; border-radius: 50px; font-size: 14px; color: #16a34a; font-weight: 500;">
-        <span>✅</span>
-        Expert Verified Content
-      </div>
-    </div>
-  </section>
-
-  <!-- Header Ad -->
-  <div class="container">
-    <ModernAdSlot client={{cfg.adsense_client}} slot={{cfg.adsense_slots.header}} layout="header" />
-  </div>
-
-  <!-- Article Content -->
-  <section style="padding: 80px 0;">
-    <div class="container">
-      <div style="max-width: 800px; margin: 0 auto;">
-        <article style="background: white; padding: 48px; border-radius: 16px; box-shadow: 0 4px 20px rgba(0,0,0,0.1); line-height: 1.7; font-size: 16px; color: #374151;">
-          {body}
-        </article>
-        
-        <!-- In-Article Ad -->
-        <div style="margin: 48px 0;">
-          <ModernAdSlot client={{cfg.adsense_client}} slot={{cfg.adsense_slots.in_article}} layout="in-article" />
-        </div>
-        
-        <!-- Related Actions -->
-        <div style="display: grid; grid-template-columns: repeat(auto-fit, minmax(250px, 1fr)); gap: 24px; margin-top: 48px;">
-          <div style="background: linear-gradient(135deg, #2563eb, #1d4ed8); padding: 32px; border-radius: 12px; text-align: center; color: white;">
-            <div style="font-size: 32px; margin-bottom: 16px;">🧮</div>
-            <h3 style="font-size: 18px; font-weight: 600; margin-bottom: 12px;">Free Calculator</h3>
-            <p style="opacity: 0.9; font-size: 14px; margin-bottom: 20px;">Professional tools & analysis</p>
-            <a href="/calculators" style="background: rgba(255,255,255,0.2); color: white; padding: 12px 24px; border-radius: 8px; text-decoration: none; font-weight: 500; display: inline-block; backdrop-filter: blur(10px);">
-              Use Tools →
-            </a>
-          </div>
-          
-          <div style="background: linear-gradient(135deg, #16a34a, #15803d); padding: 32px; border-radius: 12px; text-align: center; color: white;">
-            <div style="font-size: 32px; margin-bottom: 16px;">📚</div>
-            <h3 style="font-size: 18px; font-weight: 600; margin-bottom: 12px;">Expert Guides</h3>
-            <p style="opacity: 0.9; font-size: 14px; margin-bottom: 20px;">In-depth analysis & tips</p>
-            <a href="/articles" style="background: rgba(255,255,255,0.2); color: white; padding: 12px 24px; border-radius: 8px; text-decoration: none; font-weight: 500; display: inline-block; backdrop-filter: blur(10px);">
-              Read More →
-            </a>
-          </div>
-          
-          <div style="background: linear-gradient(135deg, #dc2626, #b91c1c); padding: 32px; border-radius: 12px; text-align: center; color: white;">
-            <div style="font-size: 32px; margin-bottom: 16px;">💡</div>
-            <h3 style="font-size: 18px; font-weight: 600; margin-bottom: 12px;">Pro Tips</h3>
-            <p style="opacity: 0.9; font-size: 14px; margin-bottom: 20px;">Advanced strategies</p>
-            <a href="/guides" style="background: rgba(255,255,255,0.2); color: white; padding: 12px 24px; border-radius: 8px; text-decoration: none; font-weight: 500; display: inline-block; backdrop-filter: blur(10px);">
-              Learn Now →
-            </a>
-          </div>
-        </div>
-      </div>
-    </div>
-  </section>
-
-  <!-- Footer Ad -->
-  <div class="container">
-    <ModernAdSlot client={{cfg.adsense_client}} slot={{cfg.adsense_slots.footer}} layout="footer" />
-  </div>
-</{layout}>"""
-    
-    with open(page_path, "w", encoding="utf-8") as f: 
-        f.write(astro)
-    return {"ok": True, "page": f"/articles/{slug}"}
+    generation = write_site_file(os.path.join(CONTENT_ROOT, domain), os.path.join("src", "pages", "articles", f"{slug}.astro"), astro, skip_unchanged=True)
+    # A page whose earlier publish failed is on disk but not indexed yet: publish it this time
+    unchanged = generation is None and any(a["slug"] == slug for a in article_index.load(domain)["articles"])
+    return {"ok": True, "page": f"/articles/{slug}", "slug": slug, "unchanged": unchanged},200
+
+def ingest_once(data, key):
+    """write_article behind an idempotency key: a retried request gets the first response back
+
+    Returns (result, status, owned). An owned key stays pending until the caller
+    has published the article and calls finish_ingest.
+    """
+    if not key:
+        return (*write_article(data), False)
+    stored = idempotency.begin(key)
+    if stored:
+        if stored.get("pending"):
+            return {"ok":False,"error":"request with this idempotency key is in progress"},409,False
+        return {**stored["result"], "replayed": True}, stored["status"], False
+    try:
+        result, status = write_article(data)
+    except Exception as e:
+        result, status = {"ok":False,"error":str(e)},500
+    return result, status, True
+
+def finish_ingest(key, owned, result, status):
+    # Stored only now, after publish: a failed publish (5xx) clears the key so a retry runs again
+    if owned:
+        idempotency.complete(key, result, status)
+
+def needs_publish(result):
+    # Replays and byte-identical rewrites change nothing on disk, so no index/sitemap update (and no rebuild)
+    return result["ok"] and not result.get("replayed") and not result.get("unchanged")
+
+def iter_ndjson():
+    for line in request.stream:
+        line = line.strip()
+        if not line:
+            continue
+        try:
+            yield json.loads(line)
+        except ValueError as e:
+            yield ValueError(f"invalid JSON line: {e}")
+
+def bulk_items():
+    # NDJSON is read line by line from the request stream; anything else is a JSON array
+    if request.mimetype == "application/x-ndjson":
+        return iter_ndjson()
+    data = request.get_json(force=True)
+    items = data.get("articles", []) if isinstance(data, dict) else data
+    if not isinstance(items, list):
+        raise ValueError('expected a JSON array, {"articles": [...]} or NDJSON')
+    return items
+
+def batch_key(data):
+    return (data["domain"], article_owner(data))
+
+@app.post("/ingest")
+def ingest():
+    data = request.get_json(force=True)
+    key = request.headers.get("Idempotency-Key") or (data.get("idempotency_key") if isinstance(data, dict) else None)
+    result, status, owned = ingest_once(data, key)
+    if needs_publish(result):
+        try:
+            publish(data["domain"], [index_entry(result["slug"], data)])
+        except Exception as e:
+            result, status = {"ok":False,"error":f"publish failed: {e}"},500
+    finish_ingest(key, owned, result, status)
+    return result, status
+
+@app.post("/ingest/bulk")
+def ingest_bulk():
+    seen, pending = set(), []
+    # Bound in-flight work so a large stream is not buffered in memory
+    window = Semaphore(INGEST_WORKERS * 4)
+
+    def run(data):
+        try:
+            return ingest_once(data, data.get("idempotency_key"))
+        except Exception as e:
+            return {"ok":False,"error":str(e)},500,False
+        finally:
+            window.release()
+
+    try:
+        items = bulk_items()
+    except ValueError as e:
+        return {"ok":False,"error":str(e)},400
+
+    truncated = False
+    for index, data in enumerate(items):
+        if index >= BULK_MAX_ITEMS:
+            truncated = True
+            break
+        # Validate first: only well-formed articles take part in the duplicate check
+        error = str(data) if isinstance(data, ValueError) else invalid_article(data)
+        if error:
+            pending.append((None, ({"ok":False,"error":error},400,False)))
+            continue
+        key = batch_key(data)
+        if key in seen:
+            pending.append((None, ({"ok":False,"error":"duplicate article in batch"},409,False)))
+            continue
+        seen.add(key)
+        window.acquire()
+        pending.append((data, pool.submit(run, data)))
+
+    outcomes, written = [], {}
+    for index, (data, item) in enumerate(pending):
+        result, status, owned = item.result() if isinstance(item, Future) else item
+        outcomes.append([data, result, status, owned])
+        if needs_publish(result):
+            written.setdefault(data["domain"], []).append(index)
+
+    # One index + sitemap/RSS update per domain for the whole batch
+    for domain, indexes in written.items():
+        try:
+            publish(domain, [index_entry(outcomes[i][1]["slug"], outcomes[i][0]) for i in indexes])
+        except Exception as e:
+            for i in indexes:
+                outcomes[i][1:3] = {"ok":False,"error":f"publish failed: {e}"},500
+
+    results = []
+    for index, (data, result, status, owned) in enumerate(outcomes):
+        finish_ingest(data and data.get("idempotency_key"), owned, result, status)
+        results.append({"index": index, "status": status, **result})
+
+    failed = sum(1 for r in results if not r["ok"])
+    response = {"ok": failed == 0 and not truncated, "count": len(results), "failed": failed, "results": results}
+    if truncated:
+        response["error"] = f"at most {BULK_MAX_ITEMS} articles per request; the rest were not read"
+        return response, 413
+    return response
+
+@app.get("/index/<domain>")
+def index_summary(domain):
+    index = article_index.load(domain)
+    return {"domain": domain, "count": index["count"], "updated_at": index["updated_at"],
+            "latest": index["articles"][:int(request.args.get("limit", 10))]}
 
 @app.get("/health")
 def health(): 
-    return {"ok": True}
+    return {"ok": True, "pid": os.getpid(), "templates": templates.stats(), "requests": request_timing()}
+
+@app.get("/ready")
+def ready():
+    """Ready = content root writable and Redis (slugs, idempotency keys) reachable"""
+    checks = {}
+    try:
+        with tempfile.NamedTemporaryFile(dir=CONTENT_ROOT, prefix=".ready."):
+            pass
+        checks["content_root"] = "ok"
+    except OSError as e:
+        checks["content_root"] = str(e)
+    try:
+        redis_client.ping()
+        checks["redis"] = "ok"
+    except redis.RedisError as e:
+        checks["redis"] = str(e)
+    ok = all(v == "ok" for v in checks.values())
+    return {"ok": ok, "checks": checks}, 200 if ok else 503
 
 if __name__ == "__main__": 
+    # Local debugging only; in Docker the app is served by gunicorn (gunicorn.conf.py)
+    prepare_sites()
     # Run on port 7055 to match local test expectations when not using Docker
-    app.run(host="0.0.0.0", port=7055)
+    app.run(host="0.0.0.0", port=7055, threaded=True)
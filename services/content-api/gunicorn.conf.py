@@ -0,0 +1,20 @@
+import os
+
+# Several processes x threads: ingest requests no longer queue behind each other.
+# Everything shared between workers (slug registry, idempotency keys) is in Redis,
+# and file updates (article index, sitemaps, generation) take flocks.
+bind = os.environ.get("CONTENT_API_BIND", "0.0.0.0:5055")
+workers = int(os.environ.get("CONTENT_API_WORKERS", "2"))
+worker_class = "gthread"
+threads = int(os.environ.get("CONTENT_API_THREADS", "8"))
+# Bulk ingest from domain_deployer can legitimately take a while
+timeout = int(os.environ.get("CONTENT_API_TIMEOUT", "120"))
+graceful_timeout = 30
+keepalive = 5
+accesslog = "-"
+access_log_format = '%(h)s "%(r)s" %(s)s %(b)s %(M)sms'
+
+def on_starting(server):
+    # Backfill article indexes / feeds once, not once per worker
+    from content_api import prepare_sites
+    prepare_sites()
@@ -0,0 +1,171 @@
+import os, json, gzip, fcntl, hashlib
+from datetime import datetime, timezone
+from email.utils import format_datetime
+from xml.sax.saxutils import escape
+from site_files import atomic_write
+
+SHARD_SIZE = 50000
+RSS_ITEMS = 50
+SITEMAP_NS = "http://www.sitemaps.org/schemas/sitemap/0.9"
+
+class SiteFeeds:
+    """sitemap.xml, sitemap shards and rss.xml (+ .gz) under <site>/public.
+
+    Fed from the article index after each ingest. Article URLs are appended to
+    the last shard in ingest order, so a new article only touches that shard;
+    a shard is rewritten only when its rendered content changes. Shard
+    membership and digests live in src/data/sitemap.json.
+    """
+
+    def __init__(self, sites_root, shard_size=SHARD_SIZE):
+        self.sites_root = sites_root
+        self.shard_size = shard_size
+
+    def update(self, domain, changed=()):
+        site = os.path.join(self.sites_root, domain)
+        data_dir = os.path.join(site, "src", "data")
+        os.makedirs(data_dir, exist_ok=True)
+
+        with open(os.path.join(data_dir, ".sitemap.lock"), "w") as lock:
+            fcntl.flock(lock, fcntl.LOCK_EX)
+            state = self.load_state(data_dir)
+            articles = self.load_articles(data_dir)
+            by_slug = {a["slug"]: a for a in articles}
+            placed = {slug: n for n, shard in enumerate(state["shards"]) for slug in shard["slugs"]}
+
+            dirty = {placed[slug] for slug in changed if slug in placed}
+            # Oldest first, so appends keep the order articles were published in
+            for article in reversed(articles):
+                if article["slug"] in placed:
+                    continue
+                if not state["shards"] or len(state["shards"][-1]["slugs"]) >= self.shard_size:
+                    state["shards"].append({"slugs": [], "digest": None, "lastmod": None})
+                state["shards"][-1]["slugs"].append(article["slug"])
+                placed[article["slug"]] = len(state["shards"]) - 1
+                dirty.add(placed[article["slug"]])
+
+            written = []
+            for n in sorted(dirty):
+                shard = state["shards"][n]
+                urls = [(f"https://{domain}/articles/{slug}", lastmod(by_slug[slug]))
+                        for slug in shard["slugs"] if slug in by_slug]
+                if self.write_if_changed(site, shard, f"sitemaps/articles-{n + 1}.xml", render_urlset(urls)):
+                    written.append(f"articles-{n + 1}")
+
+            pages = state.setdefault("pages", {"digest": None, "lastmod": None})
+            if self.write_if_changed(site, pages, "sitemaps/pages.xml", render_urlset(self.static_pages(site, domain))):
+                written.append("pages")
+
+            if written or not os.path.exists(os.path.join(site, "public", "sitemap.xml")):
+                entries = [(f"https://{domain}/sitemaps/pages.xml", pages["lastmod"])]
+                entries += [(f"https://{domain}/sitemaps/articles-{n + 1}.xml", shard["lastmod"])
+                            for n, shard in enumerate(state["shards"])]
+                self.write_public(site, "sitemap.xml", render_sitemap_index(entries))
+
+            rss = self.render_rss(site, domain, articles[:RSS_ITEMS])
+            rss_state = state.setdefault("rss", {"digest": None, "lastmod": None})
+            if self.write_if_changed(site, rss_state, "rss.xml", rss):
+                written.append("rss")
+
+            robots = os.path.join(site, "public", "robots.txt")
+            if not os.path.exists(robots):
+                self.write_public(site, "robots.txt", f"User-agent: *\nAllow: /\n\nSitemap: https://{domain}/sitemap.xml\n".encode(), gz=False)
+
+            self.save_state(data_dir, state)
+            return written
+
+    def load_state(self, data_dir):
+        try:
+            with open(os.path.join(data_dir, "sitemap.json"), encoding="utf-8") as f:
+                return json.load(f)
+        except (OSError, ValueError):
+            return {"shards": []}
+
+    def save_state(self, data_dir, state):
+        atomic_write(os.path.join(data_dir, "sitemap.json"), json.dumps(state, separators=(",", ":")).encode())
+
+    def load_articles(self, data_dir):
+        try:
+            with open(os.path.join(data_dir, "articles.json"), encoding="utf-8") as f:
+                return json.load(f)["articles"]
+        except (OSError, ValueError, KeyError):
+            return []
+
+    def static_pages(self, site, domain):
+        """Non-article pages (small; walked on each update but only written on change)"""
+        pages_dir = os.path.join(site, "src", "pages")
+        urls = []
+        for root, dirs, files in os.walk(pages_dir):
+            if root == pages_dir and "articles" in dirs:
+                dirs.remove("articles")
+            for name in sorted(files):
+                if not name.endswith(".astro") or name.startswith("[") or name.startswith("_"):
+                    continue
+                route = os.path.relpath(os.path.join(root, name[:-len(".astro")]), pages_dir).replace(os.sep, "/")
+                route = "" if route == "index" else route.removesuffix("/index")
+                urls.append((f"https://{domain}/{route}", None))
+        return sorted(urls)
+
+    def render_rss(self, site, domain, articles):
+        try:
+            with open(os.path.join(site, "src", "config.json"), encoding="utf-8") as f:
+                cfg = json.load(f).get(domain, {})
+        except (OSError, ValueError):
+            cfg = {}
+        items = []
+        for a in articles:
+            link = f"https://{domain}/articles/{a['slug']}"
+            items.append(
+                f"<item><title>{escape(a['title'])}</title><link>{link}</link><guid>{link}</guid>"
+                f"<pubDate>{format_datetime(parse_date(a['date']))}</pubDate>"
+                f"<description>{escape(a.get('description', ''))}</description></item>"
+            )
+        # Newest item date instead of "now", so an unchanged feed renders identically
+        build_date = f"<lastBuildDate>{format_datetime(parse_date(articles[0]['date']))}</lastBuildDate>" if articles else ""
+        return (
+            '<?xml version="1.0" encoding="UTF-8"?>\n<rss version="2.0"><channel>'
+            f"<title>{escape(cfg.get('title', domain))}</title><link>https://{domain}/</link>"
+            f"<description>{escape(cfg.get('description', ''))}</description>{build_date}"
+            + "".join(items) + "</channel></rss>\n"
+        ).encode()
+
+    def write_if_changed(self, site, state, name, content):
+        digest = hashlib.sha256(content).hexdigest()
+        if digest == state.get("digest") and os.path.exists(os.path.join(site, "public", name)):
+            return False
+        self.write_public(site, name, content)
+        state["digest"] = digest
+        state["lastmod"] = datetime.now(timezone.utc).replace(microsecond=0).isoformat()
+        return True
+
+    def write_public(self, site, name, content, gz=True):
+        path = os.path.join(site, "public", name)
+        os.makedirs(os.path.dirname(path), exist_ok=True)
+        atomic_write(path, content)
+        if gz:
+            # mtime=0 keeps the .gz byte-identical for identical content (no spurious re-uploads)
+            atomic_write(path + ".gz", gzip.compress(content, mtime=0))
+
+def parse_date(value):
+    try:
+        date = datetime.fromisoformat(value)
+    except (TypeError, ValueError):
+        return datetime(1970, 1, 1, tzinfo=timezone.utc)
+    return date if date.tzinfo else date.replace(tzinfo=timezone.utc)
+
+def lastmod(article):
+    return parse_date(article.get("updated") or article["date"]).isoformat()
+
+def render_urlset(urls):
+    body = "".join(
+        f"<url><loc>{escape(loc)}</loc>" + (f"<lastmod>{mod}</lastmod>" if mod else "") + "</url>"
+        for loc, mod in urls
+    )
+    return f'<?xml version="1.0" encoding="UTF-8"?>\n<urlset xmlns="{SITEMAP_NS}">{body}</urlset>\n'.encode()
+
+def render_sitemap_index(entries):
+    body = "".join(
+        f"<sitemap><loc>{escape(loc)}</loc>" + (f"<lastmod>{mod}</lastmod>" if mod else "") + "</sitemap>"
+        for loc, mod in entries
+    )
+    return f'<?xml version="1.0" encoding="UTF-8"?>\n<sitemapindex xmlns="{SITEMAP_NS}">{body}</sitemapindex>\n'.encode()
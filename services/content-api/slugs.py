@@ -0,0 +1,87 @@
+import re, json, hashlib, unicodedata
+
+MAX_SLUG_LENGTH = 80
+# Turkish letters that NFKD does not fold to ASCII on its own
+TRANSLITERATE = str.maketrans({"ı": "i", "İ": "i", "ş": "s", "Ş": "s", "ğ": "g", "Ğ": "g", "ç": "c", "Ç": "c",
+                               "ö": "o", "Ö": "o", "ü": "u", "Ü": "u", "ß": "ss", "æ": "ae", "ø": "o", "đ": "d"})
+
+# Return the slug already owned by this article, else claim base, base-2, base-3, ...
+ALLOCATE_SCRIPT = """
+local existing = redis.call('HGET', KEYS[2], ARGV[2])
+if existing then return existing end
+local slug = ARGV[1]
+local n = 1
+while redis.call('HSETNX', KEYS[1], slug, ARGV[2]) == 0 do
+    n = n + 1
+    slug = ARGV[1] .. '-' .. n
+end
+redis.call('HSET', KEYS[2], ARGV[2], slug)
+return slug
+"""
+
+def slugify(text):
+    """The one slug algorithm for every service (content-api, content-scheduler)"""
+    text = (text or "").translate(TRANSLITERATE)
+    text = unicodedata.normalize("NFKD", text).encode("ascii", "ignore").decode()
+    slug = re.sub(r"[^a-z0-9]+", "-", text.lower()).strip("-")
+    if len(slug) > MAX_SLUG_LENGTH:
+        # Cut on a word boundary when there is one
+        slug = slug[:MAX_SLUG_LENGTH + 1].rsplit("-", 1)[0] if "-" in slug[:MAX_SLUG_LENGTH] else slug[:MAX_SLUG_LENGTH]
+    return slug.strip("-") or "post"
+
+def article_owner(data):
+    """Stable identity of an article: explicit article_id, else its normalized title"""
+    if data.get("article_id"):
+        return f"id:{data['article_id']}"
+    title = " ".join((data.get("title") or "").lower().split())
+    return "title:" + hashlib.sha1(title.encode("utf-8")).hexdigest()
+
+class SlugRegistry:
+    """Per-domain slug registry in Redis.
+
+    slug_registry:{domain} maps slug -> owner, slug_owners:{domain} maps
+    owner -> slug. The same article always gets the same slug back; a
+    different article whose title slugifies the same gets a deterministic
+    -2, -3, ... suffix instead of overwriting the existing page.
+    """
+
+    def __init__(self, redis_client):
+        self.redis_client = redis_client
+        self.allocate_script = redis_client.register_script(ALLOCATE_SCRIPT)
+
+    def allocate(self, domain, data, index_loader=None):
+        if index_loader and not self.redis_client.exists(f"slug_registry:{domain}"):
+            self.seed(domain, index_loader(domain)["articles"])
+        base = slugify(data.get("slug") or data.get("title"))
+        return self.allocate_script(keys=[f"slug_registry:{domain}", f"slug_owners:{domain}"],
+                                    args=[base, article_owner(data)])
+
+    def seed(self, domain, articles):
+        """Register slugs already on disk (from the article index) under their titles"""
+        pipe = self.redis_client.pipeline()
+        for article in articles:
+            owner = article_owner(article)
+            pipe.hsetnx(f"slug_registry:{domain}", article["slug"], owner)
+            pipe.hsetnx(f"slug_owners:{domain}", owner, article["slug"])
+        pipe.execute()
+
+class IdempotencyStore:
+    """Remembers the response for an Idempotency-Key so retries don't rewrite (and rebuild)"""
+
+    def __init__(self, redis_client, ttl=86400):
+        self.redis_client = redis_client
+        self.ttl = ttl
+
+    def begin(self, key):
+        """None if the caller owns the key now, else the stored response ({"pending": True} while running)"""
+        if self.redis_client.set(f"ingest:idem:{key}", json.dumps({"pending": True}), nx=True, ex=self.ttl):
+            return None
+        raw = self.redis_client.get(f"ingest:idem:{key}")
+        return json.loads(raw) if raw else None
+
+    def complete(self, key, result, status):
+        if status < 500:
+            self.redis_client.set(f"ingest:idem:{key}", json.dumps({"result": result, "status": status}), ex=self.ttl)
+        else:
+            # Server-side failure: let the retry actually run
+            self.redis_client.delete(f"ingest:idem:{key}")
@@ -6,11 +6,59 @@ import redis
 import asyncio
 import aiohttp
 import requests
-from datetime import datetime, timedelta
-from typing import Dict, Any, List, Optional
-import hashlib
-import random
-import re
+from datetime import datetime
+from typing import Dict, Any, List, Optional, Tuple
+from http_session import HTTPSessionManager
+from prompt_cache import PromptCache
+from ai_usage import AIUsageTracker
+
+class StreamingContentOptimizer:
+    """optimize_content'in parça parça beslenebilen hali
+
+    Satırlar tamamlandıkça formatlanır, paragraflar ("\n\n") tamamlandıkça
+    mobil için bölünür; tüm metni bir kerede vermekle aynı sonucu üretir.
+    """
+    
+    def __init__(self, generator: "AIContentGenerator", niche: str):
+        self.generator = generator
+        self.niche = niche
+        self.line_buffer = ""
+        self.text_buffer = ""
+        self.paragraphs: List[str] = []
+        self.word_count = 0
+        # Kelime tavanı aşılınca: açık bölüm biter, yeni bölüm başlamaz (sonuç bölümü hariç)
+        self.close_at_section = False
+        self.closed = False
+    
+    def feed(self, chunk: str):
+        if self.closed:
+            return
+        self.line_buffer += chunk
+        *lines, self.line_buffer = self.line_buffer.split('\n')
+        for line in lines:
+            self.text_buffer += self.generator.format_content_line(line) + '\n'
+        
+        *complete, self.text_buffer = self.text_buffer.split('\n\n')
+        for para in complete:
+            if self.close_at_section and para.startswith('## ') and 'conclusion' not in para.split('\n')[0].lower():
+                self.closed = True
+                self.line_buffer = self.text_buffer = ""
+                return
+            self.emit(para)
+    
+    def emit(self, para: str):
+        self.paragraphs.extend(self.generator.split_long_paragraph(para))
+        self.word_count += len(para.split())
+    
+    def finish(self) -> str:
+        self.text_buffer += self.generator.format_content_line(self.line_buffer)
+        self.line_buffer = ""
+        if self.text_buffer.strip():
+            self.emit(self.text_buffer)
+        self.text_buffer = ""
+        
+        optimized = '\n\n'.join(self.paragraphs)
+        return optimized + f"\n\n---\n\n*{self.generator.content_cta(self.niche)}*"
 
 class AIContentGenerator:
     """AI ile Profesyonel İçerik Üretimi (DeepSeek + Claude + Ücretsiz AI'lar)"""
@@ -22,6 +70,30 @@ class AIContentGenerator:
             decode_responses=True
         )
         
+        # Tüm provider çağrıları için tek, havuzlanmış HTTP session
+        self.http = HTTPSessionManager()
+        
+        # Aynı prompt'un tekrarı (crash sonrası rerun, retry) provider'a gitmez
+        self.prompt_cache = PromptCache(self.redis_client)
+        
+        # Günlük kullanım sayaçları (tek hash, pipeline yazma)
+        self.usage = AIUsageTracker(self.redis_client)
+        
+        # Streaming: uzunluk hedefi ve chunk'lar arası maksimum bekleme
+        self.streaming_enabled = os.getenv("AI_STREAMING_ENABLED", "true").lower() == "true"
+        self.stream_stall_timeout = int(os.getenv("AI_STREAM_STALL_TIMEOUT", "20"))
+        self.max_article_words = int(os.getenv("MAX_ARTICLE_LENGTH", "2500"))
+        # Prompt hedefi (2500+) üstünde güvenlik tavanı; akış yalnızca bölüm sınırında kesilir
+        self.stream_word_ceiling = int(os.getenv("AI_STREAM_WORD_CEILING", str(int(self.max_article_words * 1.5))))
+        self.min_article_words = int(os.getenv("MIN_ARTICLE_LENGTH", "1500"))
+        
+        # Hedging: p95 ölçümü yokken bekleme, alt sınır ve paralel ücretli provider limiti
+        self.hedge_default_delay = float(os.getenv("AI_HEDGE_DELAY", "30"))
+        self.hedge_min_delay = float(os.getenv("AI_HEDGE_MIN_DELAY", "5"))
+        self.hedge_delays: Dict[str, Tuple[float, float]] = {}  # provider -> (expires_at, delay)
+        self.hedge_max_paid = int(os.getenv("AI_HEDGE_MAX_PAID", "1"))
+        self.min_acceptable_words = int(os.getenv("AI_MIN_ACCEPTABLE_WORDS", "300"))
+        
         # AI API Configurations
         self.ai_providers = {
             "deepseek": {
@@ -227,10 +299,10 @@ Focus on practical solutions that readers can implement immediately.
             domain = article_request["domain"]
             keywords = article_request.get("keywords", [])
             
-            # AI provider seç (önceliğe göre)
-            provider = await self.select_ai_provider()
+            # AI provider'ları seç (önceliğe göre)
+            providers = await self.select_ai_providers()
             
-            if not provider:
+            if not providers:
                 self.log_error("No AI provider available")
                 return None
             
@@ -239,27 +311,24 @@ Focus on practical solutions that readers can implement immediately.
                 main_topic, sub_topic, title, niche, angle, keywords
             )
             
-            # AI'den content üret
-            content = await self.call_ai_provider(provider, prompt, niche)
-            
-            if not content:
-                # Fallback provider dene
-                for fallback_name in ["groq", "huggingface"]:
-                    if fallback_name in self.ai_providers and fallback_name != provider["name"]:
-                        self.log_info(f"Trying fallback provider: {fallback_name}")
-                        content = await self.call_ai_provider(
-                            {**self.ai_providers[fallback_name], "name": fallback_name}, 
-                            prompt, niche
-                        )
-                        if content:
-                            break
+            # Önce cache, yoksa AI; yavaş provider'ın yanına sıradakini paralel başlat
+            result = None
+            if not article_request.get("bypass_cache"):
+                result = self.get_cached_content(providers, prompt)
+            
+            cache_hit = result is not None
+            if not cache_hit:
+                result = await self.generate_hedged(providers, prompt, niche, keywords)
             
-            if not content:
+            if not result:
                 self.log_error("All AI providers failed")
                 return None
             
-            # Content'i optimize et
-            optimized_content = await self.optimize_content(content, keywords, niche)
+            provider, optimized_content = result
+            # generate_hedged eşiğin altındaki en iyi sonucu da döndürebilir; onu
+            # cache'leme, yoksa kısa/kesik makale TTL boyunca hiç yeniden denenmez
+            if not cache_hit and len(optimized_content.split()) >= self.min_acceptable_words:
+                self.prompt_cache.set(provider["name"], provider["model"], prompt, optimized_content)
             
             # Article metadata oluştur
             article_data = {
@@ -280,10 +349,12 @@ Focus on practical solutions that readers can implement immediately.
                 "mobile_friendly": True
             }
             
-            # Usage'ı kaydet
-            await self.record_ai_usage(provider["name"], len(optimized_content.split()))
-            
-            self.log_info(f"Generated {article_data['word_count']} word article with {provider['name']}")
+            # Usage'ı kaydet (cache hit provider çağrısı değil)
+            if cache_hit:
+                self.log_info(f"Served {article_data['word_count']} word article from cache ({provider['name']})")
+            else:
+                # Usage (kazanan + hedge'de yanıt alan diğerleri) generate_hedged'de kaydedildi
+                self.log_info(f"Generated {article_data['word_count']} word article with {provider['name']}")
             return article_data
             
         except Exception as e:
@@ -292,14 +363,22 @@ Focus on practical solutions that readers can implement immediately.
     
     async def select_ai_provider(self) -> Optional[Dict[str, Any]]:
         """En uygun AI provider'ı seç"""
+        providers = await self.select_ai_providers()
+        return providers[0] if providers else None
+    
+    async def select_ai_providers(self) -> List[Dict[str, Any]]:
+        """Kullanılabilir AI provider'ları öncelik sırasına göre listele"""
         try:
             # Provider'ları öncelik ve kullanılabilirliğe göre sırala
             available_providers = []
             
+            # Tüm provider'ların bugünkü kullanımı tek okumada
+            usage = self.usage.get_daily_usage()
+            
             for name, config in self.ai_providers.items():
                 if config["api_key"]:  # API key varsa
                     # Usage limitlerini kontrol et
-                    daily_usage = await self.get_daily_usage(name)
+                    daily_usage = usage.get(name, {}).get("requests", 0)
                     
                     # Ücretsiz provider'lar için daily limit
                     if config["cost_per_1k"] == 0 and daily_usage > 50:  # 50 article/day limit
@@ -311,17 +390,14 @@ Focus on practical solutions that readers can implement immediately.
                         "daily_usage": daily_usage
                     })
             
-            if not available_providers:
-                return None
-            
             # Önceliğe göre sırala
             available_providers.sort(key=lambda x: x["priority"])
             
-            return available_providers[0]
+            return available_providers
             
         except Exception as e:
             self.log_error(f"Failed to select AI provider: {e}")
-            return None
+            return []
     
     async def prepare_content_prompt(self, main_topic: str, sub_topic: str, title: str, 
                                    niche: str, angle: str, keywords: List[str]) -> str:
@@ -358,6 +434,149 @@ Focus on practical solutions that readers can implement immediately.
             self.log_error(f"Failed to prepare prompt: {e}")
             return ""
     
+    def get_cached_content(self, providers: List[Dict[str, Any]], prompt: str) -> Optional[Tuple[Dict[str, Any], str]]:
+        """Provider öncelik sırasıyla cache'e bak"""
+        for provider in providers:
+            content = self.prompt_cache.get(provider["name"], provider["model"], prompt)
+            if content:
+                return provider, content
+        return None
+    
+    async def generate_hedged(self, providers: List[Dict[str, Any]], prompt: str, niche: str,
+                              keywords: List[str]) -> Optional[Tuple[Dict[str, Any], str]]:
+        """Hedged istek: sıradaki provider'ı p95 gecikmesi aşılınca paralel başlat
+
+        İlk kabul edilebilir sonuç kazanır, diğerleri iptal edilir. Hata alan
+        provider'ın yerine sıradaki hemen başlatılır. Ücretli provider'lar
+        aynı anda en fazla `hedge_max_paid` tane çalışır. Yanıt alınan her
+        deneme (iptal edilen kaybedenler dahil) ai_usage'a kaydedilir; o
+        token'lar ödendi.
+        """
+        candidates = list(providers)
+        in_flight: Dict[asyncio.Task, Dict[str, Any]] = {}
+        attempts: List[Tuple[Dict[str, Any], Dict[str, Any]]] = []
+        last_launch = {"provider": None, "at": 0.0}
+        best = None  # Eşiğin altında kalan en uzun sonuç, son çare
+        
+        def launch_next() -> bool:
+            paid_in_flight = sum(1 for p in in_flight.values() if p["cost_per_1k"] > 0)
+            for i, candidate in enumerate(candidates):
+                if in_flight and candidate["cost_per_1k"] > 0 and paid_in_flight >= self.hedge_max_paid:
+                    continue
+                
+                candidates.pop(i)
+                if in_flight:
+                    self.log_info(f"Hedging with {candidate['name']}")
+                attempt = {"responded": False, "words": 0}
+                attempts.append((candidate, attempt))
+                task = asyncio.create_task(self.timed_generate_content(candidate, prompt, niche, keywords, attempt))
+                in_flight[task] = candidate
+                last_launch["provider"] = candidate
+                last_launch["at"] = time.monotonic()
+                return True
+            return False
+        
+        launch_next()
+        
+        try:
+            while in_flight:
+                timeout = None
+                if candidates:
+                    delay = await self.get_hedge_delay(last_launch["provider"]["name"])
+                    timeout = max(0.0, delay - (time.monotonic() - last_launch["at"]))
+                
+                done, _ = await asyncio.wait(in_flight.keys(), timeout=timeout, return_when=asyncio.FIRST_COMPLETED)
+                
+                if not done:
+                    # Gecikme eşiği aşıldı, sıradakini paralel başlat
+                    if not launch_next():
+                        # Ücret limiti yüzünden başlatılamadı, eşiği yeniden say
+                        last_launch["at"] = time.monotonic()
+                    continue
+                
+                for task in done:
+                    provider = in_flight.pop(task)
+                    content = None if task.exception() else task.result()
+                    
+                    if content and len(content.split()) >= self.min_acceptable_words:
+                        return provider, content
+                    
+                    if content and (best is None or len(content) > len(best[1])):
+                        best = (provider, content)
+                    
+                    self.log_info(f"{provider['name']} returned no acceptable content")
+                    launch_next()
+        
+        finally:
+            for task in in_flight:
+                task.cancel()
+            if in_flight:
+                await asyncio.gather(*in_flight.keys(), return_exceptions=True)
+            for provider, attempt in attempts:
+                if attempt["responded"]:
+                    await self.record_ai_usage(provider["name"], attempt["words"])
+        
+        return best
+    
+    async def timed_generate_content(self, provider: Dict[str, Any], prompt: str, niche: str, keywords: List[str],
+                                     attempt: Optional[Dict[str, Any]] = None) -> Optional[str]:
+        """generate_content + başarılı çağrının süresini p95 için kaydet"""
+        started = time.monotonic()
+        content = await self.generate_content(provider, prompt, niche, keywords, attempt)
+        
+        if content:
+            await asyncio.to_thread(self.record_latency, provider["name"], round(time.monotonic() - started, 2))
+        
+        return content
+    
+    def record_latency(self, provider_name: str, seconds: float):
+        latency_key = f"ai_latency:{provider_name}"
+        pipe = self.redis_client.pipeline()
+        pipe.lpush(latency_key, seconds)
+        pipe.ltrim(latency_key, 0, 99)  # Son 100 ölçüm
+        pipe.execute()
+    
+    async def get_hedge_delay(self, provider_name: str) -> float:
+        """hedge_delay, provider başına 60 sn cache'li; Redis okuması event loop dışında"""
+        cached = self.hedge_delays.get(provider_name)
+        if cached and cached[0] > time.monotonic():
+            return cached[1]
+        
+        delay = await asyncio.to_thread(self.hedge_delay, provider_name)
+        self.hedge_delays[provider_name] = (time.monotonic() + 60, delay)
+        return delay
+    
+    def hedge_delay(self, provider_name: str) -> float:
+        """Provider'ın son gecikmelerinin p95'i (yeterli ölçüm yoksa varsayılan)"""
+        try:
+            samples = sorted(float(x) for x in self.redis_client.lrange(f"ai_latency:{provider_name}", 0, -1))
+        except Exception:
+            samples = []
+        
+        if len(samples) < 10:
+            return self.hedge_default_delay
+        
+        p95 = samples[min(len(samples) - 1, int(len(samples) * 0.95))]
+        return max(self.hedge_min_delay, p95)
+    
+    async def generate_content(self, provider: Dict[str, Any], prompt: str, niche: str, keywords: List[str],
+                               attempt: Optional[Dict[str, Any]] = None) -> Optional[str]:
+        """Provider'dan optimize edilmiş content al (destekleniyorsa streaming ile)
+
+        `attempt` verilirse yanıt alınıp alınmadığı ve gelen kelime sayısı
+        oraya yazılır (iptal edilse bile usage kaydı için).
+        """
+        if self.streaming_enabled and provider["name"] in ("deepseek", "claude", "groq"):
+            return await self.stream_ai_provider(provider, prompt, niche, attempt)
+        
+        content = await self.call_ai_provider(provider, prompt, niche)
+        if not content:
+            return None
+        if attempt is not None:
+            attempt.update(responded=True, words=len(content.split()))
+        
+        return await self.optimize_content(content, keywords, niche)
+    
     async def call_ai_provider(self, provider: Dict[str, Any], prompt: str, niche: str) -> Optional[str]:
         """AI provider'dan content al"""
         try:
@@ -377,47 +596,85 @@ Focus on practical solutions that readers can implement immediately.
         
         return None
     
-    async def call_deepseek(self, provider: Dict[str, Any], prompt: str) -> Optional[str]:
-        """DeepSeek API çağrısı"""
-        try:
+    def build_provider_request(self, provider: Dict[str, Any], prompt: str, stream: bool = False) -> Tuple[str, Dict[str, str], Dict[str, Any], int]:
+        """DeepSeek / Claude / Groq için (url, headers, payload, timeout) hazırla"""
+        provider_name = provider["name"]
+        
+        if provider_name == "claude":
             headers = {
-                "Authorization": f"Bearer {provider['api_key']}",
-                "Content-Type": "application/json"
+                "x-api-key": provider['api_key'],
+                "Content-Type": "application/json",
+                "anthropic-version": "2023-06-01"
             }
             
             payload = {
                 "model": provider["model"],
+                "max_tokens": provider["max_tokens"],
                 "messages": [
-                    {
-                        "role": "system",
-                        "content": "You are an expert content writer who creates high-quality, SEO-optimized articles. Write engaging, informative content that provides real value to readers."
-                    },
                     {
                         "role": "user",
                         "content": prompt
                     }
                 ],
-                "max_tokens": provider["max_tokens"],
-                "temperature": 0.7,
-                "top_p": 0.9,
-                "stream": False
+                "temperature": 0.7
             }
+            if stream:
+                payload["stream"] = True
             
-            async with aiohttp.ClientSession() as session:
-                async with session.post(
-                    f"{provider['base_url']}/chat/completions",
-                    headers=headers,
-                    json=payload,
-                    timeout=aiohttp.ClientTimeout(total=120)
-                ) as response:
-                    
-                    if response.status == 200:
-                        result = await response.json()
-                        content = result["choices"][0]["message"]["content"]
-                        return content.strip()
-                    else:
-                        error_text = await response.text()
-                        self.log_error(f"DeepSeek API error {response.status}: {error_text}")
+            return f"{provider['base_url']}/messages", headers, payload, 120
+        
+        headers = {
+            "Authorization": f"Bearer {provider['api_key']}",
+            "Content-Type": "application/json"
+        }
+        
+        if provider_name == "deepseek":
+            system_prompt = "You are an expert content writer who creates high-quality, SEO-optimized articles. Write engaging, informative content that provides real value to readers."
+            timeout = 120
+        else:
+            system_prompt = "You are a professional content writer specializing in creating valuable, engaging articles."
+            timeout = 60
+        
+        payload = {
+            "model": provider["model"],
+            "messages": [
+                {
+                    "role": "system",
+                    "content": system_prompt
+                },
+                {
+                    "role": "user",
+                    "content": prompt
+                }
+            ],
+            "max_tokens": provider["max_tokens"],
+            "temperature": 0.7,
+            "top_p": 0.9,
+            "stream": stream
+        }
+        
+        return f"{provider['base_url']}/chat/completions", headers, payload, timeout
+    
+    async def call_deepseek(self, provider: Dict[str, Any], prompt: str) -> Optional[str]:
+        """DeepSeek API çağrısı"""
+        try:
+            url, headers, payload, timeout = self.build_provider_request(provider, prompt)
+            
+            session = await self.http.get()
+            async with session.post(
+                url,
+                headers=headers,
+                json=payload,
+                timeout=aiohttp.ClientTimeout(total=timeout)
+            ) as response:
+                
+                if response.status == 200:
+                    result = await response.json()
+                    content = result["choices"][0]["message"]["content"]
+                    return content.strip()
+                else:
+                    error_text = await response.text()
+                    self.log_error(f"DeepSeek API error {response.status}: {error_text}")
             
         except Exception as e:
             self.log_error(f"DeepSeek API call failed: {e}")
@@ -427,39 +684,23 @@ Focus on practical solutions that readers can implement immediately.
     async def call_claude(self, provider: Dict[str, Any], prompt: str) -> Optional[str]:
         """Claude API çağrısı"""
         try:
-            headers = {
-                "x-api-key": provider['api_key'],
-                "Content-Type": "application/json",
-                "anthropic-version": "2023-06-01"
-            }
+            url, headers, payload, timeout = self.build_provider_request(provider, prompt)
             
-            payload = {
-                "model": provider["model"],
-                "max_tokens": provider["max_tokens"],
-                "messages": [
-                    {
-                        "role": "user",
-                        "content": prompt
-                    }
-                ],
-                "temperature": 0.7
-            }
-            
-            async with aiohttp.ClientSession() as session:
-                async with session.post(
-                    f"{provider['base_url']}/messages",
-                    headers=headers,
-                    json=payload,
-                    timeout=aiohttp.ClientTimeout(total=120)
-                ) as response:
-                    
-                    if response.status == 200:
-                        result = await response.json()
-                        content = result["content"][0]["text"]
-                        return content.strip()
-                    else:
-                        error_text = await response.text()
-                        self.log_error(f"Claude API error {response.status}: {error_text}")
+            session = await self.http.get()
+            async with session.post(
+                url,
+                headers=headers,
+                json=payload,
+                timeout=aiohttp.ClientTimeout(total=timeout)
+            ) as response:
+                
+                if response.status == 200:
+                    result = await response.json()
+                    content = result["content"][0]["text"]
+                    return content.strip()
+                else:
+                    error_text = await response.text()
+                    self.log_error(f"Claude API error {response.status}: {error_text}")
             
         except Exception as e:
             self.log_error(f"Claude API call failed: {e}")
@@ -469,49 +710,122 @@ Focus on practical solutions that readers can implement immediately.
     async def call_groq(self, provider: Dict[str, Any], prompt: str) -> Optional[str]:
         """Groq API çağrısı (ücretsiz, hızlı)"""
         try:
-            headers = {
-                "Authorization": f"Bearer {provider['api_key']}",
-                "Content-Type": "application/json"
-            }
-            
-            payload = {
-                "model": provider["model"],
-                "messages": [
-                    {
-                        "role": "system",
-                        "content": "You are a professional content writer specializing in creating valuable, engaging articles."
-                    },
-                    {
-                        "role": "user",
-                        "content": prompt
-                    }
-                ],
-                "max_tokens": provider["max_tokens"],
-                "temperature": 0.7,
-                "top_p": 0.9
-            }
+            url, headers, payload, timeout = self.build_provider_request(provider, prompt)
             
-            async with aiohttp.ClientSession() as session:
-                async with session.post(
-                    f"{provider['base_url']}/chat/completions",
-                    headers=headers,
-                    json=payload,
-                    timeout=aiohttp.ClientTimeout(total=60)
-                ) as response:
-                    
-                    if response.status == 200:
-                        result = await response.json()
-                        content = result["choices"][0]["message"]["content"]
-                        return content.strip()
-                    else:
-                        error_text = await response.text()
-                        self.log_error(f"Groq API error {response.status}: {error_text}")
+            session = await self.http.get()
+            async with session.post(
+                url,
+                headers=headers,
+                json=payload,
+                timeout=aiohttp.ClientTimeout(total=timeout)
+            ) as response:
+                
+                if response.status == 200:
+                    result = await response.json()
+                    content = result["choices"][0]["message"]["content"]
+                    return content.strip()
+                else:
+                    error_text = await response.text()
+                    self.log_error(f"Groq API error {response.status}: {error_text}")
             
         except Exception as e:
             self.log_error(f"Groq API call failed: {e}")
         
         return None
     
+    async def stream_ai_provider(self, provider: Dict[str, Any], prompt: str, niche: str,
+                                 attempt: Optional[Dict[str, Any]] = None) -> Optional[str]:
+        """SSE ile content al, gelen parçaları anında optimize et
+
+        Kelime tavanı aşılınca açık bölümü bitirir, sonraki bölüm başlığında
+        keser (sonuç bölümü yine alınır). `sock_read` timeout'u takılan
+        provider'ı saniyeler içinde yakalar; toplam timeout'ta yeterince
+        uzun kısmi içerik varsa onu kullanır.
+        """
+        provider_name = provider["name"]
+        optimizer = StreamingContentOptimizer(self, niche)
+        started = time.monotonic()
+        first_chunk_at = None
+        
+        try:
+            url, headers, payload, timeout = self.build_provider_request(provider, prompt, stream=True)
+            
+            session = await self.http.get()
+            async with session.post(
+                url,
+                headers=headers,
+                json=payload,
+                timeout=aiohttp.ClientTimeout(total=timeout, sock_read=self.stream_stall_timeout)
+            ) as response:
+                
+                if response.status != 200:
+                    error_text = await response.text()
+                    self.log_error(f"{provider_name} stream error {response.status}: {error_text}")
+                    return None
+                
+                if attempt is not None:
+                    attempt["responded"] = True
+                
+                async for raw_line in response.content:
+                    line = raw_line.decode("utf-8", "ignore").strip()
+                    if not line.startswith("data:"):
+                        continue
+                    
+                    data = line[5:].strip()
+                    if data == "[DONE]":
+                        break
+                    
+                    event = json.loads(data)
+                    if event.get("type") == "message_stop":
+                        break
+                    if event.get("type") == "error":
+                        self.log_error(f"{provider_name} stream error: {event.get('error')}")
+                        return None
+                    
+                    text = self.extract_stream_text(provider_name, event)
+                    if not text:
+                        continue
+                    
+                    if first_chunk_at is None:
+                        first_chunk_at = time.monotonic()
+                        self.log_info(f"{provider_name} first chunk after {first_chunk_at - started:.1f}s")
+                    
+                    optimizer.feed(text)
+                    if attempt is not None:
+                        attempt["words"] = optimizer.word_count
+                    
+                    if optimizer.word_count >= self.stream_word_ceiling and not optimizer.close_at_section:
+                        self.log_info(f"{provider_name} reached {optimizer.word_count} words, stopping at the next section")
+                        optimizer.close_at_section = True
+                    if optimizer.closed:
+                        break
+        
+        except asyncio.TimeoutError:
+            if optimizer.word_count >= self.min_article_words:
+                self.log_info(f"{provider_name} stream timed out, using {optimizer.word_count} words received")
+            else:
+                self.log_error(f"{provider_name} stream stalled after {time.monotonic() - started:.1f}s")
+                return None
+        except Exception as e:
+            self.log_error(f"{provider_name} stream failed: {e}")
+            return None
+        
+        content = optimizer.finish()
+        if optimizer.word_count == 0:
+            return None
+        
+        return content
+    
+    def extract_stream_text(self, provider_name: str, event: Dict[str, Any]) -> str:
+        """SSE event'inden metin parçasını çıkar"""
+        if provider_name == "claude":
+            if event.get("type") == "content_block_delta":
+                return event.get("delta", {}).get("text", "")
+            return ""
+        
+        choices = event.get("choices") or [{}]
+        return choices[0].get("delta", {}).get("content") or ""
+    
     async def call_huggingface(self, provider: Dict[str, Any], prompt: str) -> Optional[str]:
         """Hugging Face API çağrısı (ücretsiz)"""
         try:
@@ -533,25 +847,25 @@ Focus on practical solutions that readers can implement immediately.
                 }
             }
             
-            async with aiohttp.ClientSession() as session:
-                async with session.post(
-                    f"{provider['base_url']}/{provider['model']}",
-                    headers=headers,
-                    json=payload,
-                    timeout=aiohttp.ClientTimeout(total=60)
-                ) as response:
-                    
-                    if response.status == 200:
-                        result = await response.json()
-                        if isinstance(result, list) and len(result) > 0:
-                            content = result[0].get("generated_text", "")
-                            # Input prompt'u çıkar
-                            if content.startswith(short_prompt):
-                                content = content[len(short_prompt):].strip()
-                            return content
-                    else:
-                        error_text = await response.text()
-                        self.log_error(f"HuggingFace API error {response.status}: {error_text}")
+            session = await self.http.get()
+            async with session.post(
+                f"{provider['base_url']}/{provider['model']}",
+                headers=headers,
+                json=payload,
+                timeout=aiohttp.ClientTimeout(total=60)
+            ) as response:
+                
+                if response.status == 200:
+                    result = await response.json()
+                    if isinstance(result, list) and len(result) > 0:
+                        content = result[0].get("generated_text", "")
+                        # Input prompt'u çıkar
+                        if content.startswith(short_prompt):
+                            content = content[len(short_prompt):].strip()
+                        return content
+                else:
+                    error_text = await response.text()
+                    self.log_error(f"HuggingFace API error {response.status}: {error_text}")
             
         except Exception as e:
             self.log_error(f"HuggingFace API call failed: {e}")
@@ -561,96 +875,73 @@ Focus on practical solutions that readers can implement immediately.
     async def optimize_content(self, content: str, keywords: List[str], niche: str) -> str:
         """Content'i SEO ve mobil için optimize et"""
         try:
-            # Markdown formatting ekle
-            optimized = content
-            
-            # Header'ları düzenle
-            lines = optimized.split('\n')
-            formatted_lines = []
-            
-            for line in lines:
-                line = line.strip()
-                if not line:
-                    formatted_lines.append('')
-                    continue
-                
-                # Ana başlıkları tespit et ve formatla
-                if any(keyword in line.lower() for keyword in ['introduction', 'conclusion', 'getting started']):
-                    formatted_lines.append(f"## {line}")
-                elif line.endswith(':') and len(line) < 100:
-                    formatted_lines.append(f"### {line}")
-                elif line.startswith(('1.', '2.', '3.', '4.', '5.')):
-                    formatted_lines.append(f"### {line}")
-                else:
-                    formatted_lines.append(line)
-            
-            optimized = '\n'.join(formatted_lines)
-            
-            # Mobil için paragraf kısaltma
-            paragraphs = optimized.split('\n\n')
-            mobile_optimized = []
-            
-            for para in paragraphs:
-                if len(para) > 400:  # Uzun paragrafları böl
-                    sentences = para.split('. ')
-                    current_para = ""
-                    
-                    for sentence in sentences:
-                        if len(current_para + sentence) < 300:
-                            current_para += sentence + ". "
-                        else:
-                            mobile_optimized.append(current_para.strip())
-                            current_para = sentence + ". "
-                    
-                    if current_para.strip():
-                        mobile_optimized.append(current_para.strip())
-                else:
-                    mobile_optimized.append(para)
-            
-            optimized = '\n\n'.join(mobile_optimized)
-            
-            # Call-to-action ekle (subtle)
-            cta_templates = {
-                "finance": "Ready to improve your financial strategy? Explore our other financial guides for more expert insights.",
-                "technology": "Want to stay updated with the latest tech trends? Check out our other technology articles.",
-                "gaming": "Level up your gaming skills with our comprehensive gaming guides and strategies.",
-                "health": "Transform your health journey with our evidence-based wellness guides.",
-                "business": "Accelerate your business success with our proven strategies and expert insights."
-            }
-            
-            cta = cta_templates.get(niche, "Explore our other expert guides for more valuable insights.")
-            optimized += f"\n\n---\n\n*{cta}*"
-            
-            return optimized
+            optimizer = StreamingContentOptimizer(self, niche)
+            optimizer.feed(content)
+            return optimizer.finish()
             
         except Exception as e:
             self.log_error(f"Failed to optimize content: {e}")
             return content
     
+    def format_content_line(self, line: str) -> str:
+        """Tek satırı markdown başlık kurallarına göre formatla"""
+        line = line.strip()
+        if not line:
+            return ''
+        
+        # Ana başlıkları tespit et ve formatla
+        if any(keyword in line.lower() for keyword in ['introduction', 'conclusion', 'getting started']):
+            return f"## {line}"
+        elif line.endswith(':') and len(line) < 100:
+            return f"### {line}"
+        elif line.startswith(('1.', '2.', '3.', '4.', '5.')):
+            return f"### {line}"
+        return line
+    
+    def split_long_paragraph(self, para: str) -> List[str]:
+        """Mobil için uzun paragrafları böl"""
+        if len(para) <= 400:
+            return [para]
+        
+        sentences = para.split('. ')
+        parts = []
+        current_para = ""
+        
+        for sentence in sentences:
+            if len(current_para + sentence) < 300:
+                current_para += sentence + ". "
+            else:
+                parts.append(current_para.strip())
+                current_para = sentence + ". "
+        
+        if current_para.strip():
+            parts.append(current_para.strip())
+        
+        return parts
+    
+    def content_cta(self, niche: str) -> str:
+        """Niche'e göre subtle call-to-action"""
+        cta_templates = {
+            "finance": "Ready to improve your financial strategy? Explore our other financial guides for more expert insights.",
+            "technology": "Want to stay updated with the latest tech trends? Check out our other technology articles.",
+            "gaming": "Level up your gaming skills with our comprehensive gaming guides and strategies.",
+            "health": "Transform your health journey with our evidence-based wellness guides.",
+            "business": "Accelerate your business success with our proven strategies and expert insights."
+        }
+        
+        return cta_templates.get(niche, "Explore our other expert guides for more valuable insights.")
+    
     async def get_daily_usage(self, provider_name: str) -> int:
         """Günlük kullanım miktarını al"""
         try:
-            today = datetime.now().strftime("%Y-%m-%d")
-            usage_key = f"ai_usage:{provider_name}:{today}"
-            usage = self.redis_client.get(usage_key)
-            return int(usage) if usage else 0
+            return self.usage.get_requests(provider_name)
         except:
             return 0
     
     async def record_ai_usage(self, provider_name: str, word_count: int):
         """AI kullanımını kaydet"""
         try:
-            today = datetime.now().strftime("%Y-%m-%d")
-            usage_key = f"ai_usage:{provider_name}:{today}"
-            
-            # Günlük usage increment et
-            self.redis_client.incr(usage_key)
-            self.redis_client.expire(usage_key, 86400)  # 24 saat
-            
-            # Word count kaydet
-            word_key = f"ai_words:{provider_name}:{today}"
-            self.redis_client.incrby(word_key, word_count)
-            self.redis_client.expire(word_key, 86400)
+            await asyncio.to_thread(self.usage.record, provider_name, word_count)
             
             self.log_info(f"Recorded usage: {provider_name} - {word_count} words")
             
@@ -660,20 +951,17 @@ Focus on practical solutions that readers can implement immediately.
     async def get_ai_stats(self) -> Dict[str, Any]:
         """AI kullanım istatistiklerini al"""
         try:
-            today = datetime.now().strftime("%Y-%m-%d")
+            usage = self.usage.get_daily_usage()
             stats = {}
             
-            for provider_name in self.ai_providers.keys():
-                usage_key = f"ai_usage:{provider_name}:{today}"
-                word_key = f"ai_words:{provider_name}:{today}"
-                
-                usage = self.redis_client.get(usage_key) or 0
-                words = self.redis_client.get(word_key) or 0
+            for provider_name, config in self.ai_providers.items():
+                provider_usage = usage.get(provider_name, {})
+                words = provider_usage.get("words", 0)
                 
                 stats[provider_name] = {
-                    "daily_requests": int(usage),
-                    "daily_words": int(words),
-                    "cost_estimate": int(words) * self.ai_providers[provider_name]["cost_per_1k"] / 1000
+                    "daily_requests": provider_usage.get("requests", 0),
+                    "daily_words": words,
+                    "cost_estimate": words * config["cost_per_1k"] / 1000
                 }
             
             return stats
@@ -682,6 +970,10 @@ Focus on practical solutions that readers can implement immediately.
             self.log_error(f"Failed to get AI stats: {e}")
             return {}
     
+    async def close(self):
+        """HTTP bağlantı havuzunu kapat"""
+        await self.http.close()
+    
     def log_info(self, message: str):
         timestamp = datetime.now().strftime("%Y-%m-%d %H:%M:%S")
         print(f"[{timestamp}] AI-CONTENT: {message}")
@@ -694,62 +986,65 @@ async def main():
     """AI Content Generator Worker"""
     generator = AIContentGenerator()
     
-    print("🤖 AI Content Generator started")
-    print("📝 Using DeepSeek, Claude, Groq, and HuggingFace APIs")
-    
-    # Günlük istatistikleri göster
-    stats = await generator.get_ai_stats()
-    for provider, data in stats.items():
-        if data["daily_requests"] > 0:
-            print(f"📊 {provider}: {data['daily_requests']} requests, {data['daily_words']} words, ${data['cost_estimate']:.4f}")
-    
-    while True:
-        try:
-            # AI content generation requests'leri kontrol et
-            request = generator.redis_client.rpop("ai_content_queue")
-            
-            if request:
-                request_data = json.loads(request)
-                title = request_data.get("title", "Unknown")
-                
-                print(f"🤖 Generating AI content: {title}")
-                
-                article_data = await generator.generate_ai_article(request_data)
+    try:
+        print("🤖 AI Content Generator started")
+        print("📝 Using DeepSeek, Claude, Groq, and HuggingFace APIs")
+        
+        # Günlük istatistikleri göster
+        stats = await generator.get_ai_stats()
+        for provider, data in stats.items():
+            if data["daily_requests"] > 0:
+                print(f"📊 {provider}: {data['daily_requests']} requests, {data['daily_words']} words, ${data['cost_estimate']:.4f}")
+        
+        while True:
+            try:
+                # AI content generation requests'leri kontrol et
+                request = generator.redis_client.rpop("ai_content_queue")
                 
-                if article_data:
-                    print(f"✅ Generated {article_data['word_count']} words with {article_data['ai_provider']}")
+                if request:
+                    request_data = json.loads(request)
+                    title = request_data.get("title", "Unknown")
                     
-                    # Content API'ye gönder
-                    response = requests.post(
-                        "http://content-api:5055/ingest",
-                        json=article_data,
-                        timeout=60
-                    )
+                    print(f"🤖 Generating AI content: {title}")
                     
-                    if response.status_code == 200:
-                        print(f"📄 Article published successfully")
+                    article_data = await generator.generate_ai_article(request_data)
+                    
+                    if article_data:
+                        print(f"✅ Generated {article_data['word_count']} words with {article_data['ai_provider']}")
                         
-                        # Resim üretimi tetikle
-                        generator.redis_client.lpush("nano_banana_queue", json.dumps({
-                            "domain": article_data["domain"],
-                            "title": article_data["title"],
-                            "main_topic": article_data["main_topic"],
-                            "sub_topic": article_data["sub_topic"],
-                            "niche": article_data["niche"],
-                            "keywords": article_data["keywords"],
-                            "type": "ai_article_images"
-                        }))
+                        # Content API'ye gönder
+                        response = requests.post(
+                            "http://content-api:5055/ingest",
+                            json=article_data,
+                            timeout=60
+                        )
                         
+                        if response.status_code == 200:
+                            print(f"📄 Article published successfully")
+                            
+                            # Resim üretimi tetikle
+                            generator.redis_client.lpush("nano_banana_queue", json.dumps({
+                                "domain": article_data["domain"],
+                                "title": article_data["title"],
+                                "main_topic": article_data["main_topic"],
+                                "sub_topic": article_data["sub_topic"],
+                                "niche": article_data["niche"],
+                                "keywords": article_data["keywords"],
+                                "type": "ai_article_images"
+                            }))
+                            
+                        else:
+                            print(f"❌ Failed to publish article: {response.status_code}")
                     else:
-                        print(f"❌ Failed to publish article: {response.status_code}")
-                else:
-                    print("❌ Failed to generate AI content")
-            
-            await asyncio.sleep(10)  # 10 saniyede bir kontrol et
-            
-        except Exception as e:
-            print(f"❌ AI Content Generator error: {e}")
-            await asyncio.sleep(30)
+                        print("❌ Failed to generate AI content")
+                
+                await asyncio.sleep(10)  # 10 saniyede bir kontrol et
+                
+            except Exception as e:
+                print(f"❌ AI Content Generator error: {e}")
+                await asyncio.sleep(30)
+    finally:
+        await generator.close()
 
 if __name__ == "__main__":
     asyncio.run(main())
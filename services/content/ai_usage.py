@@ -0,0 +1,42 @@
+# /srv/auto-adsense/services/content/ai_usage.py
+import redis
+from datetime import datetime
+from typing import Dict, Optional
+
+
+class AIUsageTracker:
+    """Günlük AI kullanım sayaçları, gün başına tek hash: ai_usage:{YYYY-MM-DD}
+
+    Alanlar `{provider}:requests` ve `{provider}:words`. Yazma tek MULTI
+    pipeline'ı, okuma tek HGETALL; provider sayısından bağımsız bir round trip.
+    """
+
+    def __init__(self, redis_client: redis.Redis, retention: int = 86400 * 2):
+        self.redis_client = redis_client
+        self.retention = retention
+
+    def day_key(self, day: Optional[str] = None) -> str:
+        return f"ai_usage:{day or datetime.now().strftime('%Y-%m-%d')}"
+
+    def record(self, provider: str, word_count: int, day: Optional[str] = None):
+        """Bir isteği ve üretilen kelime sayısını kaydet"""
+        key = self.day_key(day)
+        pipe = self.redis_client.pipeline(transaction=True)
+        pipe.hincrby(key, f"{provider}:requests", 1)
+        pipe.hincrby(key, f"{provider}:words", word_count)
+        pipe.expire(key, self.retention)
+        pipe.execute()
+
+    def get_daily_usage(self, day: Optional[str] = None) -> Dict[str, Dict[str, int]]:
+        """{provider: {"requests": n, "words": n}} döndür"""
+        usage: Dict[str, Dict[str, int]] = {}
+
+        for field, value in self.redis_client.hgetall(self.day_key(day)).items():
+            provider, _, metric = field.rpartition(":")
+            usage.setdefault(provider, {"requests": 0, "words": 0})[metric] = int(value)
+
+        return usage
+
+    def get_requests(self, provider: str, day: Optional[str] = None) -> int:
+        value = self.redis_client.hget(self.day_key(day), f"{provider}:requests")
+        return int(value) if value else 0
@@ -0,0 +1,49 @@
+# /srv/auto-adsense/services/content/http_session.py
+import os
+import asyncio
+import aiohttp
+from typing import Optional
+
+
+class HTTPSessionManager:
+    """Servis ömrü boyunca yaşayan, host başına havuzlanmış aiohttp session
+
+    Her istekte yeni ClientSession açmak her seferinde DNS + TLS el sıkışması
+    demek. Tek connector keep-alive bağlantıları host bazında tekrar kullanır.
+    """
+
+    def __init__(self, limit: Optional[int] = None, limit_per_host: Optional[int] = None,
+                 keepalive_timeout: Optional[float] = None, dns_cache_ttl: int = 300):
+        self.limit = limit or int(os.getenv("HTTP_POOL_LIMIT", "50"))
+        self.limit_per_host = limit_per_host or int(os.getenv("HTTP_POOL_LIMIT_PER_HOST", "8"))
+        self.keepalive_timeout = keepalive_timeout or float(os.getenv("HTTP_KEEPALIVE_TIMEOUT", "60"))
+        self.dns_cache_ttl = dns_cache_ttl
+
+        self._session: Optional[aiohttp.ClientSession] = None
+        self._lock = asyncio.Lock()
+
+    async def get(self) -> aiohttp.ClientSession:
+        """Paylaşılan session'ı döndür, yoksa (veya kapandıysa) oluştur"""
+        if self._session is not None and not self._session.closed:
+            return self._session
+
+        async with self._lock:
+            if self._session is None or self._session.closed:
+                connector = aiohttp.TCPConnector(
+                    limit=self.limit,
+                    limit_per_host=self.limit_per_host,
+                    keepalive_timeout=self.keepalive_timeout,
+                    ttl_dns_cache=self.dns_cache_ttl,
+                    enable_cleanup_closed=True
+                )
+                self._session = aiohttp.ClientSession(connector=connector)
+
+        return self._session
+
+    async def close(self):
+        """Shutdown'da açık bağlantıları düzgünce kapat"""
+        if self._session is not None and not self._session.closed:
+            await self._session.close()
+            # SSL bağlantılarının kapanması için kısa bekleme (aiohttp önerisi)
+            await asyncio.sleep(0.25)
+        self._session = None
@@ -1,19 +1,15 @@
 # /srv/auto-adsense/services/image-generation/auto_image_generator.py
 import os
 import json
-import time
 import redis
 import asyncio
-import requests
 from datetime import datetime
 from pathlib import Path
 from typing import Dict, Any, List, Optional
-import threading
-from PIL import Image, ImageDraw, ImageFont, ImageEnhance, ImageFilter
-import io
-import base64
 import hashlib
-import random
+from job_queue import JobQueue
+from image_renderer import RenderPool
+from image_store import ImageStore
 
 class AutoImageGenerator:
     """Popüler Title'lara Göre Otomatik Resim Üretimi Sistemi"""
@@ -101,7 +97,13 @@ class AutoImageGenerator:
             }
         }
         
-        self.log_info("Auto Image Generator initialized")
+        # Aynı spec bir kez render edilir, sonra store'dan bağlanır
+        self.image_store = ImageStore(self.redis_client, self.output_path)
+        
+        # PIL render'ı ayrı process'lerde (core başına bir worker)
+        self.render_pool = RenderPool(self.output_path, self.image_sizes, self.design_templates)
+        
+        self.log_info(f"Auto Image Generator initialized ({self.render_pool.workers} render workers)")
     
     async def generate_article_images(self, article_data: Dict[str, Any]) -> List[Dict[str, Any]]:
         """Article için otomatik resim üretimi"""
@@ -111,36 +113,44 @@ class AutoImageGenerator:
             niche = article_data.get("niche", "technology")
             keywords = article_data.get("keywords", [])
             
+            # Tüm resim tipleri render pool'da paralel üretilir
+            hero_image, pinterest_images, inline_images, social_image = await asyncio.gather(
+                self.generate_hero_image(title, niche, "article_hero"),
+                self.generate_pinterest_images(title, niche, keywords),
+                self.generate_inline_images(title, niche, keywords[:3]),
+                self.generate_social_image(title, niche, domain)
+            )
+            
             generated_images = []
             
             # 1. Hero image (article başında)
-            hero_image = await self.generate_hero_image(title, niche, "article_hero")
             if hero_image:
                 generated_images.append({
                     "type": "hero",
                     "filename": hero_image["filename"],
                     "url": hero_image["url"],
                     "alt_text": f"Complete guide to {title}",
-                    "position": "top"
+                    "position": "top",
+                    "variants": hero_image.get("variants", []),
+                    "srcset": hero_image.get("srcset", {})
                 })
             
             # 2. Pinterest optimized images (mobile-first)
-            pinterest_images = await self.generate_pinterest_images(title, niche, keywords)
             generated_images.extend(pinterest_images)
             
             # 3. Inline images (article içinde)
-            inline_images = await self.generate_inline_images(title, niche, keywords[:3])
             generated_images.extend(inline_images)
             
             # 4. Social sharing image
-            social_image = await self.generate_social_image(title, niche, domain)
             if social_image:
                 generated_images.append({
                     "type": "social",
                     "filename": social_image["filename"],
                     "url": social_image["url"],
                     "alt_text": f"Share: {title}",
-                    "position": "meta"
+                    "position": "meta",
+                    "variants": social_image.get("variants", []),
+                    "srcset": social_image.get("srcset", {})
                 })
             
             # Store generated images info
@@ -156,36 +166,12 @@ class AutoImageGenerator:
     async def generate_hero_image(self, title: str, niche: str, size_key: str) -> Optional[Dict[str, Any]]:
         """Article hero resmi oluştur"""
         try:
-            size = self.image_sizes[size_key]
-            design = self.design_templates[niche]
-            
-            # Create image
-            img = Image.new('RGB', size, color=design["colors"][0])
-            draw = ImageDraw.Draw(img)
-            
-            # Add gradient background
-            await self.add_gradient_background(img, design["colors"][:3])
-            
-            # Add title text (mobile-optimized)
-            await self.add_mobile_title_text(draw, title, size, design)
-            
-            # Add design elements
-            await self.add_design_elements(img, draw, niche, "hero")
-            
-            # Save image
-            filename = f"hero_{hashlib.md5(title.encode()).hexdigest()[:8]}.jpg"
-            filepath = self.output_path / filename
-            
-            # Optimize for mobile (smaller file size)
-            img = img.convert('RGB')
-            img.save(filepath, 'JPEG', quality=85, optimize=True)
-            
-            return {
-                "filename": filename,
-                "url": f"/images/{filename}",
-                "size": size,
-                "type": "hero"
-            }
+            return await self.render_cached("hero", {
+                "kind": "hero",
+                "title": title,
+                "niche": niche,
+                "size_key": size_key
+            })
             
         except Exception as e:
             self.log_error(f"Failed to generate hero image: {e}")
@@ -193,14 +179,7 @@ class AutoImageGenerator:
     
     async def generate_pinterest_images(self, title: str, niche: str, keywords: List[str]) -> List[Dict[str, Any]]:
         """Pinterest için optimize edilmiş resimler (mobile-first)"""
-        pinterest_images = []
-        
         try:
-            design = self.design_templates[niche]
-            
-            # 2:3 ratio for mobile Pinterest (600x900)
-            mobile_size = self.image_sizes["pinterest_mobile"]
-            
             # Generate 3 different Pinterest variations
             variations = [
                 {"style": "list", "bg": "gradient"},
@@ -208,41 +187,19 @@ class AutoImageGenerator:
                 {"style": "tip", "bg": "professional"}
             ]
             
-            for i, variation in enumerate(variations):
-                img = Image.new('RGB', mobile_size, color=design["colors"][0])
-                draw = ImageDraw.Draw(img)
-                
-                # Background
-                await self.add_pinterest_background(img, design, variation["bg"])
-                
-                # Title optimized for mobile viewing
-                await self.add_pinterest_title(draw, title, mobile_size, design, variation["style"])
-                
-                # Add Pinterest-specific elements
-                await self.add_pinterest_elements(img, draw, niche, keywords[:2], variation["style"])
-                
-                # Add branding (subtle)
-                await self.add_mobile_branding(draw, mobile_size, design)
-                
-                # Save optimized for Pinterest
-                filename = f"pinterest_{niche}_{i+1}_{hashlib.md5(title.encode()).hexdigest()[:8]}.jpg"
-                filepath = self.output_path / filename
-                
-                # High quality for Pinterest (mobile users zoom in)
-                img = img.convert('RGB')
-                img.save(filepath, 'JPEG', quality=90, optimize=True)
-                
-                pinterest_images.append({
-                    "type": "pinterest",
-                    "filename": filename,
-                    "url": f"/images/{filename}",
-                    "alt_text": f"Pinterest: {title}",
-                    "size": mobile_size,
-                    "variation": variation["style"],
-                    "optimized_for": "mobile"
+            pinterest_images = await asyncio.gather(*[
+                self.render_cached(f"pinterest_{niche}_{i+1}", {
+                    "kind": "pinterest",
+                    "title": title,
+                    "niche": niche,
+                    "keywords": keywords,
+                    "index": i,
+                    "variation": variation
                 })
+                for i, variation in enumerate(variations)
+            ])
             
-            return pinterest_images
+            return list(pinterest_images)
             
         except Exception as e:
             self.log_error(f"Failed to generate Pinterest images: {e}")
@@ -250,335 +207,57 @@ class AutoImageGenerator:
     
     async def generate_inline_images(self, title: str, niche: str, keywords: List[str]) -> List[Dict[str, Any]]:
         """Article içi resimler (mobile-responsive)"""
-        inline_images = []
-        
         try:
-            design = self.design_templates[niche]
-            size = self.image_sizes["article_inline"]
-            
-            for i, keyword in enumerate(keywords):
-                img = Image.new('RGB', size, color=design["colors"][1])
-                draw = ImageDraw.Draw(img)
-                
-                # Simple, clean design for article content
-                await self.add_clean_background(img, design["colors"])
-                
-                # Keyword-focused content
-                await self.add_keyword_focus(draw, keyword, size, design)
-                
-                # Mobile-optimized elements
-                await self.add_inline_elements(img, draw, niche, keyword)
-                
-                filename = f"inline_{niche}_{i+1}_{hashlib.md5(keyword.encode()).hexdigest()[:8]}.jpg"
-                filepath = self.output_path / filename
-                
-                img = img.convert('RGB')
-                img.save(filepath, 'JPEG', quality=85, optimize=True)
-                
-                inline_images.append({
-                    "type": "inline",
-                    "filename": filename,
-                    "url": f"/images/{filename}",
-                    "alt_text": f"Guide to {keyword}",
+            inline_images = await asyncio.gather(*[
+                self.render_cached(f"inline_{niche}_{i+1}", {
+                    "kind": "inline",
+                    "niche": niche,
                     "keyword": keyword,
-                    "position": f"section_{i+1}"
+                    "index": i
                 })
+                for i, keyword in enumerate(keywords)
+            ])
             
-            return inline_images
+            return list(inline_images)
             
         except Exception as e:
             self.log_error(f"Failed to generate inline images: {e}")
             return []
     
-    async def add_gradient_background(self, img: Image.Image, colors: List[str]):
-        """Gradient background ekle"""
-        width, height = img.size
-        
-        # Create gradient
-        for y in range(height):
-            ratio = y / height
-            if ratio < 0.5:
-                # Top half
-                blend_ratio = ratio * 2
-                r1, g1, b1 = self.hex_to_rgb(colors[0])
-                r2, g2, b2 = self.hex_to_rgb(colors[1])
-            else:
-                # Bottom half
-                blend_ratio = (ratio - 0.5) * 2
-                r1, g1, b1 = self.hex_to_rgb(colors[1])
-                r2, g2, b2 = self.hex_to_rgb(colors[2])
-            
-            r = int(r1 + (r2 - r1) * blend_ratio)
-            g = int(g1 + (g2 - g1) * blend_ratio)
-            b = int(b1 + (b2 - b1) * blend_ratio)
-            
-            # Draw line
-            draw = ImageDraw.Draw(img)
-            draw.line([(0, y), (width, y)], fill=(r, g, b))
-    
-    async def add_mobile_title_text(self, draw: ImageDraw.Draw, title: str, size: tuple, design: Dict[str, Any]):
-        """Mobile için optimize edilmiş title text"""
-        width, height = size
-        
-        # Font size based on screen size
-        font_size = min(48, width // 12)
-        
-        try:
-            font = ImageFont.truetype("/usr/share/fonts/truetype/dejavu/DejaVuSans-Bold.ttf", font_size)
-        except:
-            font = ImageFont.load_default()
-        
-        # Word wrap for mobile
-        words = title.split()
-        lines = []
-        current_line = ""
-        max_width = width - 100  # Padding
-        
-        for word in words:
-            test_line = current_line + (" " if current_line else "") + word
-            bbox = draw.textbbox((0, 0), test_line, font=font)
-            if bbox[2] - bbox[0] <= max_width:
-                current_line = test_line
-            else:
-                if current_line:
-                    lines.append(current_line)
-                current_line = word
-        
-        if current_line:
-            lines.append(current_line)
-        
-        # Center text vertically
-        total_height = len(lines) * font_size * 1.2
-        start_y = (height - total_height) // 2
-        
-        # Draw text with shadow for mobile readability
-        for i, line in enumerate(lines):
-            y = start_y + i * font_size * 1.2
-            x = 50  # Left margin
-            
-            # Shadow
-            draw.text((x + 2, y + 2), line, font=font, fill="rgba(0,0,0,0.3)")
-            # Main text
-            draw.text((x, y), line, font=font, fill="white")
-    
-    async def add_pinterest_title(self, draw: ImageDraw.Draw, title: str, size: tuple, design: Dict[str, Any], style: str):
-        """Pinterest için özel title layout (mobile-optimized)"""
-        width, height = size
-        
-        # Pinterest'te mobile'da daha büyük fontlar daha iyi
-        font_size = 52 if style == "list" else 46
-        
-        try:
-            font = ImageFont.truetype("/usr/share/fonts/truetype/dejavu/DejaVuSans-Bold.ttf", font_size)
-        except:
-            font = ImageFont.load_default()
-        
-        # Pinterest için özel word wrapping
-        words = title.split()
-        lines = []
-        current_line = ""
-        max_width = width - 80  # Pinterest mobile padding
-        
-        for word in words:
-            test_line = current_line + (" " if current_line else "") + word
-            bbox = draw.textbbox((0, 0), test_line, font=font)
-            if bbox[2] - bbox[0] <= max_width:
-                current_line = test_line
-            else:
-                if current_line:
-                    lines.append(current_line)
-                current_line = word
-        
-        if current_line:
-            lines.append(current_line)
-        
-        # Pinterest'te üst kısım daha etkili
-        start_y = 120
-        
-        # High contrast for mobile
-        for i, line in enumerate(lines):
-            y = start_y + i * font_size * 1.1
-            x = 40
-            
-            # Strong shadow for mobile readability
-            draw.text((x + 3, y + 3), line, font=font, fill="rgba(0,0,0,0.6)")
-            # Bright main text
-            draw.text((x, y), line, font=font, fill="white")
-    
-    async def add_mobile_branding(self, draw: ImageDraw.Draw, size: tuple, design: Dict[str, Any]):
-        """Mobile için subtle branding"""
-        width, height = size
-        
-        # Small branding at bottom
-        try:
-            small_font = ImageFont.truetype("/usr/share/fonts/truetype/dejavu/DejaVuSans.ttf", 24)
-        except:
-            small_font = ImageFont.load_default()
-        
-        branding_text = "Expert Guide"
-        x = width - 150
-        y = height - 60
-        
-        # Subtle branding
-        draw.text((x, y), branding_text, font=small_font, fill="rgba(255,255,255,0.7)")
-    
-    async def add_pinterest_background(self, img: Image.Image, design: Dict[str, Any], bg_type: str):
-        """Pinterest için background"""
-        if bg_type == "gradient":
-            await self.add_gradient_background(img, design["colors"][:3])
-        elif bg_type == "clean":
-            # Solid color with texture
-            img.paste(design["colors"][0], (0, 0, img.width, img.height))
-        else:
-            # Professional gradient
-            await self.add_gradient_background(img, [design["colors"][0], design["colors"][1], design["colors"][2]])
-    
-    async def add_pinterest_elements(self, img: Image.Image, draw: ImageDraw.Draw, niche: str, keywords: List[str], style: str):
-        """Pinterest için özel elementler"""
-        width, height = img.size
-        
-        if style == "list" and keywords:
-            # List style elements
-            try:
-                font = ImageFont.truetype("/usr/share/fonts/truetype/dejavu/DejaVuSans.ttf", 32)
-            except:
-                font = ImageFont.load_default()
-            
-            start_y = height // 2 + 50
-            for i, keyword in enumerate(keywords[:3]):
-                y = start_y + i * 50
-                draw.text((60, y), f"• {keyword.title()}", font=font, fill="white")
-        
-        elif style == "quote":
-            # Quote marks
-            try:
-                quote_font = ImageFont.truetype("/usr/share/fonts/truetype/dejavu/DejaVuSans-Bold.ttf", 80)
-            except:
-                quote_font = ImageFont.load_default()
-            
-            draw.text((50, height//2 + 100), '"', font=quote_font, fill="rgba(255,255,255,0.3)")
-            draw.text((width-100, height//2 + 200), '"', font=quote_font, fill="rgba(255,255,255,0.3)")
-    
-    async def add_design_elements(self, img: Image.Image, draw: ImageDraw.Draw, niche: str, image_type: str):
-        """Niche'e göre design elementleri"""
-        width, height = img.size
-        design = self.design_templates[niche]
-        
-        # Simple geometric elements for mobile clarity
-        if niche == "finance":
-            # Simple chart bars
-            bar_width = 20
-            for i in range(3):
-                x = width - 150 + i * 30
-                bar_height = 50 + i * 30
-                y = height - 100 - bar_height
-                draw.rectangle([x, y, x + bar_width, height - 100], fill="rgba(255,255,255,0.3)")
-        
-        elif niche == "technology":
-            # Simple tech grid
-            for i in range(3):
-                for j in range(3):
-                    x = width - 120 + i * 25
-                    y = height - 120 + j * 25
-                    draw.rectangle([x, y, x + 15, y + 15], fill="rgba(255,255,255,0.2)")
-        
-        # Add more niche-specific elements as needed
-    
-    async def add_clean_background(self, img: Image.Image, colors: List[str]):
-        """Clean background for inline images"""
-        # Light gradient
-        await self.add_gradient_background(img, [colors[3], colors[4], "white"])
-    
-    async def add_keyword_focus(self, draw: ImageDraw.Draw, keyword: str, size: tuple, design: Dict[str, Any]):
-        """Keyword odaklı content"""
-        width, height = size
-        
-        try:
-            title_font = ImageFont.truetype("/usr/share/fonts/truetype/dejavu/DejaVuSans-Bold.ttf", 36)
-            subtitle_font = ImageFont.truetype("/usr/share/fonts/truetype/dejavu/DejaVuSans.ttf", 24)
-        except:
-            title_font = ImageFont.load_default()
-            subtitle_font = ImageFont.load_default()
-        
-        # Keyword as main text
-        x = 50
-        y = height // 2 - 50
-        
-        draw.text((x, y), keyword.title(), font=title_font, fill=design["colors"][0])
-        draw.text((x, y + 50), "Complete Guide", font=subtitle_font, fill=design["colors"][1])
-    
-    async def add_inline_elements(self, img: Image.Image, draw: ImageDraw.Draw, niche: str, keyword: str):
-        """Inline image elementleri"""
-        # Simple, clean elements that work well in articles
-        pass
-    
     async def generate_social_image(self, title: str, niche: str, domain: str) -> Optional[Dict[str, Any]]:
         """Social sharing için resim"""
         try:
-            size = self.image_sizes["social_share"]
-            design = self.design_templates[niche]
-            
-            img = Image.new('RGB', size, color=design["colors"][0])
-            draw = ImageDraw.Draw(img)
-            
-            # Social sharing optimized layout
-            await self.add_gradient_background(img, design["colors"][:2])
-            await self.add_social_title(draw, title, size, design)
-            await self.add_social_branding(draw, domain, size, design)
-            
-            filename = f"social_{hashlib.md5(title.encode()).hexdigest()[:8]}.jpg"
-            filepath = self.output_path / filename
-            
-            img = img.convert('RGB')
-            img.save(filepath, 'JPEG', quality=90, optimize=True)
-            
-            return {
-                "filename": filename,
-                "url": f"/images/{filename}",
-                "size": size,
-                "type": "social"
-            }
+            return await self.render_cached("social", {
+                "kind": "social",
+                "title": title,
+                "niche": niche,
+                "domain": domain
+            })
             
         except Exception as e:
             self.log_error(f"Failed to generate social image: {e}")
             return None
     
-    async def add_social_title(self, draw: ImageDraw.Draw, title: str, size: tuple, design: Dict[str, Any]):
-        """Social media için title"""
-        width, height = size
-        
-        try:
-            font = ImageFont.truetype("/usr/share/fonts/truetype/dejavu/DejaVuSans-Bold.ttf", 48)
-        except:
-            font = ImageFont.load_default()
-        
-        # Center the title
-        bbox = draw.textbbox((0, 0), title, font=font)
-        text_width = bbox[2] - bbox[0]
-        text_height = bbox[3] - bbox[1]
-        
-        x = (width - text_width) // 2
-        y = (height - text_height) // 2
-        
-        # Shadow
-        draw.text((x + 2, y + 2), title, font=font, fill="rgba(0,0,0,0.3)")
-        # Main text
-        draw.text((x, y), title, font=font, fill="white")
-    
-    async def add_social_branding(self, draw: ImageDraw.Draw, domain: str, size: tuple, design: Dict[str, Any]):
-        """Social media için branding"""
-        width, height = size
-        
-        try:
-            font = ImageFont.truetype("/usr/share/fonts/truetype/dejavu/DejaVuSans.ttf", 24)
-        except:
-            font = ImageFont.load_default()
-        
-        # Domain at bottom
-        x = 50
-        y = height - 80
+    async def render_cached(self, prefix: str, spec: Dict[str, Any]) -> Dict[str, Any]:
+        """Store'da aynı spec varsa onu bağla, yoksa render pool'da üret ve indexle"""
+        digest = self.image_store.key(
+            "auto_image",
+            spec=spec,
+            sizes=self.image_sizes,
+            colors=self.design_templates[spec["niche"]]["colors"]
+        )
         
-        draw.text((x, y), domain, font=font, fill="rgba(255,255,255,0.8)")
+        cached = self.image_store.get(digest)
+        if cached:
+            self.image_store.link(digest, cached)
+            return cached
+        
+        result = await self.render_pool.render({
+            **spec,
+            "filename": self.image_store.filename(prefix, digest),
+            "path": str(self.image_store.blob_path(digest))
+        })
+        return self.image_store.put(digest, result)
     
     async def store_generated_images(self, domain: str, title: str, images: List[Dict[str, Any]]):
         """Üretilen resimleri kaydet"""
@@ -603,6 +282,10 @@ class AutoImageGenerator:
         hex_color = hex_color.lstrip('#')
         return tuple(int(hex_color[i:i+2], 16) for i in (0, 2, 4))
     
+    def close(self):
+        """Render worker process'lerini kapat"""
+        self.render_pool.close()
+    
     def log_info(self, message: str):
         timestamp = datetime.now().strftime("%Y-%m-%d %H:%M:%S")
         print(f"[{timestamp}] IMAGE-GEN: {message}")
@@ -618,35 +301,44 @@ async def main():
     print("🎨 Auto Image Generator started")
     print("📱 Optimized for mobile Pinterest users")
     
-    while True:
-        try:
-            # Check for image generation requests
-            request = generator.redis_client.rpop("image_generation_queue")
-            
-            if request:
-                request_data = json.loads(request)
-                print(f"🖼️ Generating images for: {request_data.get('title', 'Unknown')}")
-                
-                images = await generator.generate_article_images(request_data)
+    queue = JobQueue(generator.redis_client, "image_generation_queue")
+    
+    try:
+        while True:
+            job = None
+            try:
+                # Block on the queue instead of polling
+                job = await asyncio.to_thread(queue.reserve, 5)
                 
-                if images:
-                    print(f"✅ Generated {len(images)} images")
+                if job:
+                    request_data = json.loads(job.raw)
+                    print(f"🖼️ Generating images for: {request_data.get('title', 'Unknown')}")
                     
-                    # Update content with generated images
-                    generator.redis_client.lpush("content_update_queue", json.dumps({
-                        "domain": request_data["domain"],
-                        "title": request_data["title"],
-                        "images": images,
-                        "type": "add_images"
-                    }))
-                else:
-                    print("❌ Failed to generate images")
-            
-            await asyncio.sleep(5)  # Check every 5 seconds
-            
-        except Exception as e:
-            print(f"❌ Image Generator error: {e}")
-            await asyncio.sleep(30)
+                    with job.keepalive():
+                        images = await generator.generate_article_images(request_data)
+                    
+                    if images:
+                        print(f"✅ Generated {len(images)} images")
+                        
+                        # Update content with generated images
+                        generator.redis_client.lpush("content_update_queue", json.dumps({
+                            "domain": request_data["domain"],
+                            "title": request_data["title"],
+                            "images": images,
+                            "type": "add_images"
+                        }))
+                        job.ack()
+                    else:
+                        print("❌ Failed to generate images")
+                        job.nack("no images generated")
+                
+            except Exception as e:
+                if job:
+                    job.nack(str(e))
+                print(f"❌ Image Generator error: {e}")
+                await asyncio.sleep(30)
+    finally:
+        generator.close()
 
 if __name__ == "__main__":
     asyncio.run(main())
@@ -0,0 +1,51 @@
+# /srv/auto-adsense/services/image-generation/gradients.py
+from functools import lru_cache
+from typing import List, Sequence, Tuple
+from PIL import Image, ImageChops, ImageColor
+
+
+@lru_cache(maxsize=128)
+def gradient_luts(colors: Tuple[str, ...]) -> Tuple[List[int], List[int], List[int]]:
+    """Eşit aralıklı renk duraklarından R, G, B için 256'lık lookup tabloları"""
+    stops = [ImageColor.getrgb(color)[:3] for color in colors]
+    if len(stops) == 1:
+        stops = stops * 2
+
+    segments = len(stops) - 1
+    luts = ([], [], [])
+
+    for value in range(256):
+        ratio = value / 256
+        index = min(int(ratio * segments), segments - 1)
+        blend = ratio * segments - index
+        start, end = stops[index], stops[index + 1]
+
+        for channel in range(3):
+            luts[channel].append(int(start[channel] + (end[channel] - start[channel]) * blend))
+
+    return luts
+
+
+@lru_cache(maxsize=32)
+def gradient_mask(size: Tuple[int, int], direction: str) -> Image.Image:
+    """0-255 arası ilerleme maskesi (vertical, horizontal, diagonal)"""
+    base = Image.linear_gradient("L")  # 256x256, yukarıdan aşağı 0 -> 255
+
+    if direction == "horizontal":
+        return base.transpose(Image.Transpose.TRANSPOSE).resize(size)
+
+    vertical = base.resize(size)
+    if direction == "diagonal":
+        # Sol üst -> sağ alt: iki eksenin ortalaması
+        horizontal = base.transpose(Image.Transpose.TRANSPOSE).resize(size)
+        return ImageChops.add(vertical, horizontal, scale=2)
+
+    return vertical
+
+
+def render_gradient(size: Tuple[int, int], colors: Sequence[str], direction: str = "vertical") -> Image.Image:
+    """Çok duraklı gradient'i tek seferde RGB resim olarak üret"""
+    mask = gradient_mask(tuple(size), direction)
+    r_lut, g_lut, b_lut = gradient_luts(tuple(colors))
+
+    return Image.merge("RGB", (mask.point(r_lut), mask.point(g_lut), mask.point(b_lut)))
@@ -0,0 +1,433 @@
+# /srv/auto-adsense/services/image-generation/image_renderer.py
+import os
+import asyncio
+from concurrent.futures import ProcessPoolExecutor
+from concurrent.futures.process import BrokenProcessPool
+from pathlib import Path
+from typing import Dict, Any, List, Optional
+from PIL import Image, ImageDraw
+from gradients import render_gradient
+from render_cache import BackgroundCache, load_font, FONT_BOLD, FONT_REGULAR
+from image_variants import build_variants
+
+
+class ImageRenderer:
+    """Senkron PIL render'ı: render spec -> spec["path"]'teki JPEG + metadata
+
+    Redis veya event loop'a dokunmaz; process pool worker'larında her
+    process kendi instance'ını (ve kendi font/background cache'ini) tutar.
+    """
+    
+    def __init__(self, output_path: Path, image_sizes: Dict[str, tuple], design_templates: Dict[str, Dict[str, Any]]):
+        self.output_path = Path(output_path)
+        self.image_sizes = image_sizes
+        self.design_templates = design_templates
+        
+        # Niche/size/style başına bir kez render edilen base background'lar
+        self.background_cache = BackgroundCache()
+    
+    def render(self, spec: Dict[str, Any]) -> Dict[str, Any]:
+        """Resmi render et, ardından responsive varyantlarını üret"""
+        result = self.render_kind(spec)
+        result.update(build_variants(Path(spec["path"]), spec["filename"]))
+        return result
+    
+    def render_kind(self, spec: Dict[str, Any]) -> Dict[str, Any]:
+        """spec["kind"]: hero, pinterest, inline veya social"""
+        kind = spec["kind"]
+        filename, path = spec["filename"], Path(spec["path"])
+        
+        if kind == "hero":
+            return self.render_hero(spec["title"], spec["niche"], spec["size_key"], filename, path)
+        if kind == "pinterest":
+            return self.render_pinterest(spec["title"], spec["niche"], spec["keywords"], spec["index"], spec["variation"], filename, path)
+        if kind == "inline":
+            return self.render_inline(spec["niche"], spec["keyword"], spec["index"], filename, path)
+        if kind == "social":
+            return self.render_social(spec["title"], spec["niche"], spec["domain"], filename, path)
+        
+        raise ValueError(f"Unknown render kind: {kind}")
+    
+    def save(self, img: Image.Image, filepath: Path, quality: int) -> Path:
+        # Yarım yazılmış dosya store'a girmesin
+        tmp_path = filepath.with_name(f".{filepath.name}.tmp")
+        img = img.convert('RGB')
+        img.save(tmp_path, 'JPEG', quality=quality, optimize=True)
+        os.replace(tmp_path, filepath)
+        return filepath
+    
+    def render_hero(self, title: str, niche: str, size_key: str, filename: str, path: Path) -> Dict[str, Any]:
+        """Article hero resmi"""
+        size = self.image_sizes[size_key]
+        design = self.design_templates[niche]
+        
+        # Cached gradient background
+        img = self.base_image(niche, size_key, "gradient")
+        draw = ImageDraw.Draw(img)
+        
+        # Add title text (mobile-optimized)
+        self.add_mobile_title_text(draw, title, size, design)
+        
+        # Add design elements
+        self.add_design_elements(img, draw, niche, "hero")
+        
+        # Optimize for mobile (smaller file size)
+        filepath = self.save(img, path, 85)
+        
+        return {
+            "filename": filename,
+            "path": str(filepath),
+            "url": f"/images/{filename}",
+            "size": size,
+            "type": "hero"
+        }
+    
+    def render_pinterest(self, title: str, niche: str, keywords: List[str], index: int, variation: Dict[str, str],
+                         filename: str, path: Path) -> Dict[str, Any]:
+        """Tek Pinterest varyasyonu (mobile-first, 2:3)"""
+        design = self.design_templates[niche]
+        mobile_size = self.image_sizes["pinterest_mobile"]
+        
+        # Background
+        img = self.base_image(niche, "pinterest_mobile", variation["bg"])
+        draw = ImageDraw.Draw(img)
+        
+        # Title optimized for mobile viewing
+        self.add_pinterest_title(draw, title, mobile_size, design, variation["style"])
+        
+        # Add Pinterest-specific elements
+        self.add_pinterest_elements(img, draw, niche, keywords[:2], variation["style"])
+        
+        # Add branding (subtle)
+        self.add_mobile_branding(draw, mobile_size, design)
+        
+        # High quality for Pinterest (mobile users zoom in)
+        filepath = self.save(img, path, 90)
+        
+        return {
+            "type": "pinterest",
+            "filename": filename,
+            "path": str(filepath),
+            "url": f"/images/{filename}",
+            "alt_text": f"Pinterest: {title}",
+            "size": mobile_size,
+            "variation": variation["style"],
+            "optimized_for": "mobile"
+        }
+    
+    def render_inline(self, niche: str, keyword: str, index: int, filename: str, path: Path) -> Dict[str, Any]:
+        """Article içi resim"""
+        design = self.design_templates[niche]
+        size = self.image_sizes["article_inline"]
+        
+        # Simple, clean design for article content
+        img = self.base_image(niche, "article_inline", "light")
+        draw = ImageDraw.Draw(img)
+        
+        # Keyword-focused content
+        self.add_keyword_focus(draw, keyword, size, design)
+        
+        # Mobile-optimized elements
+        self.add_inline_elements(img, draw, niche, keyword)
+        
+        filepath = self.save(img, path, 85)
+        
+        return {
+            "type": "inline",
+            "filename": filename,
+            "path": str(filepath),
+            "url": f"/images/{filename}",
+            "alt_text": f"Guide to {keyword}",
+            "keyword": keyword,
+            "position": f"section_{index+1}"
+        }
+    
+    def render_social(self, title: str, niche: str, domain: str, filename: str, path: Path) -> Dict[str, Any]:
+        """Social sharing resmi"""
+        size = self.image_sizes["social_share"]
+        design = self.design_templates[niche]
+        
+        # Social sharing optimized layout
+        img = self.base_image(niche, "social_share", "duotone")
+        draw = ImageDraw.Draw(img)
+        self.add_social_title(draw, title, size, design)
+        self.add_social_branding(draw, domain, size, design)
+        
+        filepath = self.save(img, path, 90)
+        
+        return {
+            "filename": filename,
+            "path": str(filepath),
+            "url": f"/images/{filename}",
+            "size": size,
+            "type": "social"
+        }
+    
+    def base_image(self, niche: str, size_key: str, style: str) -> Image.Image:
+        """Cache'teki base background'un üzerine çizilebilir kopyası"""
+        return self.background_cache.get(
+            (niche, size_key, style),
+            lambda: self.render_background(niche, size_key, style)
+        )
+    
+    def render_background(self, niche: str, size_key: str, style: str) -> Image.Image:
+        """Başlıktan bağımsız background'u render et"""
+        size = self.image_sizes[size_key]
+        colors = self.design_templates[niche]["colors"]
+        
+        if style == "clean":
+            # Solid color
+            return Image.new('RGB', size, color=colors[0])
+        if style == "light":
+            # Light gradient for inline images
+            return render_gradient(size, [colors[3], colors[4], "white"])
+        if style == "duotone":
+            return render_gradient(size, colors[:2])
+        if style == "professional":
+            return render_gradient(size, colors[:3], "diagonal")
+        
+        return render_gradient(size, colors[:3])
+    
+    def add_gradient_background(self, img: Image.Image, colors: List[str], direction: str = "vertical"):
+        """Gradient background ekle (çok duraklı; vertical, horizontal veya diagonal)"""
+        img.paste(render_gradient(img.size, colors, direction), (0, 0))
+    
+    def add_mobile_title_text(self, draw: ImageDraw.Draw, title: str, size: tuple, design: Dict[str, Any]):
+        """Mobile için optimize edilmiş title text"""
+        width, height = size
+        
+        # Font size based on screen size
+        font_size = min(48, width // 12)
+        
+        font = load_font(FONT_BOLD, font_size)
+        
+        # Word wrap for mobile
+        words = title.split()
+        lines = []
+        current_line = ""
+        max_width = width - 100  # Padding
+        
+        for word in words:
+            test_line = current_line + (" " if current_line else "") + word
+            bbox = draw.textbbox((0, 0), test_line, font=font)
+            if bbox[2] - bbox[0] <= max_width:
+                current_line = test_line
+            else:
+                if current_line:
+                    lines.append(current_line)
+                current_line = word
+        
+        if current_line:
+            lines.append(current_line)
+        
+        # Center text vertically
+        total_height = len(lines) * font_size * 1.2
+        start_y = (height - total_height) // 2
+        
+        # Draw text with shadow for mobile readability
+        for i, line in enumerate(lines):
+            y = start_y + i * font_size * 1.2
+            x = 50  # Left margin
+            
+            # Shadow
+            draw.text((x + 2, y + 2), line, font=font, fill="rgba(0,0,0,0.3)")
+            # Main text
+            draw.text((x, y), line, font=font, fill="white")
+    
+    def add_pinterest_title(self, draw: ImageDraw.Draw, title: str, size: tuple, design: Dict[str, Any], style: str):
+        """Pinterest için özel title layout (mobile-optimized)"""
+        width, height = size
+        
+        # Pinterest'te mobile'da daha büyük fontlar daha iyi
+        font_size = 52 if style == "list" else 46
+        
+        font = load_font(FONT_BOLD, font_size)
+        
+        # Pinterest için özel word wrapping
+        words = title.split()
+        lines = []
+        current_line = ""
+        max_width = width - 80  # Pinterest mobile padding
+        
+        for word in words:
+            test_line = current_line + (" " if current_line else "") + word
+            bbox = draw.textbbox((0, 0), test_line, font=font)
+            if bbox[2] - bbox[0] <= max_width:
+                current_line = test_line
+            else:
+                if current_line:
+                    lines.append(current_line)
+                current_line = word
+        
+        if current_line:
+            lines.append(current_line)
+        
+        # Pinterest'te üst kısım daha etkili
+        start_y = 120
+        
+        # High contrast for mobile
+        for i, line in enumerate(lines):
+            y = start_y + i * font_size * 1.1
+            x = 40
+            
+            # Strong shadow for mobile readability
+            draw.text((x + 3, y + 3), line, font=font, fill="rgba(0,0,0,0.6)")
+            # Bright main text
+            draw.text((x, y), line, font=font, fill="white")
+    
+    def add_mobile_branding(self, draw: ImageDraw.Draw, size: tuple, design: Dict[str, Any]):
+        """Mobile için subtle branding"""
+        width, height = size
+        
+        # Small branding at bottom
+        small_font = load_font(FONT_REGULAR, 24)
+        
+        branding_text = "Expert Guide"
+        x = width - 150
+        y = height - 60
+        
+        # Subtle branding
+        draw.text((x, y), branding_text, font=small_font, fill="rgba(255,255,255,0.7)")
+    
+    def add_pinterest_elements(self, img: Image.Image, draw: ImageDraw.Draw, niche: str, keywords: List[str], style: str):
+        """Pinterest için özel elementler"""
+        width, height = img.size
+        
+        if style == "list" and keywords:
+            # List style elements
+            font = load_font(FONT_REGULAR, 32)
+            
+            start_y = height // 2 + 50
+            for i, keyword in enumerate(keywords[:3]):
+                y = start_y + i * 50
+                draw.text((60, y), f"• {keyword.title()}", font=font, fill="white")
+        
+        elif style == "quote":
+            # Quote marks
+            quote_font = load_font(FONT_BOLD, 80)
+            
+            draw.text((50, height//2 + 100), '"', font=quote_font, fill="rgba(255,255,255,0.3)")
+            draw.text((width-100, height//2 + 200), '"', font=quote_font, fill="rgba(255,255,255,0.3)")
+    
+    def add_design_elements(self, img: Image.Image, draw: ImageDraw.Draw, niche: str, image_type: str):
+        """Niche'e göre design elementleri"""
+        width, height = img.size
+        design = self.design_templates[niche]
+        
+        # Simple geometric elements for mobile clarity
+        if niche == "finance":
+            # Simple chart bars
+            bar_width = 20
+            for i in range(3):
+                x = width - 150 + i * 30
+                bar_height = 50 + i * 30
+                y = height - 100 - bar_height
+                draw.rectangle([x, y, x + bar_width, height - 100], fill="rgba(255,255,255,0.3)")
+        
+        elif niche == "technology":
+            # Simple tech grid
+            for i in range(3):
+                for j in range(3):
+                    x = width - 120 + i * 25
+                    y = height - 120 + j * 25
+                    draw.rectangle([x, y, x + 15, y + 15], fill="rgba(255,255,255,0.2)")
+        
+        # Add more niche-specific elements as needed
+    
+    def add_keyword_focus(self, draw: ImageDraw.Draw, keyword: str, size: tuple, design: Dict[str, Any]):
+        """Keyword odaklı content"""
+        width, height = size
+        
+        title_font = load_font(FONT_BOLD, 36)
+        subtitle_font = load_font(FONT_REGULAR, 24)
+        
+        # Keyword as main text
+        x = 50
+        y = height // 2 - 50
+        
+        draw.text((x, y), keyword.title(), font=title_font, fill=design["colors"][0])
+        draw.text((x, y + 50), "Complete Guide", font=subtitle_font, fill=design["colors"][1])
+    
+    def add_inline_elements(self, img: Image.Image, draw: ImageDraw.Draw, niche: str, keyword: str):
+        """Inline image elementleri"""
+        # Simple, clean elements that work well in articles
+        pass
+    
+    def add_social_title(self, draw: ImageDraw.Draw, title: str, size: tuple, design: Dict[str, Any]):
+        """Social media için title"""
+        width, height = size
+        
+        font = load_font(FONT_BOLD, 48)
+        
+        # Center the title
+        bbox = draw.textbbox((0, 0), title, font=font)
+        text_width = bbox[2] - bbox[0]
+        text_height = bbox[3] - bbox[1]
+        
+        x = (width - text_width) // 2
+        y = (height - text_height) // 2
+        
+        # Shadow
+        draw.text((x + 2, y + 2), title, font=font, fill="rgba(0,0,0,0.3)")
+        # Main text
+        draw.text((x, y), title, font=font, fill="white")
+    
+    def add_social_branding(self, draw: ImageDraw.Draw, domain: str, size: tuple, design: Dict[str, Any]):
+        """Social media için branding"""
+        width, height = size
+        
+        font = load_font(FONT_REGULAR, 24)
+        
+        # Domain at bottom
+        x = 50
+        y = height - 80
+        
+        draw.text((x, y), domain, font=font, fill="rgba(255,255,255,0.8)")
+
+
+# Worker process başına tek renderer (initializer ile kurulur)
+_renderer: Optional[ImageRenderer] = None
+
+
+def init_render_worker(output_path: str, image_sizes: Dict[str, tuple], design_templates: Dict[str, Dict[str, Any]]):
+    global _renderer
+    _renderer = ImageRenderer(Path(output_path), image_sizes, design_templates)
+
+
+def render_spec(spec: Dict[str, Any]) -> Dict[str, Any]:
+    return _renderer.render(spec)
+
+
+class RenderPool:
+    """Render spec'lerini CPU sayısı kadar process'e dağıtan async arayüz
+
+    PIL çizimi ve JPEG encode GIL'i tutar; event loop'u bloklamamak ve
+    birden fazla core kullanmak için işi ProcessPoolExecutor'a gönderiyoruz.
+    IMAGE_RENDER_WORKERS=0 (varsayılan) os.cpu_count() kullanır.
+    """
+    
+    def __init__(self, output_path: Path, image_sizes: Dict[str, tuple], design_templates: Dict[str, Dict[str, Any]],
+                 workers: Optional[int] = None):
+        self.initargs = (str(output_path), image_sizes, design_templates)
+        self.workers = workers or int(os.getenv("IMAGE_RENDER_WORKERS", "0")) or os.cpu_count() or 1
+        self.executor = self.create_executor()
+    
+    def create_executor(self) -> ProcessPoolExecutor:
+        return ProcessPoolExecutor(
+            max_workers=self.workers,
+            initializer=init_render_worker,
+            initargs=self.initargs
+        )
+    
+    async def render(self, spec: Dict[str, Any]) -> Dict[str, Any]:
+        loop = asyncio.get_running_loop()
+        try:
+            return await loop.run_in_executor(self.executor, render_spec, spec)
+        except BrokenProcessPool:
+            # Bir worker öldü (OOM vb.); sonraki işler için havuzu yenile
+            self.executor.shutdown(wait=False, cancel_futures=True)
+            self.executor = self.create_executor()
+            raise
+    
+    def close(self):
+        self.executor.shutdown(wait=True, cancel_futures=True)
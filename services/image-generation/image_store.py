@@ -0,0 +1,109 @@
+# /srv/auto-adsense/services/image-generation/image_store.py
+import os
+import json
+import shutil
+import hashlib
+import redis
+from datetime import datetime
+from pathlib import Path
+from typing import Dict, Any, Optional
+
+
+class ImageStore:
+    """(generator, prompt/spec, size, style) hash'i ile adreslenen resim deposu
+
+    Her benzersiz resim bir kez `store/{digest[:2]}/{digest}.jpg` olarak
+    yazılır. Sitelerin kullandığı `/images/{filename}` dosyaları bu blob'a
+    hardlink'tir (olmazsa symlink, o da olmazsa kopya); WebP/AVIF ve
+    küçültülmüş varyantlar blob'un yanında durur ve aynı şekilde bağlanır.
+    Metadata Redis'te `image_store:index` hash'inde tutulur; aynı spec
+    tekrar istendiğinde üretim (ve Nano Banana çağrısı) atlanır.
+    `image_store:files` public dosya adından digest'e gider; makaleyi yazan
+    servisler `/images/{filename}` URL'inden varyantları buradan okur.
+    """
+
+    def __init__(self, redis_client: redis.Redis, output_path: Path, namespace: str = "image_store"):
+        self.redis_client = redis_client
+        self.output_path = Path(output_path)
+        self.blob_root = self.output_path / "store"
+        self.blob_root.mkdir(parents=True, exist_ok=True)
+
+        self.index_key = f"{namespace}:index"
+        self.hits_key = f"{namespace}:hits"
+        self.files_key = f"{namespace}:files"
+
+    def key(self, generator: str, **params) -> str:
+        """Tam sha256: parametre sırası ve JSON formatından bağımsız"""
+        payload = json.dumps({"generator": generator, **params}, sort_keys=True, separators=(",", ":"))
+        return hashlib.sha256(payload.encode()).hexdigest()
+
+    def filename(self, prefix: str, digest: str) -> str:
+        # 128 bit yeterli; tam digest blob yolunda ve index'te duruyor
+        return f"{prefix}_{digest[:32]}.jpg"
+
+    def blob_path(self, digest: str) -> Path:
+        path = self.blob_root / digest[:2] / f"{digest}.jpg"
+        path.parent.mkdir(parents=True, exist_ok=True)
+        return path
+
+    def get(self, digest: str) -> Optional[Dict[str, Any]]:
+        """Index'teki metadata'yı döndür; blob kaybolduysa kaydı sil"""
+        try:
+            raw = self.redis_client.hget(self.index_key, digest)
+        except redis.RedisError:
+            return None
+
+        if not raw:
+            return None
+
+        metadata = json.loads(raw)
+        blob = self.blob_path(digest)
+        variant_blobs = [self.variant_path(digest, v["suffix"]) for v in metadata.get("variants", []) if v.get("suffix")]
+        if not blob.exists() or not all(path.exists() for path in variant_blobs):
+            self.redis_client.hdel(self.index_key, digest)
+            return None
+
+        self.redis_client.hincrby(self.hits_key, digest, 1)
+        return metadata
+
+    def variant_path(self, digest: str, suffix: str) -> Path:
+        return self.blob_path(digest).with_name(f"{digest}-{suffix}")
+
+    def put(self, digest: str, metadata: Dict[str, Any]) -> Dict[str, Any]:
+        """Blob yazıldıktan sonra metadata'yı index'e ekle ve public dosyaları bağla"""
+        metadata = {**metadata, "digest": digest, "stored_at": datetime.now().isoformat()}
+        self.link(digest, metadata)
+        self.redis_client.hset(self.index_key, digest, json.dumps(metadata))
+        return metadata
+
+    def link(self, digest: str, metadata: Dict[str, Any]):
+        """Ana resmi ve tüm varyantları output_path altına bağla"""
+        self.link_file(self.blob_path(digest), metadata["filename"])
+        self.redis_client.hset(self.files_key, metadata["filename"], digest)
+
+        for variant in metadata.get("variants", []):
+            if variant.get("suffix"):
+                self.link_file(self.variant_path(digest, variant["suffix"]), variant["filename"])
+
+    def link_file(self, blob: Path, filename: str) -> Path:
+        """output_path/filename -> blob (hardlink > symlink > kopya)"""
+        public = self.output_path / filename
+
+        try:
+            if public.exists() and os.path.samefile(public, blob):
+                return public
+        except OSError:
+            pass
+
+        tmp = public.with_name(f".{public.name}.tmp")
+        tmp.unlink(missing_ok=True)
+        try:
+            os.link(blob, tmp)
+        except OSError:
+            try:
+                os.symlink(blob, tmp)
+            except OSError:
+                shutil.copy2(blob, tmp)
+
+        os.replace(tmp, public)
+        return public
@@ -0,0 +1,75 @@
+# /srv/auto-adsense/services/image-generation/image_variants.py
+import os
+from pathlib import Path
+from typing import Dict, Any, List, Tuple
+from PIL import Image
+
+try:
+    import pillow_avif  # noqa: F401  (opsiyonel AVIF plugin)
+except ImportError:
+    pass
+
+# Plugin'ler yüklendikten sonra kayıtlı encoder'lara bak
+AVIF_AVAILABLE = "AVIF" in Image.registered_extensions().values()
+
+VARIANT_WIDTHS = tuple(int(w) for w in os.getenv("IMAGE_VARIANT_WIDTHS", "320,640,960").split(",") if w.strip())
+
+# (uzantı, PIL formatı, save opsiyonları)
+FORMATS: List[Tuple[str, str, Dict[str, Any]]] = [
+    ("webp", "WEBP", {"quality": 80, "method": 4}),
+    ("jpg", "JPEG", {"quality": 82, "optimize": True, "progressive": True}),
+]
+if AVIF_AVAILABLE:
+    FORMATS.insert(0, ("avif", "AVIF", {"quality": 60}))
+
+
+def build_variants(blob_path: Path, filename: str, widths: Tuple[int, ...] = VARIANT_WIDTHS) -> Dict[str, Any]:
+    """Kaydedilmiş JPEG'in yanına WebP/AVIF ve küçültülmüş genişlikler yaz
+
+    Dosyalar blob'un yanında `{digest}-{width}w.{ext}` olarak durur; public
+    adlar `{filename stem}-{width}w.{ext}`. Orijinal JPEG de tam genişlikte
+    `jpg` varyantı olarak listelenir, böylece srcset eksiksiz olur.
+    """
+    stem = Path(filename).stem
+    variants = []
+
+    with Image.open(blob_path) as source:
+        source.load()
+        image = source.convert("RGB")
+
+    width, height = image.size
+    targets = sorted({w for w in widths if w < width} | {width})
+
+    for target in targets:
+        if target == width:
+            resized = image
+        else:
+            resized = image.resize((target, round(height * target / width)), Image.Resampling.LANCZOS)
+
+        for ext, fmt, options in FORMATS:
+            if ext == "jpg" and target == width:
+                # Orijinal zaten tam genişlikte JPEG
+                variants.append({
+                    "format": ext, "width": width, "height": height,
+                    "suffix": None, "filename": filename, "url": f"/images/{filename}"
+                })
+                continue
+
+            suffix = f"{target}w.{ext}"
+            out_path = blob_path.with_name(f"{blob_path.stem}-{suffix}")
+            if not out_path.exists():
+                tmp_path = out_path.with_name(f".{out_path.name}.tmp")
+                resized.save(tmp_path, fmt, **options)
+                os.replace(tmp_path, out_path)
+
+            variants.append({
+                "format": ext, "width": target, "height": resized.height,
+                "suffix": suffix, "filename": f"{stem}-{suffix}", "url": f"/images/{stem}-{suffix}"
+            })
+
+    srcset = {}
+    for ext, _, _ in FORMATS:
+        entries = [v for v in variants if v["format"] == ext]
+        srcset[ext] = ", ".join(f"{v['url']} {v['width']}w" for v in entries)
+
+    return {"width": width, "height": height, "variants": variants, "srcset": srcset}
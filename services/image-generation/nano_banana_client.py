@@ -5,14 +5,33 @@ import time
 import redis
 import asyncio
 import aiohttp
-import requests
 from datetime import datetime
 from pathlib import Path
 from typing import Dict, Any, List, Optional
-import hashlib
 import base64
 from PIL import Image
 import io
+from job_queue import JobQueue
+from http_session import HTTPSessionManager
+from image_store import ImageStore
+from image_variants import build_variants
+
+class RateLimiter:
+    """İstek başlangıçlarını en az `interval` saniye aralıkla sırala"""
+    
+    def __init__(self, interval: float):
+        self.interval = interval
+        self.lock = asyncio.Lock()
+        self.next_slot = 0.0
+    
+    async def wait(self):
+        async with self.lock:
+            now = time.monotonic()
+            delay = self.next_slot - now
+            self.next_slot = max(now, self.next_slot) + self.interval
+        
+        if delay > 0:
+            await asyncio.sleep(delay)
 
 class NanoBananaClient:
     """Nano Banana API ile Profesyonel Resim Üretimi"""
@@ -30,6 +49,16 @@ class NanoBananaClient:
         self.output_path = Path("/srv/auto-adsense/multidomain_site_kit/generated_images")
         self.output_path.mkdir(parents=True, exist_ok=True)
         
+        # Aynı prompt/spec için API'ye tekrar gitmemek için content-addressed store
+        self.image_store = ImageStore(self.redis_client, self.output_path)
+        
+        # API, status ve indirme istekleri için tek, havuzlanmış HTTP session
+        self.http = HTTPSessionManager()
+        
+        # Aynı anda uçuşta olan API isteği sayısı ve istekler arası minimum aralık
+        self.api_semaphore = asyncio.Semaphore(int(os.getenv("NANO_BANANA_CONCURRENCY", "4")))
+        self.rate_limiter = RateLimiter(float(os.getenv("NANO_BANANA_MIN_INTERVAL", "0.5")))
+        
         # Pinterest için optimize edilmiş boyutlar
         self.image_specifications = {
             "pinterest_mobile": {
@@ -132,27 +161,32 @@ class NanoBananaClient:
             niche = article_data.get("niche", "technology")
             keywords = article_data.get("keywords", [])
             
-            generated_images = []
-            
             self.log_info(f"Generating images for main topic: {main_topic}")
             
-            # 1. Hero image (article başında)
-            hero_image = await self.generate_hero_image(main_topic, title, niche)
-            if hero_image:
-                generated_images.append(hero_image)
-            
-            # 2. Pinterest optimized images (3 farklı varyasyon)
-            pinterest_images = await self.generate_pinterest_variations(main_topic, niche, keywords)
-            generated_images.extend(pinterest_images)
-            
-            # 3. Article içi supporting images (alt konular için)
-            inline_images = await self.generate_supporting_images(main_topic, keywords[:3], niche)
-            generated_images.extend(inline_images)
-            
-            # 4. Social sharing image
-            social_image = await self.generate_social_image(main_topic, title, niche, domain)
-            if social_image:
-                generated_images.append(social_image)
+            # Resimler birbirinden bağımsız; hepsini aynı anda başlat,
+            # API yükünü semaphore + rate limiter sınırlar
+            # image_types ile sadece istenen resimler (ör. scheduler yalnız hero ister)
+            image_types = set(article_data.get("image_types") or ["hero", "pinterest", "supporting", "social"])
+            tasks = []
+            if "hero" in image_types:
+                tasks.append(self.generate_hero_image(main_topic, title, niche))
+            if "pinterest" in image_types:
+                tasks.append(self.generate_pinterest_variations(main_topic, niche, keywords))
+            if "supporting" in image_types:
+                tasks.append(self.generate_supporting_images(main_topic, keywords[:3], niche))
+            if "social" in image_types:
+                tasks.append(self.generate_social_image(main_topic, title, niche, domain))
+            results = await asyncio.gather(*tasks, return_exceptions=True)
+            
+            # Başarısız olanları atla, başarılı olanları sakla
+            generated_images = []
+            for result in results:
+                if isinstance(result, BaseException):
+                    self.log_error(f"Image task failed: {result}")
+                elif isinstance(result, list):
+                    generated_images.extend(result)
+                elif result:
+                    generated_images.append(result)
             
             # Store generated images
             await self.store_generated_images(domain, main_topic, generated_images)
@@ -175,7 +209,8 @@ class NanoBananaClient:
             # Enhanced prompt for better quality
             enhanced_prompt = f"{prompt}, {niche_config['style_keywords']}, {niche_config['color_palette']}, {niche_config['mood']}, 4K quality, professional photography"
             
-            image_data = await self.call_nano_banana_api(
+            stored = await self.fetch_image(
+                f"hero_{self.safe_filename(main_topic)}",
                 prompt=enhanced_prompt,
                 width=spec["width"],
                 height=spec["height"],
@@ -183,10 +218,8 @@ class NanoBananaClient:
                 quality=spec["quality"]
             )
             
-            if image_data:
-                filename = f"hero_{self.safe_filename(main_topic)}_{int(time.time())}.jpg"
-                filepath = await self.save_image(image_data, filename)
-                
+            if stored:
+                filename = stored["filename"]
                 return {
                     "type": "hero",
                     "filename": filename,
@@ -194,7 +227,9 @@ class NanoBananaClient:
                     "alt_text": f"Complete guide to {main_topic}",
                     "position": "top",
                     "main_topic": main_topic,
-                    "size": f"{spec['width']}x{spec['height']}"
+                    "size": f"{spec['width']}x{spec['height']}",
+                    "variants": stored.get("variants", []),
+                    "srcset": stored.get("srcset", {})
                 }
             
         except Exception as e:
@@ -229,43 +264,58 @@ class NanoBananaClient:
                 }
             ]
             
-            for i, variation in enumerate(variations):
-                # Her varyasyon için farklı prompt
-                base_prompt = niche_config["templates"]["pinterest"].format(topic=main_topic)
-                
-                enhanced_prompt = f"{base_prompt}, {variation['style']} style, {variation['focus']}, {variation['layout']}, {niche_config['style_keywords']}, Pinterest mobile optimized, high engagement design"
-                
-                image_data = await self.call_nano_banana_api(
-                    prompt=enhanced_prompt,
-                    width=spec["width"],
-                    height=spec["height"],
-                    style="pinterest-optimized",
-                    quality=spec["quality"]
-                )
-                
-                if image_data:
-                    filename = f"pinterest_{self.safe_filename(main_topic)}_{i+1}_{int(time.time())}.jpg"
-                    filepath = await self.save_image(image_data, filename)
-                    
-                    pinterest_images.append({
-                        "type": "pinterest",
-                        "filename": filename,
-                        "url": f"/images/{filename}",
-                        "alt_text": f"Pinterest: {main_topic} - {variation['style']}",
-                        "variation": variation["style"],
-                        "main_topic": main_topic,
-                        "optimized_for": "mobile_pinterest",
-                        "size": f"{spec['width']}x{spec['height']}"
-                    })
-                
-                # Rate limiting between API calls
-                await asyncio.sleep(2)
+            results = await asyncio.gather(
+                *[
+                    self.generate_pinterest_variation(main_topic, niche_config, spec, i, variation)
+                    for i, variation in enumerate(variations)
+                ],
+                return_exceptions=True
+            )
+            
+            for result in results:
+                if isinstance(result, BaseException):
+                    self.log_error(f"Pinterest variation failed: {result}")
+                elif result:
+                    pinterest_images.append(result)
             
         except Exception as e:
             self.log_error(f"Failed to generate Pinterest images: {e}")
         
         return pinterest_images
     
+    async def generate_pinterest_variation(self, main_topic: str, niche_config: Dict[str, Any], spec: Dict[str, Any], i: int, variation: Dict[str, str]) -> Optional[Dict[str, Any]]:
+        """Tek bir Pinterest varyasyonu üret"""
+        # Her varyasyon için farklı prompt
+        base_prompt = niche_config["templates"]["pinterest"].format(topic=main_topic)
+        
+        enhanced_prompt = f"{base_prompt}, {variation['style']} style, {variation['focus']}, {variation['layout']}, {niche_config['style_keywords']}, Pinterest mobile optimized, high engagement design"
+        
+        stored = await self.fetch_image(
+            f"pinterest_{self.safe_filename(main_topic)}_{i+1}",
+            prompt=enhanced_prompt,
+            width=spec["width"],
+            height=spec["height"],
+            style="pinterest-optimized",
+            quality=spec["quality"]
+        )
+        
+        if not stored:
+            return None
+        
+        filename = stored["filename"]
+        return {
+            "type": "pinterest",
+            "filename": filename,
+            "url": f"/images/{filename}",
+            "alt_text": f"Pinterest: {main_topic} - {variation['style']}",
+            "variation": variation["style"],
+            "main_topic": main_topic,
+            "optimized_for": "mobile_pinterest",
+            "size": f"{spec['width']}x{spec['height']}",
+            "variants": stored.get("variants", []),
+            "srcset": stored.get("srcset", {})
+        }
+    
     async def generate_supporting_images(self, main_topic: str, sub_topics: List[str], niche: str) -> List[Dict[str, Any]]:
         """Ana konuyu destekleyen alt konu resimleri"""
         supporting_images = []
@@ -274,42 +324,58 @@ class NanoBananaClient:
             niche_config = self.niche_prompts[niche]
             spec = self.image_specifications["article_inline"]
             
-            for i, sub_topic in enumerate(sub_topics):
-                # Alt konu main topic'e bağlı prompt
-                prompt = f"Simple illustration of {sub_topic} related to {main_topic}, {niche_config['templates']['inline'].format(topic=sub_topic)}, supporting content style"
-                
-                enhanced_prompt = f"{prompt}, {niche_config['style_keywords']}, clean design, article support, mobile-friendly"
-                
-                image_data = await self.call_nano_banana_api(
-                    prompt=enhanced_prompt,
-                    width=spec["width"],
-                    height=spec["height"],
-                    style=spec["style"],
-                    quality=spec["quality"]
-                )
-                
-                if image_data:
-                    filename = f"inline_{self.safe_filename(main_topic)}_{self.safe_filename(sub_topic)}_{int(time.time())}.jpg"
-                    filepath = await self.save_image(image_data, filename)
-                    
-                    supporting_images.append({
-                        "type": "inline",
-                        "filename": filename,
-                        "url": f"/images/{filename}",
-                        "alt_text": f"{sub_topic} guide - part of {main_topic}",
-                        "sub_topic": sub_topic,
-                        "main_topic": main_topic,
-                        "position": f"section_{i+1}",
-                        "size": f"{spec['width']}x{spec['height']}"
-                    })
-                
-                await asyncio.sleep(2)
+            results = await asyncio.gather(
+                *[
+                    self.generate_supporting_image(main_topic, sub_topic, niche_config, spec, i)
+                    for i, sub_topic in enumerate(sub_topics)
+                ],
+                return_exceptions=True
+            )
+            
+            for result in results:
+                if isinstance(result, BaseException):
+                    self.log_error(f"Supporting image failed: {result}")
+                elif result:
+                    supporting_images.append(result)
         
         except Exception as e:
             self.log_error(f"Failed to generate supporting images: {e}")
         
         return supporting_images
     
+    async def generate_supporting_image(self, main_topic: str, sub_topic: str, niche_config: Dict[str, Any], spec: Dict[str, Any], i: int) -> Optional[Dict[str, Any]]:
+        """Tek bir alt konu resmi üret"""
+        # Alt konu main topic'e bağlı prompt
+        prompt = f"Simple illustration of {sub_topic} related to {main_topic}, {niche_config['templates']['inline'].format(topic=sub_topic)}, supporting content style"
+        
+        enhanced_prompt = f"{prompt}, {niche_config['style_keywords']}, clean design, article support, mobile-friendly"
+        
+        stored = await self.fetch_image(
+            f"inline_{self.safe_filename(main_topic)}_{self.safe_filename(sub_topic)}",
+            prompt=enhanced_prompt,
+            width=spec["width"],
+            height=spec["height"],
+            style=spec["style"],
+            quality=spec["quality"]
+        )
+        
+        if not stored:
+            return None
+        
+        filename = stored["filename"]
+        return {
+            "type": "inline",
+            "filename": filename,
+            "url": f"/images/{filename}",
+            "alt_text": f"{sub_topic} guide - part of {main_topic}",
+            "sub_topic": sub_topic,
+            "main_topic": main_topic,
+            "position": f"section_{i+1}",
+            "size": f"{spec['width']}x{spec['height']}",
+            "variants": stored.get("variants", []),
+            "srcset": stored.get("srcset", {})
+        }
+    
     async def generate_social_image(self, main_topic: str, title: str, niche: str, domain: str) -> Optional[Dict[str, Any]]:
         """Social sharing resmi üret"""
         try:
@@ -319,7 +385,8 @@ class NanoBananaClient:
             prompt = niche_config["templates"]["social"].format(topic=main_topic)
             enhanced_prompt = f"{prompt}, social media optimized, {domain} branding, {niche_config['color_palette']}, professional"
             
-            image_data = await self.call_nano_banana_api(
+            stored = await self.fetch_image(
+                f"social_{self.safe_filename(main_topic)}",
                 prompt=enhanced_prompt,
                 width=spec["width"],
                 height=spec["height"],
@@ -327,10 +394,8 @@ class NanoBananaClient:
                 quality=spec["quality"]
             )
             
-            if image_data:
-                filename = f"social_{self.safe_filename(main_topic)}_{int(time.time())}.jpg"
-                filepath = await self.save_image(image_data, filename)
-                
+            if stored:
+                filename = stored["filename"]
                 return {
                     "type": "social",
                     "filename": filename,
@@ -338,7 +403,9 @@ class NanoBananaClient:
                     "alt_text": f"Share: {title}",
                     "main_topic": main_topic,
                     "domain": domain,
-                    "size": f"{spec['width']}x{spec['height']}"
+                    "size": f"{spec['width']}x{spec['height']}",
+                    "variants": stored.get("variants", []),
+                    "srcset": stored.get("srcset", {})
                 }
             
         except Exception as e:
@@ -346,8 +413,48 @@ class NanoBananaClient:
         
         return None
     
+    async def fetch_image(self, prefix: str, prompt: str, width: int, height: int, style: str, quality: str) -> Optional[Dict[str, Any]]:
+        """Store'da aynı prompt/spec varsa API'yi atla; yoksa üret, kaydet, indexle
+
+        Store metadata'sını (public filename, varyantlar, srcset) döndürür.
+        """
+        digest = self.image_store.key(
+            "nano_banana", prompt=prompt, width=width, height=height, style=style, quality=quality
+        )
+        
+        cached = self.image_store.get(digest)
+        if cached:
+            self.image_store.link(digest, cached)
+            self.log_info(f"Image store hit: {cached['filename']}")
+            return cached
+        
+        image_data = await self.call_nano_banana_api(prompt, width, height, style, quality)
+        if not image_data:
+            return None
+        
+        filename = self.image_store.filename(prefix, digest)
+        filepath = await self.save_image(image_data, self.image_store.blob_path(digest))
+        
+        # WebP/AVIF + srcset genişlikleri (CPU işi, event loop dışında)
+        variants = await asyncio.to_thread(build_variants, filepath, filename)
+        
+        return self.image_store.put(digest, {
+            "filename": filename,
+            "generator": "nano_banana",
+            "prompt": prompt,
+            "size": f"{width}x{height}",
+            "style": style,
+            **variants
+        })
+    
     async def call_nano_banana_api(self, prompt: str, width: int, height: int, style: str, quality: str) -> Optional[bytes]:
-        """Nano Banana API çağrısı"""
+        """Nano Banana API çağrısı (eşzamanlılık ve hız limiti altında)"""
+        async with self.api_semaphore:
+            await self.rate_limiter.wait()
+            return await self._call_nano_banana_api(prompt, width, height, style, quality)
+    
+    async def _call_nano_banana_api(self, prompt: str, width: int, height: int, style: str, quality: str) -> Optional[bytes]:
+        """Nano Banana API HTTP isteği"""
         try:
             headers = {
                 "Authorization": f"Bearer {self.api_key}",
@@ -366,31 +473,31 @@ class NanoBananaClient:
                 "negative_prompt": "blurry, low quality, watermark, text overlay, bad composition, distorted"
             }
             
-            async with aiohttp.ClientSession() as session:
-                async with session.post(
-                    f"{self.base_url}/generate",
-                    headers=headers,
-                    json=payload,
-                    timeout=aiohttp.ClientTimeout(total=120)  # 2 dakika timeout
-                ) as response:
+            session = await self.http.get()
+            async with session.post(
+                f"{self.base_url}/generate",
+                headers=headers,
+                json=payload,
+                timeout=aiohttp.ClientTimeout(total=120)  # 2 dakika timeout
+            ) as response:
+                
+                if response.status == 200:
+                    result = await response.json()
                     
-                    if response.status == 200:
-                        result = await response.json()
-                        
-                        # Base64 encoded image data
-                        if "image_data" in result:
-                            image_bytes = base64.b64decode(result["image_data"])
-                            return image_bytes
-                        
-                        # Direct download URL
-                        elif "image_url" in result:
-                            async with session.get(result["image_url"]) as img_response:
-                                if img_response.status == 200:
-                                    return await img_response.read()
+                    # Base64 encoded image data
+                    if "image_data" in result:
+                        image_bytes = base64.b64decode(result["image_data"])
+                        return image_bytes
                     
-                    else:
-                        error_text = await response.text()
-                        self.log_error(f"Nano Banana API error {response.status}: {error_text}")
+                    # Direct download URL
+                    elif "image_url" in result:
+                        async with session.get(result["image_url"]) as img_response:
+                            if img_response.status == 200:
+                                return await img_response.read()
+                
+                else:
+                    error_text = await response.text()
+                    self.log_error(f"Nano Banana API error {response.status}: {error_text}")
             
         except asyncio.TimeoutError:
             self.log_error("Nano Banana API timeout")
@@ -399,10 +506,11 @@ class NanoBananaClient:
         
         return None
     
-    async def save_image(self, image_data: bytes, filename: str) -> Path:
+    async def save_image(self, image_data: bytes, filepath: Path) -> Path:
         """Resmi kaydet ve optimize et"""
         try:
-            filepath = self.output_path / filename
+            # Yarım yazılmış dosya store'a girmesin
+            tmp_path = filepath.with_name(f".{filepath.name}.tmp")
             
             # PIL ile resmi aç ve optimize et
             image = Image.open(io.BytesIO(image_data))
@@ -413,18 +521,19 @@ class NanoBananaClient:
             
             # Mobile için optimize et
             image.save(
-                filepath,
+                tmp_path,
                 'JPEG',
                 quality=85,
                 optimize=True,
                 progressive=True  # Progressive JPEG for faster mobile loading
             )
+            os.replace(tmp_path, filepath)
             
-            self.log_info(f"Saved optimized image: {filename}")
+            self.log_info(f"Saved optimized image: {filepath.name}")
             return filepath
             
         except Exception as e:
-            self.log_error(f"Failed to save image {filename}: {e}")
+            self.log_error(f"Failed to save image {filepath.name}: {e}")
             raise
     
     def safe_filename(self, text: str) -> str:
@@ -467,14 +576,14 @@ class NanoBananaClient:
                 "Content-Type": "application/json"
             }
             
-            async with aiohttp.ClientSession() as session:
-                async with session.get(
-                    f"{self.base_url}/status",
-                    headers=headers,
-                    timeout=aiohttp.ClientTimeout(total=10)
-                ) as response:
-                    
-                    return response.status == 200
+            session = await self.http.get()
+            async with session.get(
+                f"{self.base_url}/status",
+                headers=headers,
+                timeout=aiohttp.ClientTimeout(total=10)
+            ) as response:
+                
+                return response.status == 200
             
         except Exception as e:
             self.log_error(f"API status check failed: {e}")
@@ -488,22 +597,26 @@ class NanoBananaClient:
                 "Content-Type": "application/json"
             }
             
-            async with aiohttp.ClientSession() as session:
-                async with session.get(
-                    f"{self.base_url}/credits",
-                    headers=headers,
-                    timeout=aiohttp.ClientTimeout(total=10)
-                ) as response:
-                    
-                    if response.status == 200:
-                        result = await response.json()
-                        return result.get("remaining_credits")
+            session = await self.http.get()
+            async with session.get(
+                f"{self.base_url}/credits",
+                headers=headers,
+                timeout=aiohttp.ClientTimeout(total=10)
+            ) as response:
+                
+                if response.status == 200:
+                    result = await response.json()
+                    return result.get("remaining_credits")
             
         except Exception as e:
             self.log_error(f"Failed to get credits: {e}")
         
         return None
     
+    async def close(self):
+        """HTTP bağlantı havuzunu kapat"""
+        await self.http.close()
+    
     def log_info(self, message: str):
         timestamp = datetime.now().strftime("%Y-%m-%d %H:%M:%S")
         print(f"[{timestamp}] NANO-BANANA: {message}")
@@ -512,67 +625,106 @@ class NanoBananaClient:
         timestamp = datetime.now().strftime("%Y-%m-%d %H:%M:%S")
         print(f"[{timestamp}] NANO-BANANA ERROR: {message}")
 
+def reply(redis_client: redis.Redis, request_data: Dict[str, Any], images: List[Dict[str, Any]], error: Optional[str] = None):
+    """request_id'li isteği bekleyen servise (content-scheduler, BLPOP) sonucu gönder"""
+    if not request_data.get("request_id"):
+        return
+    key = f"nano_banana_result:{request_data['request_id']}"
+    pipe = redis_client.pipeline()
+    pipe.rpush(key, json.dumps({"ok": error is None, "images": images, "error": error}))
+    pipe.expire(key, 3600)
+    pipe.execute()
+
+
+def fail(redis_client: redis.Redis, job, request_data: Dict[str, Any], error: str):
+    """Bekleyen biri varsa hatayı ona bildir ve bitir (o zaten resimsiz devam eder); yoksa retry"""
+    if request_data.get("request_id"):
+        reply(redis_client, request_data, [], error)
+        job.ack()
+    else:
+        job.nack(error)
+
+
 async def main():
     """Nano Banana Image Generator Worker"""
     client = NanoBananaClient()
     
-    print("🍌 Nano Banana Image Generator started")
-    print("🎨 Generating high-quality images for main topics")
-    
-    # API durumunu kontrol et
-    if not await client.check_api_status():
-        print("❌ Nano Banana API is not available")
-        return
-    
-    # Kredi durumunu kontrol et
-    credits = await client.get_remaining_credits()
-    if credits is not None:
-        print(f"💳 Remaining credits: {credits}")
-    
-    while True:
-        try:
-            # Image generation requests'leri kontrol et
-            request = client.redis_client.rpop("nano_banana_queue")
-            
-            if request:
-                request_data = json.loads(request)
-                main_topic = request_data.get("main_topic", "Unknown")
-                
-                print(f"🎨 Generating images for main topic: {main_topic}")
-                
-                images = await client.generate_article_images(request_data)
+    try:
+        print("🍌 Nano Banana Image Generator started")
+        print("🎨 Generating high-quality images for main topics")
+        
+        # API durumunu kontrol et
+        if not await client.check_api_status():
+            print("❌ Nano Banana API is not available")
+            return
+        
+        # Kredi durumunu kontrol et
+        credits = await client.get_remaining_credits()
+        if credits is not None:
+            print(f"💳 Remaining credits: {credits}")
+        
+        queue = JobQueue(client.redis_client, "nano_banana_queue")
+        
+        while True:
+            job = None
+            request_data = {}
+            try:
+                # Kuyruk boşken BLMOVE ile bekle, iş gelir gelmez başla
+                job = await asyncio.to_thread(queue.reserve, 5)
                 
-                if images:
-                    print(f"✅ Generated {len(images)} high-quality images")
+                if job:
+                    request_data = json.loads(job.raw)
+                    main_topic = request_data.get("main_topic", "Unknown")
                     
-                    # Content API'ye resim bilgilerini gönder
-                    client.redis_client.lpush("content_images_queue", json.dumps({
-                        "domain": request_data["domain"],
-                        "main_topic": main_topic,
-                        "images": images,
-                        "type": "nano_banana_generated"
-                    }))
+                    # Bekleyen servis vazgeçtiyse (backoff/retry sonrası) ücretli çağrı yapma
+                    if request_data.get("deadline") and time.time() > request_data["deadline"]:
+                        print(f"⏭️ Deadline passed, dropping image request for {main_topic}")
+                        job.ack()
+                        continue
                     
-                    # Pinterest queue'ya ekle
-                    for image in images:
-                        if image["type"] == "pinterest":
-                            client.redis_client.lpush("pinterest_pin_queue", json.dumps({
-                                "domain": request_data["domain"],
-                                "main_topic": main_topic,
-                                "image_url": image["url"],
-                                "image_filename": image["filename"],
-                                "title": f"{main_topic} - {image['variation']}",
-                                "description": f"Complete guide to {main_topic}. Professional insights and expert tips.",
-                                "type": "auto_generated"
-                            }))
-                else:
-                    print("❌ Failed to generate images")
-            
-            await asyncio.sleep(5)  # 5 saniyede bir kontrol et
-            
-        except Exception as e:
-            print(f"❌ Nano Banana Generator error: {e}")
-            await asyncio.sleep(30)
+                    print(f"🎨 Generating images for main topic: {main_topic}")
+                    
+                    # Rate limit + 429 retry'ları ile uzun sürebilir
+                    with job.keepalive():
+                        images = await client.generate_article_images(request_data)
+                    
+                    if images:
+                        print(f"✅ Generated {len(images)} high-quality images")
+                        
+                        reply(client.redis_client, request_data, images)
+                        
+                        # Content API'ye resim bilgilerini gönder
+                        client.redis_client.lpush("content_images_queue", json.dumps({
+                            "domain": request_data["domain"],
+                            "main_topic": main_topic,
+                            "images": images,
+                            "type": "nano_banana_generated"
+                        }))
+                        
+                        # Pinterest queue'ya ekle
+                        for image in images:
+                            if image["type"] == "pinterest":
+                                client.redis_client.lpush("pinterest_pin_queue", json.dumps({
+                                    "domain": request_data["domain"],
+                                    "main_topic": main_topic,
+                                    "image_url": image["url"],
+                                    "image_filename": image["filename"],
+                                    "title": f"{main_topic} - {image['variation']}",
+                                    "description": f"Complete guide to {main_topic}. Professional insights and expert tips.",
+                                    "type": "auto_generated"
+                                }))
+                        job.ack()
+                    else:
+                        print("❌ Failed to generate images")
+                        fail(client.redis_client, job, request_data, "no images generated")
+                
+            except Exception as e:
+                if job:
+                    fail(client.redis_client, job, request_data, str(e))
+                print(f"❌ Nano Banana Generator error: {e}")
+                await asyncio.sleep(30)
+    finally:
+        await client.close()
 
 if __name__ == "__main__":
     asyncio.run(main())
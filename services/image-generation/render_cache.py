@@ -0,0 +1,69 @@
+# /srv/auto-adsense/services/image-generation/render_cache.py
+import os
+import threading
+from collections import OrderedDict
+from functools import lru_cache
+from typing import Callable, Hashable, Optional
+from PIL import Image, ImageFont
+
+FONT_BOLD = "/usr/share/fonts/truetype/dejavu/DejaVuSans-Bold.ttf"
+FONT_REGULAR = "/usr/share/fonts/truetype/dejavu/DejaVuSans.ttf"
+
+
+@lru_cache(maxsize=64)
+def load_font(path: str, size: int):
+    """(path, size) başına bir kez yüklenen font; yoksa default font"""
+    try:
+        return ImageFont.truetype(path, size)
+    except OSError:
+        return ImageFont.load_default()
+
+
+class BackgroundCache:
+    """Render edilmiş base background'lar için process-wide LRU cache
+
+    Anahtar (niche, size_key, style). Hem entry sayısı hem de toplam piksel
+    belleği ile sınırlı; dönen resim her zaman kopyadır, cache'teki base
+    üzerine asla çizilmez.
+    """
+
+    def __init__(self, max_entries: Optional[int] = None, max_mb: Optional[int] = None):
+        self.max_entries = max_entries or int(os.getenv("IMAGE_BG_CACHE_ENTRIES", "64"))
+        self.max_bytes = (max_mb or int(os.getenv("IMAGE_BG_CACHE_MB", "128"))) * 1024 * 1024
+
+        self._entries: "OrderedDict[Hashable, Image.Image]" = OrderedDict()
+        self._bytes = 0
+        self._lock = threading.Lock()
+
+    @staticmethod
+    def image_bytes(img: Image.Image) -> int:
+        return img.width * img.height * len(img.getbands())
+
+    def get(self, key: Hashable, render: Callable[[], Image.Image]) -> Image.Image:
+        """Cache'teki base'in kopyasını döndür, yoksa render edip sakla"""
+        with self._lock:
+            base = self._entries.get(key)
+            if base is not None:
+                self._entries.move_to_end(key)
+                return base.copy()
+
+        base = render()
+
+        with self._lock:
+            if key not in self._entries:
+                self._entries[key] = base
+                self._bytes += self.image_bytes(base)
+                self.evict()
+
+        return base.copy()
+
+    def evict(self):
+        # En uzun süredir kullanılmayanları at (lock altında çağrılır)
+        while self._entries and (len(self._entries) > self.max_entries or self._bytes > self.max_bytes):
+            _, old = self._entries.popitem(last=False)
+            self._bytes -= self.image_bytes(old)
+
+    def clear(self):
+        with self._lock:
+            self._entries.clear()
+            self._bytes = 0
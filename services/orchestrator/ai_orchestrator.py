@@ -8,6 +8,7 @@ import schedule
 from datetime import datetime, timedelta
 from typing import Dict, Any, List
 import requests
+from ai_usage import AIUsageTracker
 
 class AIContentOrchestrator:
     """AI İçerik Üretimi Orchestrator - Ana Kontrol Merkezi"""
@@ -19,6 +20,9 @@ class AIContentOrchestrator:
             decode_responses=True
         )
         
+        # ai_content_generator ile aynı günlük kullanım hash'i
+        self.usage = AIUsageTracker(self.redis_client)
+        
         # Domain configurations
         self.domains = {
             "hing.me": {
@@ -376,13 +380,11 @@ class AIContentOrchestrator:
             total_cost = 0
             
             providers = ["deepseek", "claude", "groq", "huggingface"]
+            usage = self.usage.get_daily_usage(today)
             
             for provider in providers:
-                usage_key = f"ai_usage:{provider}:{today}"
-                words_key = f"ai_words:{provider}:{today}"
-                
-                requests = int(self.redis_client.get(usage_key) or 0)
-                words = int(self.redis_client.get(words_key) or 0)
+                requests = usage.get(provider, {}).get("requests", 0)
+                words = usage.get(provider, {}).get("words", 0)
                 
                 total_requests += requests
                 
@@ -0,0 +1,112 @@
+# /srv/auto-adsense/services/orchestrator/build_coordinator.py
+import os
+import time
+import hashlib
+import redis
+from pathlib import Path
+from typing import List, Optional
+from build_queue import enqueue_build
+
+# Build çıktısını etkileyen dosyalar (site köküne göre)
+CONTENT_PATHS = ["src", "public", "package.json", "astro.config.mjs", "astro.config.ts", "tailwind.config.cjs", "tailwind.config.mjs"]
+
+
+class BuildCoordinator:
+    """Domain başına debounce'lu, toplu Astro build + Cloudflare Pages deploy isteği
+
+    Makale yazımları `mark_dirty` ile kaydedilir. `flush` yalnızca son yazımın
+    üzerinden `debounce` saniye geçmiş (veya ilk yazım `max_wait` kadar
+    bekletilmiş) domainleri build eder; aynı penceredeki tüm makaleler tek
+    build'e girer. Site içeriğinin hash'i son başarılı build'inkiyle aynıysa
+    build ve deploy tamamen atlanır. Build'in kendisi site-builder
+    servisinde (auto-deployment) domain lock'u altında çalışır.
+    """
+
+    def __init__(self, redis_client: redis.Redis, sites_root: str = "/srv/auto-adsense/multidomain_site_kit/sites",
+                 debounce: Optional[int] = None, max_wait: Optional[int] = None):
+        self.redis_client = redis_client
+        self.sites_root = Path(sites_root)
+        self.shared_root = self.sites_root.parent / "packages" / "shared"
+        self.debounce = debounce or int(os.getenv("BUILD_DEBOUNCE_SECONDS", "120"))
+        self.max_wait = max_wait or int(os.getenv("BUILD_MAX_WAIT_SECONDS", "900"))
+
+    def mark_dirty(self, domain: str, path: str):
+        """Bir domain'de içerik değişti; build penceresini aç/uzat"""
+        now = time.time()
+        pipe = self.redis_client.pipeline()
+        pipe.hsetnx("build:first_dirty", domain, now)
+        pipe.hset("build:last_write", domain, now)
+        pipe.sadd(f"build:changes:{domain}", path)
+        pipe.execute()
+
+    def due_domains(self, now: Optional[float] = None) -> List[str]:
+        """Debounce penceresi kapanmış domainler"""
+        now = now or time.time()
+        first_dirty = self.redis_client.hgetall("build:first_dirty")
+        last_write = self.redis_client.hgetall("build:last_write")
+
+        due = []
+        for domain, first in first_dirty.items():
+            last = float(last_write.get(domain, first))
+            if now - last >= self.debounce or now - float(first) >= self.max_wait:
+                due.append(domain)
+        return due
+
+    def content_digest(self, site_path: Path) -> str:
+        """Build'i etkileyen dosyaların içerik hash'i (site + @mdkit/shared)"""
+        digest = hashlib.sha256()
+
+        for base in (site_path, self.shared_root):
+            for name in CONTENT_PATHS:
+                root = base / name
+                if root.is_file():
+                    files = [root]
+                elif root.is_dir():
+                    files = sorted(p for p in root.rglob("*") if p.is_file())
+                else:
+                    continue
+
+                for path in files:
+                    digest.update(str(path.relative_to(base.parent)).encode())
+                    digest.update(b"\0")
+                    digest.update(path.read_bytes())
+                    digest.update(b"\0")
+
+        return digest.hexdigest()
+
+    def flush(self):
+        """Penceresi dolan domainleri build et (schedule ile dakikada bir çağrılır)"""
+        for domain in self.due_domains():
+            try:
+                self.flush_domain(domain)
+            except Exception as e:
+                print(f"❌ Build flush error for {domain}: {e}")
+
+    def flush_domain(self, domain: str) -> bool:
+        site_path = self.sites_root / domain
+        last_write = self.redis_client.hget("build:last_write", domain)
+        changes = self.redis_client.smembers(f"build:changes:{domain}")
+
+        digest = self.content_digest(site_path)
+        if digest == self.redis_client.get(f"build_manifest:{domain}"):
+            print(f"⏭️ {domain}: content unchanged, skipping build")
+            self.clear(domain, last_write, changes)
+            return True
+
+        # Manifest'i site-builder başarılı deploy'dan sonra yazar; retry'lar da onda
+        job_id = enqueue_build(self.redis_client, domain, ["build", "deploy"],
+                               source="content-scheduler", manifest_digest=digest)
+        print(f"🔨 Build queued for {domain} ({len(changes)} changed files, job {job_id})")
+
+        self.clear(domain, last_write, changes)
+        return True
+
+    def clear(self, domain: str, last_write: Optional[str], changes: set):
+        """Flush sırasında yeni yazım geldiyse pencereyi açık bırak"""
+        if changes:
+            self.redis_client.srem(f"build:changes:{domain}", *changes)
+        if self.redis_client.hget("build:last_write", domain) == last_write:
+            pipe = self.redis_client.pipeline()
+            pipe.hdel("build:first_dirty", domain)
+            pipe.hdel("build:last_write", domain)
+            pipe.execute()
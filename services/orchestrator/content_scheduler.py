@@ -16,10 +16,16 @@ import asyncio
 import requests
 import schedule
 import random
+import uuid
 from datetime import datetime, timedelta
 from typing import Dict, Any, List
 import threading
-import subprocess
+from prompt_cache import PromptCache
+from build_coordinator import BuildCoordinator
+from article_index import ArticleIndex, index_entry
+from site_feeds import SiteFeeds
+from site_files import write_site_file, bump_generation
+from slugs import SlugRegistry, slugify
 
 class ContentScheduler:
     def __init__(self):
@@ -45,6 +51,19 @@ class ContentScheduler:
             }
         }
         
+        # Kısa TTL: crash sonrası tekrar eden cycle ücretsiz, günlük başlıklar yine taze
+        self.title_cache = PromptCache(
+            self.redis_client,
+            namespace="ai_title_cache",
+            ttl=int(os.getenv("AI_TITLE_CACHE_TTL", str(6 * 3600)))
+        )
+        
+        # Makale başına full build yerine domain başına debounce'lu toplu build
+        self.build_coordinator = BuildCoordinator(self.redis_client)
+        self.article_index = ArticleIndex("/srv/auto-adsense/multidomain_site_kit/sites")
+        self.site_feeds = SiteFeeds("/srv/auto-adsense/multidomain_site_kit/sites")
+        self.slug_registry = SlugRegistry(self.redis_client)
+        
         self.running = False
         print("🎯 Content Scheduler initialized")
     
@@ -58,6 +77,9 @@ class ContentScheduler:
         schedule.every().day.at("17:45").do(self.trigger_content_cycle)
         schedule.every().day.at("20:20").do(self.trigger_content_cycle)
         
+        # Bekleyen site build'lerini topla
+        schedule.every(1).minutes.do(self.build_coordinator.flush)
+        
         print("⏰ Content scheduler started - 4 daily cycles")
         print("🕘 Schedule: 09:30, 14:15, 17:45, 20:20")
         
@@ -157,6 +179,11 @@ class ContentScheduler:
     def call_ai_api(self, prompt: str, language: str) -> str:
         """Free AI APIs ile title üretimi"""
         try:
+            for provider, model in (("groq", "llama3-8b-8192"), ("huggingface", "microsoft/DialoGPT-medium")):
+                cached = self.title_cache.get(provider, model, prompt)
+                if cached:
+                    return cached
+            
             # Groq API (Free)
             groq_key = os.getenv("GROQ_API_KEY")
             if groq_key:
@@ -173,7 +200,9 @@ class ContentScheduler:
                 )
                 
                 if response.status_code == 200:
-                    return response.json()["choices"][0]["message"]["content"]
+                    content = response.json()["choices"][0]["message"]["content"]
+                    self.title_cache.set("groq", "llama3-8b-8192", prompt, content)
+                    return content
             
             # HuggingFace API (Free)
             hf_key = os.getenv("HUGGINGFACE_API_KEY")
@@ -188,7 +217,9 @@ class ContentScheduler:
                 if response.status_code == 200:
                     result = response.json()
                     if isinstance(result, list) and len(result) > 0:
-                        return result[0].get("generated_text", "")
+                        content = result[0].get("generated_text", "")
+                        self.title_cache.set("huggingface", "microsoft/DialoGPT-medium", prompt, content)
+                        return content
             
         except Exception as e:
             print(f"❌ AI API call error: {e}")
@@ -210,7 +241,7 @@ class ContentScheduler:
             print(f"📄 Article generated: {len(article_data.get('content', ''))} chars")
             
             # 2. Resim üret ve ekle
-            image_url = self.generate_and_add_image(article_data, subtitle)
+            image_url = self.generate_and_add_image(domain, article_data, subtitle)
             article_data["featured_image"] = image_url
             
             print(f"🖼️ Image generated: {image_url}")
@@ -267,116 +298,91 @@ class ContentScheduler:
             print(f"❌ Article generation error: {e}")
             return None
     
-    def generate_and_add_image(self, article_data: Dict, title: str) -> str:
-        """Resim üret ve makaleye ekle"""
+    def generate_and_add_image(self, domain: str, article_data: Dict, title: str) -> str:
+        """Nano Banana worker'dan hero resmi iste, varyantları image store'dan oku"""
         try:
-            # Nano Banana API ile resim üretimi
-            image_payload = {
-                "prompt": f"Professional blog featured image for: {title}",
-                "style": "modern",
-                "size": "1200x630",
-                "quality": "high"
-            }
-            
-            response = requests.post(
-                "http://nano-banana-generator:8080/generate",
-                json=image_payload,
-                timeout=60
-            )
+            request_id = uuid.uuid4().hex
+            wait = int(os.getenv("IMAGE_WAIT_TIMEOUT", "60"))
+            self.redis_client.lpush("nano_banana_queue", json.dumps({
+                "request_id": request_id,
+                "deadline": time.time() + wait,  # Sonrasında worker işi atar
+                "domain": domain,
+                "title": title,
+                "main_topic": title,
+                "niche": self.niches[domain]["main"],
+                "keywords": article_data.get("keywords", []),
+                "image_types": ["hero"]
+            }))
+            
+            # Worker başarıda da hatada da nano_banana_result:{id} listesine yazar
+            reply = self.redis_client.blpop(f"nano_banana_result:{request_id}", timeout=wait)
+            if not reply:
+                print(f"❌ Image generation timed out: {title}")
+                return ""
             
-            if response.status_code == 200:
-                result = response.json()
-                return result.get("image_url", "")
-            else:
-                print(f"❌ Image generation error: {response.status_code}")
+            result = json.loads(reply[1])
+            hero = next((image for image in result["images"] if image.get("type") == "hero"), None)
+            if not hero:
+                print(f"❌ No hero image generated: {title} ({result.get('error')})")
                 return ""
+            
+            # WebP/AVIF + genişlik varyantları (srcset için)
+            article_data["featured_image_variants"] = self.image_variants(hero["url"])
+            return hero["url"]
                 
         except Exception as e:
             print(f"❌ Image generation error: {e}")
             return ""
     
+    def image_variants(self, image_url: str) -> List[Dict]:
+        """/images/{filename} -> image_store metadata'sındaki varyant listesi"""
+        filename = image_url.rsplit("/", 1)[-1]
+        digest = self.redis_client.hget("image_store:files", filename)
+        raw = self.redis_client.hget("image_store:index", digest) if digest else None
+        return json.loads(raw).get("variants", []) if raw else []
+    
     def deploy_to_website(self, domain: str, article_data: Dict) -> bool:
-        """Cloudflare Pages'e otomatik deploy"""
+        """Makaleyi siteye yaz ve Cloudflare Pages build'ine kuyrukla"""
         try:
-            print(f"🚀 Deploying to Cloudflare Pages: {domain}")
+            print(f"🚀 Publishing article to {domain}")
             
             # Site path
             site_path = f"/srv/auto-adsense/multidomain_site_kit/sites/{domain}"
             
             # Article dosyası oluştur
-            slug = self.create_slug(article_data["title"])
+            # content-api ile ortak registry: aynı başlık aynı slug, çakışmada -2, -3...
+            slug = self.slug_registry.allocate(domain, article_data, self.article_index.load)
+            article_data["slug"] = slug
             article_path = f"{site_path}/src/pages/articles/{slug}.astro"
             
             # Article content hazırla
             article_content = self.create_astro_article(article_data, domain)
             
-            # Dosyayı yaz
-            os.makedirs(os.path.dirname(article_path), exist_ok=True)
-            with open(article_path, 'w', encoding='utf-8') as f:
-                f.write(article_content)
+            # Dosyayı atomik yaz (eşzamanlı build yarım dosya görmesin)
+            if write_site_file(site_path, f"src/pages/articles/{slug}.astro", article_content, skip_unchanged=True) is None:
+                print(f"⏭️ Article unchanged, nothing to publish: {article_path}")
+                return True
             
             print(f"📄 Article saved: {article_path}")
             
-            # Site build et
-            build_result = subprocess.run(
-                ["pnpm", "build"], 
-                cwd=site_path, 
-                capture_output=True, 
-                text=True,
-                timeout=300
-            )
-            
-            if build_result.returncode != 0:
-                print(f"❌ Build failed: {build_result.stderr}")
-                return False
+            # Listeler/sitemap articles.json'dan okur (build'de dizin taraması yok)
+            self.article_index.upsert(domain, [index_entry(slug, article_data)])
+            self.site_feeds.update(domain, [slug])
+            bump_generation(site_path)
             
-            print(f"🔨 Build successful")
+            # Build + deploy debounce penceresi kapanınca site-builder'da toplu yapılır
+            self.build_coordinator.mark_dirty(domain, article_path)
+            print(f"🕒 Build queued for {domain} (debounce {self.build_coordinator.debounce}s)")
             
-            # Cloudflare Pages'e deploy
-            project_name = domain.replace(".", "-")
-            deploy_result = subprocess.run([
-                "npx", "wrangler", "pages", "deploy", 
-                f"{site_path}/dist",
-                "--project-name", project_name,
-                "--compatibility-date", "2025-01-01"
-            ], capture_output=True, text=True, timeout=300)
-            
-            if deploy_result.returncode == 0:
-                print(f"✅ Deployed successfully to {domain}")
-                
-                # Deploy URL'yi kaydet
-                deploy_url = f"https://{project_name}.pages.dev"
-                self.redis_client.set(f"last_deploy:{domain}", deploy_url)
-                
-                return True
-            else:
-                print(f"❌ Deploy failed: {deploy_result.stderr}")
-                return False
+            return True
                 
         except Exception as e:
             print(f"❌ Deploy error: {e}")
             return False
     
     def create_slug(self, title: str) -> str:
-        """SEO-friendly slug oluştur"""
-        import re
-        
-        # Türkçe karakterleri dönüştür
-        char_map = {
-            'ç': 'c', 'ğ': 'g', 'ı': 'i', 'ö': 'o', 'ş': 's', 'ü': 'u',
-            'Ç': 'c', 'Ğ': 'g', 'İ': 'i', 'Ö': 'o', 'Ş': 's', 'Ü': 'u'
-        }
-        
-        slug = title.lower()
-        for tr_char, en_char in char_map.items():
-            slug = slug.replace(tr_char, en_char)
-        
-        # Özel karakterleri temizle
-        slug = re.sub(r'[^\w\s-]', '', slug)
-        slug = re.sub(r'[-\s]+', '-', slug)
-        slug = slug.strip('-')
-        
-        return slug[:100]  # Max 100 karakter
+        """SEO-friendly slug oluştur (content-api ile aynı algoritma)"""
+        return slugify(title)
     
     def create_astro_article(self, article_data: Dict, domain: str) -> str:
         """Astro article template oluştur"""
@@ -384,6 +390,7 @@ class ContentScheduler:
         template = f"""---
 import Base from '@mdkit/shared/src/layouts/Base.astro'
 import AdSlot from '@mdkit/shared/src/components/AdSlot.astro'
+import ResponsiveImage from '@mdkit/shared/src/components/ResponsiveImage.astro'
 import domains from '../../config.json'
 
 const cfg = domains['{domain}']
@@ -391,6 +398,7 @@ const title = "{article_data['title']}"
 const description = "{article_data.get('description', article_data['title'][:150])}"
 const publishDate = new Date('{datetime.now().isoformat()}')
 const featuredImage = "{article_data.get('featured_image', '')}"
+const featuredImageVariants = {json.dumps(article_data.get('featured_image_variants', []))}
 ---
 
 <Base title={{title}} description={{description}} locale={{cfg.locale}} adsenseClient={{cfg.adsense_client}}>
@@ -405,11 +413,13 @@ const featuredImage = "{article_data.get('featured_image', '')}"
       </div>
       
       {{featuredImage && (
-        <img 
+        <ResponsiveImage 
           src={{featuredImage}} 
           alt={{title}}
+          variants={{featuredImageVariants}}
+          sizes="(max-width: 896px) 100vw, 896px"
           class="w-full h-64 md:h-96 object-cover rounded-lg shadow-lg mb-6"
-          loading="lazy"
+          loading="eager"
         />
       )}}
     </header>
@@ -496,7 +506,7 @@ const featuredImage = "{article_data.get('featured_image', '')}"
                     "title": article_data["title"],
                     "description": article_data.get("description", article_data["title"]),
                     "image_url": article_data.get("featured_image", ""),
-                    "link_url": f"https://{domain}/articles/{self.create_slug(article_data['title'])}",
+                    "link_url": f"https://{domain}/articles/{article_data.get('slug') or self.create_slug(article_data['title'])}",
                     "auto_schedule": True
                 }
                 
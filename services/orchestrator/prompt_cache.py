@@ -0,0 +1,138 @@
+# /srv/auto-adsense/services/orchestrator/prompt_cache.py
+import os
+import re
+import gzip
+import time
+import hashlib
+import redis
+from pathlib import Path
+from typing import Optional
+
+
+class PromptCache:
+    """provider + model + normalize prompt hash'i ile adreslenen AI yanıt cache'i
+
+    İlk katman Redis (TTL + sorted set ile LRU, `max_entries` ile sınırlı),
+    ikinci katman disk üzerinde gzip dosyaları (mtime ile TTL/LRU,
+    `max_disk_bytes` ile sınırlı). Redis boşaltılsa veya yeniden başlasa da
+    disk katmanı aynı planın tekrarını ücretsiz yapar.
+    """
+
+    def __init__(self, redis_client: redis.Redis, namespace: str = "ai_cache",
+                 ttl: Optional[int] = None, cache_dir: Optional[str] = None,
+                 max_entries: Optional[int] = None, max_disk_mb: Optional[int] = None):
+        self.redis_client = redis_client
+        self.namespace = namespace
+        self.ttl = ttl or int(os.getenv("AI_CACHE_TTL", str(86400 * 7)))
+        self.max_entries = max_entries or int(os.getenv("AI_CACHE_MAX_ENTRIES", "2000"))
+        self.max_disk_bytes = (max_disk_mb or int(os.getenv("AI_CACHE_MAX_DISK_MB", "200"))) * 1024 * 1024
+        self.bypass = os.getenv("AI_CACHE_BYPASS", "false").lower() == "true"
+
+        self.cache_dir = Path(cache_dir or os.getenv("AI_CACHE_DIR", "/app/ai_cache")) / namespace
+        self.cache_dir.mkdir(parents=True, exist_ok=True)
+
+        self.index_key = f"{namespace}:lru"
+
+    def key(self, provider: str, model: str, prompt: str) -> str:
+        # Boşluk farkları aynı prompt sayılır
+        normalized = re.sub(r"\s+", " ", prompt).strip()
+        return hashlib.sha256(f"{provider}\n{model}\n{normalized}".encode()).hexdigest()
+
+    def disk_path(self, digest: str) -> Path:
+        return self.cache_dir / digest[:2] / f"{digest}.gz"
+
+    def get(self, provider: str, model: str, prompt: str) -> Optional[str]:
+        """Cache'teki yanıtı döndür; yoksa (veya bypass açıksa) None"""
+        if self.bypass:
+            return None
+
+        digest = self.key(provider, model, prompt)
+
+        try:
+            cached = self.redis_client.get(f"{self.namespace}:{digest}")
+            if cached is not None:
+                self.redis_client.zadd(self.index_key, {digest: time.time()})
+                return cached
+        except redis.RedisError:
+            pass
+
+        path = self.disk_path(digest)
+        try:
+            if time.time() - path.stat().st_mtime > self.ttl:
+                path.unlink()
+                return None
+
+            with gzip.open(path, "rt", encoding="utf-8") as f:
+                cached = f.read()
+        except (OSError, EOFError):
+            return None
+
+        # Disk hit: LRU için dokun ve Redis'e geri yükle
+        os.utime(path)
+        self.store_redis(digest, cached)
+        return cached
+
+    def set(self, provider: str, model: str, prompt: str, content: str):
+        """Yanıtı iki katmana da yaz"""
+        if not content:
+            return
+
+        digest = self.key(provider, model, prompt)
+        self.store_redis(digest, content)
+
+        path = self.disk_path(digest)
+        try:
+            path.parent.mkdir(parents=True, exist_ok=True)
+            # Volume birden çok servis arasında paylaşılıyor; tmp adı süreç başına
+            tmp_path = path.with_suffix(f".{os.getpid()}.tmp")
+            with gzip.open(tmp_path, "wt", encoding="utf-8") as f:
+                f.write(content)
+            os.replace(tmp_path, path)
+            self.evict_disk()
+        except OSError:
+            pass
+
+    def store_redis(self, digest: str, content: str):
+        try:
+            pipe = self.redis_client.pipeline()
+            pipe.set(f"{self.namespace}:{digest}", content, ex=self.ttl)
+            pipe.zadd(self.index_key, {digest: time.time()})
+            pipe.zcard(self.index_key)
+            size = pipe.execute()[-1]
+
+            if size > self.max_entries:
+                # En uzun süredir kullanılmayanları at
+                stale = self.redis_client.zrange(self.index_key, 0, size - self.max_entries - 1)
+                if stale:
+                    pipe = self.redis_client.pipeline()
+                    pipe.delete(*[f"{self.namespace}:{d}" for d in stale])
+                    pipe.zrem(self.index_key, *stale)
+                    pipe.execute()
+        except redis.RedisError:
+            pass
+
+    def evict_disk(self):
+        """Disk katmanını TTL ve boyut sınırına göre temizle (eski mtime önce)"""
+        now = time.time()
+        entries = []
+        total = 0
+
+        for path in self.cache_dir.glob("*/*.gz"):
+            try:
+                stat = path.stat()
+            except OSError:
+                continue
+            if now - stat.st_mtime > self.ttl:
+                path.unlink(missing_ok=True)
+                continue
+            entries.append((stat.st_mtime, stat.st_size, path))
+            total += stat.st_size
+
+        if total <= self.max_disk_bytes:
+            return
+
+        for _, size, path in sorted(entries):
+            path.unlink(missing_ok=True)
+            total -= size
+            if total <= self.max_disk_bytes:
+                break
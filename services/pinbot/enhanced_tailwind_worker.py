@@ -16,6 +16,7 @@ from datetime import datetime, timedelta
 from typing import Dict, Optional
 from typing import List
 from tailwind_pinterest_api import TailwindPinterestAPI
+from job_queue import JobQueue
 
 class EnhancedTailwindWorker:
     def __init__(self):
@@ -34,6 +35,7 @@ class EnhancedTailwindWorker:
             d.strip() for d in os.getenv("DOMAIN_ROTATION", "").split(",") 
             if d.strip()
         ]
+        self.content_queue = JobQueue(self.redis_client, "content_for_pinterest")
         
         print(f"🎯 Enhanced Tailwind Worker başlatıldı")
         print(f"📌 Daily pin target: {self.daily_pin_target}")
@@ -176,14 +178,15 @@ class EnhancedTailwindWorker:
     
     def process_content_queue(self):
         """İçerik kuyruğunu işle"""
+        job = None
         try:
-            # İçerik kuyruğundan al
-            content_raw = self.redis_client.rpop("content_for_pinterest")
+            # İçerik kuyruğundan al (kısa süre bekleyerek)
+            job = self.content_queue.reserve(timeout=5)
             
-            if not content_raw:
+            if not job:
                 return False
             
-            content_data = json.loads(content_raw)
+            content_data = json.loads(job.raw)
             
             # Pin oluştur
             success = self.create_smart_pin(content_data)
@@ -199,10 +202,13 @@ class EnhancedTailwindWorker:
                     content_data["retry_count"] = retry_count + 1
                     self.redis_client.lpush("content_for_pinterest", json.dumps(content_data))
             
+            job.ack()
             return success
             
         except Exception as e:
             print(f"❌ Content queue processing error: {e}")
+            if job:
+                job.nack(str(e))
             return False
     
     def run_worker_cycle(self):
@@ -0,0 +1,284 @@
+# /srv/auto-adsense/services/pinbot/job_queue.py
+import os
+import json
+import time
+import socket
+import threading
+import redis
+from contextlib import contextmanager
+from datetime import datetime
+from typing import Optional, List
+
+
+PROMOTE_SCRIPT = """
+if redis.call('ZREM', KEYS[1], ARGV[1]) == 1 then
+    redis.call('RPUSH', KEYS[2], ARGV[1])
+    return 1
+end
+return 0
+"""
+
+# İş processing listesinde hâlâ duruyorsa (başka sweeper almadıysa) hedefe taşı
+FAIL_SCRIPT = """
+if redis.call('LREM', KEYS[1], 1, ARGV[1]) == 0 then
+    return 0
+end
+if ARGV[3] == 'delay' then
+    redis.call('ZADD', KEYS[2], ARGV[4], ARGV[2])
+else
+    redis.call('LPUSH', KEYS[2], ARGV[2])
+    if ARGV[3] == 'dead' then
+        redis.call('LTRIM', KEYS[2], 0, 999)
+    end
+end
+return 1
+"""
+
+
+class Job:
+    """Processing listesine alınmış tek bir iş"""
+
+    def __init__(self, raw: str, queue: "JobQueue"):
+        self.raw = raw
+        self.queue = queue
+
+    @property
+    def attempts(self) -> int:
+        try:
+            payload = json.loads(self.raw)
+        except ValueError:
+            return 0
+        return payload.get("_attempts", 0) if isinstance(payload, dict) else 0
+
+    def ack(self):
+        self.queue.ack(self)
+
+    def nack(self, error: str = ""):
+        self.queue.nack(self, error)
+
+    def extend(self):
+        self.queue.extend()
+
+    def keepalive(self, interval: Optional[float] = None):
+        return self.queue.keepalive(interval)
+
+
+class JobQueue:
+    """BLMOVE tabanlı, en az bir kez teslim garantili Redis kuyruğu
+
+    Producer'lar mevcut haliyle `lpush` yapmaya devam eder. Tüketici işi
+    BLMOVE ile kendi processing listesine taşır; başarıda `ack`, hatada
+    `nack` çağrılır. `nack` edilen JSON işler `_attempts` sayacıyla
+    `{name}:delayed` zset'ine üstel backoff ile konur, `max_attempts`
+    aşılınca `{name}:dead` listesine düşer. Düz string (ya da bozuk JSON)
+    işler sayaç taşıyamaz; onların deneme sayısı `{name}:attempts` hash'inde
+    ham değere göre tutulur ve aynı backoff/dead-letter yolundan geçer.
+
+    Heartbeat key'i visibility timeout süresince yaşar. Sweeper, süresi
+    dolan tüketicilerin işlerini başarısız deneme sayarak geri alır ve
+    zamanı gelen delayed işleri ana kuyruğa taşır.
+    """
+
+    def __init__(self, redis_client: redis.Redis, name: str,
+                 consumer: Optional[str] = None,
+                 visibility_timeout: Optional[int] = None,
+                 max_attempts: Optional[int] = None,
+                 backoff_base: Optional[int] = None,
+                 backoff_max: int = 3600,
+                 sweep_interval: int = 30):
+        self.redis_client = redis_client
+        self.name = name
+        self.consumer = consumer or f"{socket.gethostname()}:{os.getpid()}"
+        self.visibility_timeout = visibility_timeout or int(os.getenv("QUEUE_VISIBILITY_TIMEOUT", "600"))
+        self.max_attempts = max_attempts or int(os.getenv("QUEUE_MAX_ATTEMPTS", "5"))
+        self.backoff_base = backoff_base or int(os.getenv("QUEUE_BACKOFF_BASE", "30"))
+        self.backoff_max = backoff_max
+        self.sweep_interval = sweep_interval
+        self.last_sweep = 0.0
+
+        self.processing_key = self.processing_key_for(self.consumer)
+        self.heartbeat_key = self.heartbeat_key_for(self.consumer)
+        self.consumers_key = f"{name}:consumers"
+        self.delayed_key = f"{name}:delayed"
+        self.dead_letter_key = f"{name}:dead"
+        self.attempts_key = f"{name}:attempts"
+
+        self.promote_script = self.redis_client.register_script(PROMOTE_SCRIPT)
+        self.fail_script = self.redis_client.register_script(FAIL_SCRIPT)
+
+        # Aynı isimle yeniden başlayan tüketicinin yarım kalan işleri
+        self.recover(self.processing_key, "consumer restarted mid-job")
+        self.extend()
+
+    def processing_key_for(self, consumer: str) -> str:
+        return f"{self.name}:processing:{consumer}"
+
+    def heartbeat_key_for(self, consumer: str) -> str:
+        return f"{self.name}:heartbeat:{consumer}"
+
+    def reserve(self, timeout: int = 5) -> Optional[Job]:
+        """Kuyruktan bir iş al; kuyruk boşsa en fazla `timeout` saniye bekle"""
+        if time.time() - self.last_sweep >= self.sweep_interval:
+            self.sweep()
+
+        # Bekleme sırasında da canlı görünelim, yoksa taşınan iş reclaim edilebilir
+        self.extend()
+        raw = self.redis_client.blmove(self.name, self.processing_key, timeout, "RIGHT", "LEFT")
+        if raw is None:
+            return None
+
+        self.extend()
+        return Job(raw, self)
+
+    def ack(self, job: Job):
+        """İş tamamlandı, processing listesinden sil"""
+        pipe = self.redis_client.pipeline()
+        pipe.lrem(self.processing_key, 1, job.raw)
+        pipe.hdel(self.attempts_key, job.raw)
+        pipe.execute()
+
+    def nack(self, job: Job, error: str = ""):
+        """İş başarısız, backoff ile tekrar dene ya da dead-letter'a at"""
+        self.fail(self.processing_key, job.raw, error)
+
+    def extend(self):
+        """Heartbeat: visibility timeout'u yenile ve tüketici setinde ol
+
+        Yavaş olduğu için reclaim edilip setten çıkarılan tüketici burada geri
+        eklenir; yoksa sonraki takılı işleri hiç reclaim edilemezdi.
+        """
+        pipe = self.redis_client.pipeline()
+        pipe.set(self.heartbeat_key, int(time.time()), ex=self.visibility_timeout)
+        pipe.sadd(self.consumers_key, self.consumer)
+        pipe.execute()
+
+    @contextmanager
+    def keepalive(self, interval: Optional[float] = None):
+        """İş sürdükçe arka planda extend() çağır (visibility timeout'tan uzun işler için)"""
+        interval = interval or max(1, self.visibility_timeout // 3)
+        stop = threading.Event()
+
+        def beat():
+            while not stop.wait(interval):
+                try:
+                    self.extend()
+                except redis.RedisError as e:
+                    print(f"⚠️ Heartbeat failed on {self.name}: {e}")
+
+        thread = threading.Thread(target=beat, daemon=True)
+        thread.start()
+        try:
+            yield
+        finally:
+            stop.set()
+            thread.join()
+
+    def backoff(self, attempts: int) -> int:
+        return min(self.backoff_base * 2 ** (attempts - 1), self.backoff_max)
+
+    def fail(self, processing_key: str, raw: str, error: str) -> bool:
+        """Processing listesindeki işi atomik olarak retry/dead-letter'a taşı"""
+        try:
+            payload = json.loads(raw)
+        except ValueError:
+            payload = None
+
+        if not isinstance(payload, dict):
+            return self.fail_raw(processing_key, raw, error)
+
+        attempts = payload.get("_attempts", 0) + 1
+        payload["_attempts"] = attempts
+        payload["_last_error"] = str(error)[:500]
+
+        if attempts >= self.max_attempts:
+            payload["_dead_at"] = datetime.now().isoformat()
+            moved = self.fail_script(keys=[processing_key, self.dead_letter_key], args=[raw, json.dumps(payload), "dead", 0])
+            if moved:
+                print(f"☠️ Job moved to {self.dead_letter_key} after {attempts} attempts: {error}")
+            return bool(moved)
+
+        retry_at = time.time() + self.backoff(attempts)
+        return bool(self.fail_script(keys=[processing_key, self.delayed_key], args=[raw, json.dumps(payload), "delay", retry_at]))
+
+    def fail_raw(self, processing_key: str, raw: str, error: str) -> bool:
+        """Sayaç taşıyamayan iş: denemeleri {name}:attempts'te say, aynı backoff/dead-letter"""
+        attempts = self.redis_client.hincrby(self.attempts_key, raw, 1)
+
+        if attempts >= self.max_attempts:
+            moved = self.fail_script(keys=[processing_key, self.dead_letter_key], args=[raw, raw, "dead", 0])
+            if moved:
+                self.redis_client.hdel(self.attempts_key, raw)
+                print(f"☠️ Job moved to {self.dead_letter_key} after {attempts} attempts: {error}")
+        else:
+            retry_at = time.time() + self.backoff(attempts)
+            moved = self.fail_script(keys=[processing_key, self.delayed_key], args=[raw, raw, "delay", retry_at])
+
+        if not moved:
+            # Başka bir sweeper zaten taşıdı; bu deneme sayılmasın
+            self.redis_client.hincrby(self.attempts_key, raw, -1)
+        return bool(moved)
+
+    def recover(self, processing_key: str, reason: str) -> int:
+        """Processing listesinde kalan işleri başarısız deneme olarak geri al"""
+        recovered = 0
+        for raw in self.redis_client.lrange(processing_key, 0, -1):
+            if self.fail(processing_key, raw, reason):
+                recovered += 1
+        return recovered
+
+    def reclaim(self) -> int:
+        """Heartbeat'i düşmüş tüketicilerin işlerini geri al"""
+        reclaimed = 0
+
+        for consumer in self.redis_client.smembers(self.consumers_key):
+            if consumer == self.consumer or self.redis_client.exists(self.heartbeat_key_for(consumer)):
+                continue
+
+            reclaimed += self.recover(self.processing_key_for(consumer), "visibility timeout expired")
+            self.redis_client.srem(self.consumers_key, consumer)
+
+        if reclaimed:
+            print(f"♻️ Reclaimed {reclaimed} stuck jobs on {self.name}")
+
+        return reclaimed
+
+    def promote_delayed(self) -> int:
+        """Backoff süresi dolan işleri ana kuyruğa taşı"""
+        promoted = 0
+
+        for raw in self.redis_client.zrangebyscore(self.delayed_key, 0, time.time(), start=0, num=100):
+            # ZREM başarılı olan tüketici işi taşır, iki sweeper aynı işi kopyalamaz
+            promoted += self.promote_script(keys=[self.delayed_key, self.name], args=[raw])
+
+        return promoted
+
+    def sweep(self) -> int:
+        """Requeue sweeper: reclaim + delayed promote"""
+        self.last_sweep = time.time()
+        return self.reclaim() + self.promote_delayed()
+
+    def pending(self) -> List[str]:
+        """Bu tüketicinin processing listesindeki işler"""
+        return self.redis_client.lrange(self.processing_key, 0, -1)
+
+    def dead_letters(self, limit: int = 50) -> List[str]:
+        return self.redis_client.lrange(self.dead_letter_key, 0, limit - 1)
+
+    def requeue_dead(self, limit: int = 50) -> int:
+        """Dead-letter işlerini deneme sayacı sıfırlanmış olarak kuyruğa geri koy"""
+        requeued = 0
+        for _ in range(limit):
+            raw = self.redis_client.rpop(self.dead_letter_key)
+            if raw is None:
+                break
+            try:
+                payload = json.loads(raw)
+            except ValueError:
+                payload = None
+            if isinstance(payload, dict):
+                for key in ("_attempts", "_last_error", "_dead_at"):
+                    payload.pop(key, None)
+                raw = json.dumps(payload)
+            self.redis_client.lpush(self.name, raw)
+            requeued += 1
+        return requeued
@@ -4,24 +4,81 @@ import json
 import time
 import requests
 import base64
+import threading
+from concurrent.futures import ThreadPoolExecutor
 from io import BytesIO
 from PIL import Image
 from typing import Dict, Any, Optional, List
 
+class TokenBucket:
+    """Thread-safe token bucket; 429 gelince hızı yarıya indirir, başarıda yavaşça geri açar"""
+    
+    def __init__(self, rate_per_minute: float, burst: int, min_rate_per_minute: float = 1.0):
+        self.max_rate = rate_per_minute / 60.0
+        self.min_rate = min_rate_per_minute / 60.0
+        self.rate = self.max_rate
+        self.capacity = max(1, burst)
+        self.tokens = float(self.capacity)
+        self.updated = time.monotonic()
+        self.blocked_until = 0.0
+        self.lock = threading.Lock()
+    
+    def acquire(self):
+        """Token alınana kadar bekle"""
+        while True:
+            with self.lock:
+                now = time.monotonic()
+                self.tokens = min(self.capacity, self.tokens + (now - self.updated) * self.rate)
+                self.updated = now
+                
+                if now >= self.blocked_until and self.tokens >= 1:
+                    self.tokens -= 1
+                    return
+                
+                wait = max(self.blocked_until - now, (1 - self.tokens) / self.rate)
+            
+            time.sleep(wait)
+    
+    def backoff(self, delay: float):
+        """429: herkesi `delay` kadar durdur ve hızı yarıya indir"""
+        with self.lock:
+            self.blocked_until = max(self.blocked_until, time.monotonic() + delay)
+            self.rate = max(self.min_rate, self.rate / 2)
+            self.tokens = 0.0
+    
+    def recover(self):
+        with self.lock:
+            self.rate = min(self.max_rate, self.rate * 1.1)
+
 class NanoBananaAPI:
     """Nano Banana API integration for AI image generation"""
     
     def __init__(self):
         self.api_key = os.getenv("NANO_BANANA_API_KEY")
         self.base_url = "https://api.nanobanana.com/v1"
-        self.session = requests.Session()
         
-        if self.api_key:
-            self.session.headers.update({
-                "Authorization": f"Bearer {self.api_key}",
-                "Content-Type": "application/json",
-                "User-Agent": "AutoAdSense/1.0"
-            })
+        # requests.Session thread-safe değil; batch worker'ları için thread başına session
+        self._local = threading.local()
+        
+        # Batch limitleri (provider dokümantasyonundaki dakikalık limit + burst)
+        self.rate_limit_per_minute = float(os.getenv("NANO_BANANA_RATE_LIMIT", "30"))
+        self.rate_limit_burst = int(os.getenv("NANO_BANANA_RATE_BURST", "5"))
+        self.batch_concurrency = int(os.getenv("NANO_BANANA_BATCH_CONCURRENCY", "4"))
+        self.max_rate_limit_retries = int(os.getenv("NANO_BANANA_MAX_429_RETRIES", "4"))
+    
+    @property
+    def session(self) -> requests.Session:
+        session = getattr(self._local, "session", None)
+        if session is None:
+            session = requests.Session()
+            if self.api_key:
+                session.headers.update({
+                    "Authorization": f"Bearer {self.api_key}",
+                    "Content-Type": "application/json",
+                    "User-Agent": "AutoAdSense/1.0"
+                })
+            self._local.session = session
+        return session
     
     def is_configured(self) -> bool:
         """Check if Nano Banana API is properly configured"""
@@ -70,6 +127,15 @@ class NanoBananaAPI:
             }
             
             response = self.session.post(f"{self.base_url}/generate", json=payload)
+            
+            if response.status_code == 429:
+                retry_after = response.headers.get("Retry-After", "")
+                return {
+                    "error": "Rate limited by Nano Banana API",
+                    "rate_limited": True,
+                    "retry_after": float(retry_after) if retry_after.replace(".", "", 1).isdigit() else None
+                }
+            
             response.raise_for_status()
             
             data = response.json()
@@ -237,40 +303,37 @@ class NanoBananaAPI:
             return {"error": f"Failed to generate hero image: {str(e)}"}
     
     def batch_generate_images(self, requests: List[Dict[str, Any]]) -> Dict[str, Any]:
-        """Generate multiple images in batch"""
-        results = []
+        """Generate multiple images concurrently (token bucket + 429 backoff)
+        
+        Sonuçlar istek sırasıyla döner.
+        """
+        bucket = TokenBucket(self.rate_limit_per_minute, self.rate_limit_burst)
+        results: List[Optional[Dict[str, Any]]] = [None] * len(requests)
         
-        for i, req in enumerate(requests):
+        def run(i: int, req: Dict[str, Any]):
             print(f"Generating image {i+1}/{len(requests)}: {req.get('title', req.get('prompt', 'Unknown'))}")
             
-            if req.get("type") == "pin":
-                result = self.generate_pinterest_pin_image(
-                    req.get("title", ""),
-                    req.get("domain", "hing.me"),
-                    req.get("style", "modern")
-                )
-            elif req.get("type") == "hero":
-                result = self.generate_article_hero_image(
-                    req.get("title", ""),
-                    req.get("topic", ""),
-                    req.get("domain", "hing.me")
-                )
-            else:
-                result = self.generate_image(
-                    req.get("prompt", ""),
-                    req.get("style", "modern"),
-                    req.get("size", "pinterest")
-                )
+            for attempt in range(self.max_rate_limit_retries + 1):
+                bucket.acquire()
+                result = self.generate_batch_item(req)
+                
+                if not result.get("rate_limited"):
+                    bucket.recover()
+                    break
+                
+                # Adaptive backoff: Retry-After varsa ona uy, yoksa üstel bekle
+                bucket.backoff(result.get("retry_after") or min(60, 2 ** (attempt + 1)))
             
-            results.append({
+            results[i] = {
                 "index": i,
                 "request": req,
                 "result": result,
                 "success": result.get("success", False)
-            })
-            
-            # Rate limiting
-            time.sleep(2)
+            }
+        
+        with ThreadPoolExecutor(max_workers=max(1, self.batch_concurrency)) as executor:
+            for future in [executor.submit(run, i, req) for i, req in enumerate(requests)]:
+                future.result()
         
         return {
             "success": True,
@@ -280,6 +343,27 @@ class NanoBananaAPI:
             "results": results
         }
     
+    def generate_batch_item(self, req: Dict[str, Any]) -> Dict[str, Any]:
+        """Batch isteğini tipine göre üret"""
+        if req.get("type") == "pin":
+            return self.generate_pinterest_pin_image(
+                req.get("title", ""),
+                req.get("domain", "hing.me"),
+                req.get("style", "modern")
+            )
+        elif req.get("type") == "hero":
+            return self.generate_article_hero_image(
+                req.get("title", ""),
+                req.get("topic", ""),
+                req.get("domain", "hing.me")
+            )
+        else:
+            return self.generate_image(
+                req.get("prompt", ""),
+                req.get("style", "modern"),
+                req.get("size", "pinterest")
+            )
+    
     def get_account_info(self) -> Dict[str, Any]:
         """Get account information and usage statistics"""
         try:
@@ -1,6 +1,7 @@
 import os, json, time, random, datetime, redis
 from generate_text import draft_description, pick_hashtags
 from generate_image import make_pin_image
+from job_queue import JobQueue
 
 r = redis.Redis(host=os.getenv("REDIS_HOST","redis"), port=int(os.getenv("REDIS_PORT","6379")), decode_responses=True)
 
@@ -34,9 +35,12 @@ def build_job(keyword: str):
         "target_url": link
     }
 
+queue = JobQueue(r, "keyword_queue")
+
 print("Pin worker started...")
 
 while True:
+    reserved = None
     try:
         print(f"Checking window... Current time: {datetime.datetime.now().time()}")
         
@@ -52,20 +56,23 @@ while True:
             time.sleep(60)
             continue
             
-        kw = r.rpop("keyword_queue") 
-        if not kw: 
+        reserved = queue.reserve(timeout=30)
+        if not reserved: 
             print("No keywords in queue")
-            time.sleep(30)
             continue
         
+        kw = reserved.raw
         print(f"Processing keyword: {kw}")
         job = build_job(kw)
         r.lpush("pin_jobs", json.dumps(job))
         r.lpush("reports", json.dumps({"ts": time.time(), "event": "enqueued", "kw": kw}))
+        reserved.ack()
         print(f"Job created for keyword: {kw}")
         
     except Exception as e:
         print(f"Error: {e}")
+        if reserved:
+            reserved.nack(str(e))
         r.lpush("reports", json.dumps({"ts": time.time(), "event": "error", "error": str(e)}))
         
     delay = schedule_delay()
@@ -1,4 +1,5 @@
 import os, json, time, random, redis
+from job_queue import JobQueue
 
 r = redis.Redis(host=os.getenv("REDIS_HOST","redis"), port=int(os.getenv("REDIS_PORT","6379")), decode_responses=True)
 
@@ -12,13 +13,24 @@ def post_to_pinterest(job):
 
 USE_TAILWIND = bool(os.getenv("TAILWIND_API_KEY"))
 
+queue = JobQueue(r, "pin_jobs")
+
 while True:
-    job_raw = r.rpop("pin_jobs")
-    if not job_raw: 
-        time.sleep(10)
+    reserved = None
+    try:
+        reserved = queue.reserve(timeout=30)
+        if not reserved: 
+            continue
+            
+        job = json.loads(reserved.raw)
+        res = post_to_tailwind(job) if USE_TAILWIND else post_to_pinterest(job)
+        r.lpush("reports", json.dumps({"event":"posted","res":res,"job":job,"ts":time.time()}))
+        reserved.ack()
+    except Exception as e:
+        print(f"Error: {e}")
+        if reserved:
+            reserved.nack(str(e))
+        r.lpush("reports", json.dumps({"event":"error","error":str(e),"ts":time.time()}))
+        time.sleep(5)
         continue
-        
-    job = json.loads(job_raw)
-    res = post_to_tailwind(job) if USE_TAILWIND else post_to_pinterest(job)
-    r.lpush("reports", json.dumps({"event":"posted","res":res,"job":job,"ts":time.time()}))
     time.sleep(random.randint(20,80))